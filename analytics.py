@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""Portal usage analytics: page views, render times and tool click-throughs.
+
+Sessions record events into an in-process ring buffer (a deque append, no
+I/O). A background batcher drains it every few seconds into SQLite, writing
+the raw events plus incrementally maintained daily aggregates:
+
+* ``tool_opens_daily``   - opens per tool per day
+* ``render_hist_daily``  - page renders per day in log-spaced latency buckets,
+                           from which page views and p95 render time are read
+* ``reruns_daily``       - reruns (widget interactions) per day; reruns are
+                           only counted here, never stored as raw events
+
+Aggregates are upserted per batch, so reading them never rescans raw events,
+and raw events and batch ids older than NEXUS_ANALYTICS_RETENTION_DAYS are
+deleted (hourly) once they are folded in.
+Each batch carries an id that the store claims in the same transaction, so a
+batch retried after a failed commit is applied once, even when several
+instances share one PostgreSQL database (NEXUS_ANALYTICS_PATH=postgresql://...).
+"""
+import collections
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from shared_storage import PostgresConnection, is_postgres_url, new_idempotency_key, warn_if_instance_local
+
+logger = logging.getLogger(__name__)
+
+# --- Tuning ---
+RING_BUFFER_SIZE = 10000       # Events held in memory; oldest are dropped (and counted) if the batcher falls behind
+FLUSH_INTERVAL_SECONDS = 2.0
+FLUSH_RETRIES = 3              # Attempts per batch (same batch id) before it is dropped and counted
+DEFAULT_ANALYTICS_PATH = "analytics.db"
+BUCKET_RATIO = 1.25            # Render-time histogram bucket i covers (1.25^(i-1), 1.25^i] ms
+RETENTION_DAYS = float(os.environ.get("NEXUS_ANALYTICS_RETENTION_DAYS", "30"))  # Raw events and batch ids; roll-ups are kept
+PRUNE_INTERVAL_SECONDS = 3600
+
+# --- Event types ---
+PAGE_VIEW = "page_view"   # First script run of a session
+RERUN = "rerun"           # Any later run (widget interaction); only counted per day
+TOOL_OPEN = "tool_open"
+
+
+def _bucket(value_ms):
+    return max(0, math.ceil(math.log(max(value_ms, 1.0), BUCKET_RATIO)))
+
+
+def _bucket_upper_ms(bucket):
+    return BUCKET_RATIO ** bucket
+
+
+def _rollups(events):
+    """Daily (day, tool, opens), (day, bucket, renders) and (day, reruns) increments for a batch of events."""
+    opens = collections.Counter()
+    renders = collections.Counter()
+    reruns = collections.Counter()
+    for ts, event_type, tool, value in events:
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        if event_type == TOOL_OPEN:
+            opens[(day, tool)] += 1
+        elif event_type == PAGE_VIEW and value is not None:
+            renders[(day, _bucket(value))] += 1
+        elif event_type == RERUN:
+            reruns[day] += 1
+    return (
+        [(day, tool, count) for (day, tool), count in opens.items()],
+        [(day, bucket, count) for (day, bucket), count in renders.items()],
+        list(reruns.items()),
+    )
+
+
+def _raw_events(events):
+    """The events kept raw: reruns are frequent and already counted in reruns_daily."""
+    return [event for event in events if event[1] != RERUN]
+
+
+def _histogram_stats(rows, quantile):
+    """[(day, page_views, quantile ms)] from (day, bucket, renders) rows ordered by day, bucket."""
+    histograms = collections.OrderedDict()
+    for day, bucket, count in rows:
+        histograms.setdefault(day, []).append((bucket, count))
+    stats = []
+    for day, buckets in histograms.items():
+        total = sum(count for _, count in buckets)
+        threshold = quantile * total
+        running = 0
+        for bucket, count in buckets:
+            running += count
+            if running >= threshold:
+                stats.append((day, total, round(_bucket_upper_ms(bucket), 1)))
+                break
+    return stats
+
+
+# --- SQL shared by both stores ("?" placeholders; the PostgreSQL store swaps in "%s") ---
+_INSERT_EVENT = "INSERT INTO events (ts, type, tool, value) VALUES (?, ?, ?, ?)"
+_UPSERT_OPENS = (
+    "INSERT INTO tool_opens_daily (day, tool, opens) VALUES (?, ?, ?) "
+    "ON CONFLICT (day, tool) DO UPDATE SET opens = tool_opens_daily.opens + excluded.opens"
+)
+_UPSERT_RENDERS = (
+    "INSERT INTO render_hist_daily (day, bucket, renders) VALUES (?, ?, ?) "
+    "ON CONFLICT (day, bucket) DO UPDATE SET renders = render_hist_daily.renders + excluded.renders"
+)
+_UPSERT_RERUNS = (
+    "INSERT INTO reruns_daily (day, reruns) VALUES (?, ?) "
+    "ON CONFLICT (day) DO UPDATE SET reruns = reruns_daily.reruns + excluded.reruns"
+)
+_PRUNE_EVENTS = "DELETE FROM events WHERE ts < ?"
+_PRUNE_BATCHES = "DELETE FROM applied_batches WHERE applied_at < ?"
+_CLAIM_BATCH = "INSERT INTO applied_batches (batch_id, applied_at) VALUES (?, ?) ON CONFLICT (batch_id) DO NOTHING"
+_TOOL_OPENS = "SELECT day, tool, opens FROM tool_opens_daily WHERE day >= ? ORDER BY day DESC, opens DESC"
+_RENDER_HIST = "SELECT day, bucket, renders FROM render_hist_daily WHERE day >= ? ORDER BY day DESC, bucket"
+
+
+class AnalyticsStore:
+    """SQLite tables for raw events and their daily roll-ups (also the offline stand-in for PostgreSQL)."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                ts REAL NOT NULL, type TEXT NOT NULL, tool TEXT, value REAL
+            );
+            CREATE TABLE IF NOT EXISTS tool_opens_daily (
+                day TEXT NOT NULL, tool TEXT NOT NULL, opens INTEGER NOT NULL,
+                PRIMARY KEY (day, tool)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS render_hist_daily (
+                day TEXT NOT NULL, bucket INTEGER NOT NULL, renders INTEGER NOT NULL,
+                PRIMARY KEY (day, bucket)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS reruns_daily (
+                day TEXT PRIMARY KEY, reruns INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS applied_batches (
+                batch_id TEXT PRIMARY KEY, applied_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+            CREATE INDEX IF NOT EXISTS applied_batches_at ON applied_batches (applied_at);
+            """
+        )
+
+    def write_batch(self, events, batch_id=None):
+        """Insert raw events and fold them into the daily aggregates in one transaction.
+
+        With a ``batch_id``, a batch that was already applied is skipped; returns False in that case.
+        """
+        opens, renders, reruns = _rollups(events)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            if batch_id is not None and not self._conn.execute(_CLAIM_BATCH, (batch_id, time.time())).rowcount:
+                return False
+            self._conn.executemany(_INSERT_EVENT, _raw_events(events))
+            self._conn.executemany(_UPSERT_OPENS, opens)
+            self._conn.executemany(_UPSERT_RENDERS, renders)
+            self._conn.executemany(_UPSERT_RERUNS, reruns)
+        return True
+
+    def prune(self, before):
+        """Delete raw events and batch ids older than ``before`` (Unix time); returns the rows deleted.
+
+        Every event is folded into the roll-ups in the transaction that stores it,
+        so this never loses a count. Batch ids only guard retries, which happen
+        within seconds.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            deleted = self._conn.execute(_PRUNE_EVENTS, (before,)).rowcount
+            deleted += self._conn.execute(_PRUNE_BATCHES, (before,)).rowcount
+        return deleted
+
+    def _fetch(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- Aggregate views (read only the roll-up tables) ---
+    def tool_opens(self, days=7):
+        """[(day, tool, opens)] for the last ``days`` days, newest first."""
+        since = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        return [tuple(row) for row in self._fetch(_TOOL_OPENS, (since,))]
+
+    def render_stats(self, days=7, quantile=0.95):
+        """[(day, page_views, p-quantile render ms)] for the last ``days`` days, from the histogram."""
+        since = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        return _histogram_stats(self._fetch(_RENDER_HIST, (since,)), quantile)
+
+
+class PostgresAnalyticsStore(AnalyticsStore):
+    """The same tables in a PostgreSQL database shared by every instance. Requires psycopg 3."""
+
+    def __init__(self, dsn):
+        self.path = dsn
+        self._db = PostgresConnection(dsn)
+        self._lock = self._db.lock
+        with self._lock:
+            self._db.get().execute(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    ts DOUBLE PRECISION NOT NULL, type TEXT NOT NULL, tool TEXT, value DOUBLE PRECISION
+                );
+                CREATE TABLE IF NOT EXISTS tool_opens_daily (
+                    day TEXT NOT NULL, tool TEXT NOT NULL, opens BIGINT NOT NULL,
+                    PRIMARY KEY (day, tool)
+                );
+                CREATE TABLE IF NOT EXISTS render_hist_daily (
+                    day TEXT NOT NULL, bucket INTEGER NOT NULL, renders BIGINT NOT NULL,
+                    PRIMARY KEY (day, bucket)
+                );
+                CREATE TABLE IF NOT EXISTS reruns_daily (
+                    day TEXT PRIMARY KEY, reruns BIGINT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS applied_batches (
+                    batch_id TEXT PRIMARY KEY, applied_at DOUBLE PRECISION NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+                CREATE INDEX IF NOT EXISTS applied_batches_at ON applied_batches (applied_at);
+                """
+            )
+
+    def write_batch(self, events, batch_id=None):
+        opens, renders, reruns = _rollups(events)
+        with self._lock:
+            conn = self._db.get()
+            with conn.transaction(), conn.cursor() as cursor:
+                if batch_id is not None:
+                    cursor.execute(_CLAIM_BATCH.replace("?", "%s"), (batch_id, time.time()))
+                    if not cursor.rowcount:
+                        return False
+                cursor.executemany(_INSERT_EVENT.replace("?", "%s"), _raw_events(events))
+                cursor.executemany(_UPSERT_OPENS.replace("?", "%s"), opens)
+                cursor.executemany(_UPSERT_RENDERS.replace("?", "%s"), renders)
+                cursor.executemany(_UPSERT_RERUNS.replace("?", "%s"), reruns)
+        return True
+
+    def prune(self, before):
+        with self._lock:
+            conn = self._db.get()
+            with conn.transaction(), conn.cursor() as cursor:
+                cursor.execute(_PRUNE_EVENTS.replace("?", "%s"), (before,))
+                deleted = cursor.rowcount
+                cursor.execute(_PRUNE_BATCHES.replace("?", "%s"), (before,))
+                deleted += cursor.rowcount
+        return deleted
+
+    def _fetch(self, sql, params):
+        with self._lock:
+            return self._db.get().execute(sql.replace("?", "%s"), params).fetchall()
+
+
+class AnalyticsRecorder:
+    """Ring buffer of events plus the background thread that flushes it to an AnalyticsStore."""
+
+    def __init__(self, store, capacity=RING_BUFFER_SIZE, flush_interval=FLUSH_INTERVAL_SECONDS,
+                 retention_days=RETENTION_DAYS, prune_interval=PRUNE_INTERVAL_SECONDS):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_days * 86400
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._pruned = 0
+        self._events = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._recorded = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="analytics-batcher", daemon=True)
+        self._thread.start()
+
+    def record(self, event_type, tool=None, value=None):
+        """Queue one event; never blocks on I/O."""
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self._dropped += 1  # The deque is about to evict its oldest event
+            self._events.append((time.time(), event_type, tool, value))
+            self._recorded += 1
+
+    def flush(self):
+        with self._lock:
+            batch = list(self._events)
+            self._events.clear()
+        if not batch:
+            return
+        batch_id = new_idempotency_key()  # Reused by every retry, so the batch is applied at most once
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                self.store.write_batch(batch, batch_id)
+                break
+            except Exception:
+                logger.exception("Analytics batch of %d failed (attempt %d/%d)", len(batch), attempt, FLUSH_RETRIES)
+                if attempt == FLUSH_RETRIES:
+                    with self._lock:
+                        self._dropped += len(batch)
+                    return
+                time.sleep(0.5 * attempt)
+        with self._lock:
+            self._flushed += len(batch)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(self.flush_interval + 5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered": len(self._events),
+                "recorded": self._recorded,
+                "flushed": self._flushed,
+                "dropped": self._dropped,
+                "pruned": self._pruned,
+            }
+
+    def prune(self):
+        """Delete raw events and batch ids past the retention window (at most once per prune interval)."""
+        now = time.time()
+        if now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        try:
+            deleted = self.store.prune(now - self.retention_seconds)
+        except Exception:
+            logger.exception("Analytics retention pruning failed")
+            return
+        with self._lock:
+            self._pruned += deleted
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            self.prune()
+
+
+def open_analytics(path=None):
+    """Recorder over NEXUS_ANALYTICS_PATH: a SQLite file, or a postgresql:// URL shared across instances."""
+    location = path or os.environ.get("NEXUS_ANALYTICS_PATH", DEFAULT_ANALYTICS_PATH)
+    if is_postgres_url(location):
+        return AnalyticsRecorder(PostgresAnalyticsStore(location))
+    warn_if_instance_local("Usage analytics", location)
+    return AnalyticsRecorder(AnalyticsStore(location))
@@ -0,0 +1,43 @@
+#!/bin/sh
+# Compare image size and cold-start latency of the current Dockerfile against another git revision.
+#
+# Usage: bench/image_compare.sh [baseline-rev] [runs]
+#   baseline-rev  defaults to the first commit (the original python:3.9-slim-buster image)
+#   runs          cold starts per image (default 5)
+#
+# Cold start = `docker run` until /_stcore/health answers 200 on the published port.
+set -eu
+
+BASELINE_REV="${1:-$(git rev-list --max-parents=0 HEAD)}"
+RUNS="${2:-5}"
+ROOT="$(git rev-parse --show-toplevel)"
+WORKTREE="$(mktemp -d)"
+trap 'git -C "$ROOT" worktree remove --force "$WORKTREE" >/dev/null 2>&1 || true' EXIT
+
+git -C "$ROOT" worktree add --detach "$WORKTREE" "$BASELINE_REV" >/dev/null
+docker build -q -t nexus-bench:baseline "$WORKTREE" >/dev/null
+docker build -q -t nexus-bench:current "$ROOT" >/dev/null
+
+now_ms() { python3 -c 'import time; print(int(time.time() * 1000))'; }
+
+cold_start_ms() {
+    image="$1"
+    started="$(now_ms)"
+    container="$(docker run -d -e PORT=8080 -p 127.0.0.1:18080:8080 "$image")"
+    until curl -sf -o /dev/null http://127.0.0.1:18080/_stcore/health; do sleep 0.05; done
+    ended="$(now_ms)"
+    docker rm -f "$container" >/dev/null
+    echo $((ended - started))
+}
+
+for tag in baseline current; do
+    size_mb="$(docker image inspect -f '{{.Size}}' "nexus-bench:$tag" | awk '{printf "%.1f", $1 / 1048576}')"
+    samples=""
+    i=0
+    while [ "$i" -lt "$RUNS" ]; do
+        samples="$samples $(cold_start_ms "nexus-bench:$tag")"
+        i=$((i + 1))
+    done
+    median="$(echo $samples | tr ' ' '\n' | sort -n | awk '{a[NR]=$1} END {print a[int((NR + 1) / 2)]}')"
+    echo "$tag: image ${size_mb} MB, cold start median ${median} ms (samples:${samples})"
+done
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""Concurrent-session load test for the portal.
+
+Simulates N users at once. Each one loads the page, types a name, types
+feedback and submits it (four script runs), and the harness reports:
+
+  * rerun latency percentiles per step (load / type_name / type_feedback / submit);
+  * throughput in script runs per second across all sessions;
+  * memory per session: growth of the server's resident set while every
+    session is still connected, divided by N. Sessions offer permessage-deflate
+    like a browser does, so when the server enables websocket compression its
+    per-connection zlib state is counted (``--no-deflate`` leaves it out);
+  * feedback-write contention: submissions accepted vs refused by the writer
+    queue, rows actually written, and how long the store took to drain.
+
+Two drivers:
+
+  * ``--mode server`` (default) starts ``streamlit run`` on a free port against a
+    throwaway feedback store and talks to it over the same websocket protocol
+    as a browser (the minimal client from warmup.py);
+  * ``--mode apptest`` runs sessions in-process with Streamlit's AppTest, which
+    needs no network. AppTest is not thread-safe, so the N sessions stay open
+    together but their steps are interleaved on one thread (every session
+    loads, then every session types, ...): it measures script cost and memory,
+    not parallel contention.
+
+Usage:
+    python bench/loadtest.py [--sessions 20] [--mode server|apptest] [--no-deflate] [--json out.json]
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+APP_SCRIPT = APP_DIR / "streamlit_app.py"
+sys.path.insert(0, str(APP_DIR))
+
+STEPS = ("load", "type_name", "type_feedback", "submit")
+NAME_PREFIX = "loadtest-"
+ACCEPTED_TEXT = "Thank you"  # Saved, or queued when the write takes longer than the form waits
+REFUSED_TEXT = "faster than it can be saved"
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    return {"p50": pick(0.50), "p90": pick(0.90), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(ordered[-1], 1), "mean": round(statistics.fmean(ordered), 1)}
+
+
+def rss_kb(pid):
+    """Resident set size of a process in KB (Linux /proc; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def count_written(feedback_path):
+    """Rows written by this harness (names carry NAME_PREFIX)."""
+    try:
+        with sqlite3.connect(feedback_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM feedback WHERE name LIKE ?", (NAME_PREFIX + "%",)).fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+
+# --- Websocket driver (one browser-equivalent session against a live server) ---
+class ServerSession:
+    def __init__(self, port, timeout, deflate=True):
+        from warmup import WebSocket
+
+        self.ws = WebSocket("127.0.0.1", port, "/_stcore/stream", timeout=timeout, deflate=deflate)
+        self.deflated = self.ws._inflater is not None  # The server accepted permessage-deflate
+        self.widget_ids = {}   # label -> widget id, learned from the first render
+        self.fragment_ids = {} # widget id -> id of the fragment it renders in (the browser reruns just that)
+        self.states = {}       # widget id -> WidgetState sent with every rerun
+        self.alerts = []
+        self.deltas = 0        # Deltas and message bytes received so far, for per-interaction counts
+        self.bytes_received = 0
+
+    def _rerun(self, trigger_id=None, fragment_id=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ""
+        for state in self.states.values():
+            back_msg.rerun_script.widget_states.widgets.append(state)
+        if trigger_id:
+            back_msg.rerun_script.widget_states.widgets.add(id=trigger_id, trigger_value=True)
+        if fragment_id:
+            back_msg.rerun_script.fragment_id = fragment_id
+        alerts = []
+        started = time.perf_counter()
+        self.ws.send_binary(back_msg.SerializeToString())
+        while True:
+            data = self.ws.recv()
+            self.bytes_received += len(data)
+            forward_msg = ForwardMsg()
+            forward_msg.ParseFromString(data)
+            kind = forward_msg.WhichOneof("type")
+            self.deltas += kind == "delta"
+            if kind == "delta" and forward_msg.delta.WhichOneof("type") == "new_element":
+                element = forward_msg.delta.new_element
+                widget = getattr(element, element.WhichOneof("type") or "empty", None)
+                if getattr(widget, "id", "") and getattr(widget, "label", ""):
+                    self.widget_ids.setdefault(widget.label, widget.id)
+                    if forward_msg.delta.fragment_id:
+                        self.fragment_ids[widget.id] = forward_msg.delta.fragment_id
+                if element.WhichOneof("type") == "alert":
+                    alerts.append(element.alert.body)
+            elif kind == "script_finished":
+                return (time.perf_counter() - started) * 1000, alerts
+
+    def _type(self, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id = self.widget_ids[label]
+        self.states[widget_id] = WidgetState(id=widget_id, string_value=value)
+        return self._rerun(fragment_id=self.fragment_ids.get(widget_id))[0]
+
+    def steps(self, name, feedback):
+        """Yield (step, ms) for each of STEPS; alerts shown after submitting end up in self.alerts."""
+        yield "load", self._rerun()[0]
+        yield "type_name", self._type("Your Name", name)
+        yield "type_feedback", self._type("Your Feedback", feedback)
+        submit_id = self.widget_ids["Submit Feedback"]
+        elapsed_ms, self.alerts = self._rerun(trigger_id=submit_id, fragment_id=self.fragment_ids.get(submit_id))
+        yield "submit", elapsed_ms
+
+    def close(self):
+        self.ws.close()
+
+
+# --- AppTest driver (in-process, no server) ---
+class AppTestSession:
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(APP_SCRIPT), default_timeout=timeout)
+        self.alerts = []
+
+    def _timed(self, action):
+        started = time.perf_counter()
+        action()
+        return (time.perf_counter() - started) * 1000
+
+    def steps(self, name, feedback):
+        at = self.at
+        yield "load", self._timed(at.run)
+        yield "type_name", self._timed(lambda: at.text_input(key="user_name").input(name).run())
+        yield "type_feedback", self._timed(lambda: at.text_area(key="feedback").input(feedback).run())
+        elapsed_ms = self._timed(lambda: next(b for b in at.button if b.label == "Submit Feedback").click().run())
+        self.alerts = [alert.value for alert in list(at.success) + list(at.error)]
+        yield "submit", elapsed_ms
+
+    def close(self):
+        pass
+
+
+# --- Server lifecycle ---
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env, timeout=60):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP_SCRIPT), "--server.port", str(port),
+         "--server.headless", "true", "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("streamlit server did not become healthy in time")
+
+
+def run_load(sessions, mode, timeout, feedback_path, deflate=True):
+    """Drive ``sessions`` concurrent users through the page and return the results dict."""
+    env = dict(os.environ, NEXUS_FEEDBACK_PATH=feedback_path, NEXUS_TRACK_OPENS="0")
+    server, port = (None, None)
+    if mode == "server":
+        server, port = start_server(env)
+        # One throwaway session so process-wide caches are built before the clock starts
+        warm = ServerSession(port, timeout, deflate)
+        deflated = warm.deflated
+        warm.close()
+        measured_pid = server.pid
+    else:
+        os.environ.update(env)
+        AppTestSession(timeout).at.run()  # Same warm-up, and imports Streamlit before the baseline
+        deflated = False  # No websocket in-process
+        measured_pid = os.getpid()
+    baseline_rss = rss_kb(measured_pid)
+
+    opened, lock = [], threading.Lock()
+    start_gate = threading.Barrier(sessions)
+
+    def feedback_for(index):
+        return f"{NAME_PREFIX}{index}", f"Load test feedback from session {index}. " * 4
+
+    def user(index):
+        session = ServerSession(port, timeout, deflate)
+        with lock:
+            opened.append(session)
+        start_gate.wait()  # All sessions begin together
+        return session, dict(session.steps(*feedback_for(index)))
+
+    try:
+        started = time.perf_counter()
+        if mode == "server":
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                finished = list(pool.map(user, range(sessions)))
+        else:
+            opened.extend(AppTestSession(timeout) for _ in range(sessions))
+            runs = [session.steps(*feedback_for(index)) for index, session in enumerate(opened)]
+            timings = [{} for _ in opened]
+            for _ in STEPS:  # Step-major: every session takes its next step before anyone moves on
+                for run, session_timings in zip(runs, timings):
+                    step, elapsed_ms = next(run)
+                    session_timings[step] = elapsed_ms
+            finished = list(zip(opened, timings))
+        elapsed = time.perf_counter() - started
+        outcomes = [(session_timings, session.alerts) for session, session_timings in finished]
+        submit_done = time.monotonic()
+        loaded_rss = rss_kb(measured_pid)  # Every session is still connected here
+    finally:
+        for session in opened:
+            session.close()
+
+    accepted = sum(any(ACCEPTED_TEXT in alert for alert in alerts) for _, alerts in outcomes)
+    refused = sum(any(REFUSED_TEXT in alert for alert in alerts) for _, alerts in outcomes)
+    written = count_written(feedback_path)
+    while written < accepted and time.monotonic() - submit_done < timeout:
+        time.sleep(0.05)
+        written = count_written(feedback_path)
+    drain_ms = (time.monotonic() - submit_done) * 1000
+    if server is not None:
+        server.terminate()
+        server.wait(10)
+
+    reruns = sessions * len(STEPS)
+    all_timings = [ms for timings, _ in outcomes for ms in timings.values()]
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "websocket_deflate": deflated,
+        "latency_ms": {
+            "all": percentiles(all_timings),
+            **{step: percentiles([timings[step] for timings, _ in outcomes]) for step in STEPS},
+        },
+        "throughput_reruns_per_s": round(reruns / elapsed, 1),
+        "wall_s": round(elapsed, 2),
+        "memory": {
+            "baseline_rss_kb": baseline_rss,
+            "loaded_rss_kb": loaded_rss,
+            "per_session_kb": round((loaded_rss - baseline_rss) / sessions, 1) if baseline_rss and loaded_rss else None,
+        },
+        "feedback_writes": {
+            "submitted": sessions,
+            "accepted": accepted,
+            "refused_queue_full": refused,
+            "written": written,
+            "lost": max(0, accepted - written),
+            "drain_ms": round(drain_ms, 1),
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--mode", choices=("server", "apptest"), default="server")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--deflate", action=argparse.BooleanOptionalAction, default=True,
+                        help="offer permessage-deflate like a browser (server mode)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_load(args.sessions, args.mode, args.timeout, os.path.join(workdir, "feedback.db"), args.deflate)
+    results = {"commit": _git_commit(), "python": sys.version.split()[0], **results}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Bytes on the wire per page view, for a first visit and a repeat visit.
+
+One page view is what the browser transfers for the app itself:
+
+  * the HTML page (``/``), first fetched and then revalidated with If-None-Match;
+  * the theme stylesheet, when the page links one (gateway mode);
+  * the session websocket for one full script run (every ForwardMsg the
+    server streams), with permessage-deflate offered like a browser does.
+
+Streamlit's own JS/CSS bundles are left out: they are content-hashed, cached
+by the browser after the first visit and identical before and after any
+change to the app. A repeat visit counts a 304 for the page, nothing for an
+immutable (``?v=``) stylesheet and the websocket traffic again.
+
+Usage:
+    python bench/page_bytes.py [--gateway] [--json out.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from loadtest import _free_port, _git_commit, start_server  # noqa: E402
+
+ACCEPT_ENCODING = "gzip, deflate, br"
+STYLESHEET_IMPORT = re.compile(r'@import url\("([^"]+\.css[^"]*)"\)')
+
+
+def http_fetch(port, path, etag=None):
+    """(status, wire bytes incl. status line and headers, headers dict) for one GET."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Accept-Encoding": ACCEPT_ENCODING}
+    if etag:
+        headers["If-None-Match"] = etag
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    body = response.read()  # http.client does not decode Content-Encoding: this is the transferred size
+    head = sum(len(f"{name}: {value}\r\n") for name, value in response.getheaders()) + len("HTTP/1.1 200 OK\r\n\r\n")
+    connection.close()
+    return response.status, head + len(body), {name.lower(): value for name, value in response.getheaders()}
+
+
+def websocket_run(port):
+    """(wire bytes, decoded bytes, markdown bodies) for one full script run over the session websocket."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from warmup import WebSocket
+
+    ws = WebSocket("127.0.0.1", port, "/_stcore/stream", deflate=True)
+    try:
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ""
+        ws.send_binary(back_msg.SerializeToString())
+        decoded, markdown = 0, []
+        while True:
+            data = ws.recv()
+            decoded += len(data)
+            forward_msg = ForwardMsg()
+            forward_msg.ParseFromString(data)
+            kind = forward_msg.WhichOneof("type")
+            if kind == "delta" and forward_msg.delta.WhichOneof("type") == "new_element":
+                element = forward_msg.delta.new_element
+                if element.WhichOneof("type") == "markdown":
+                    markdown.append(element.markdown.body)
+            elif kind == "script_finished":
+                return ws.bytes_received, decoded, markdown
+    finally:
+        ws.close()
+
+
+def start_gateway(portal_port, timeout=30):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "gateway.py", "--host", "127.0.0.1", "--port", str(port), "--portal", f"http://127.0.0.1:{portal_port}"],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if http_fetch(port, "/_gateway/metrics")[0] == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gateway did not start in time")
+
+
+def measure(gateway):
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, NEXUS_FEEDBACK_PATH=os.path.join(workdir, "feedback.db"), NEXUS_TRACK_OPENS="0",
+                   NEXUS_HEALTH_INTERVAL="3600")
+        if gateway:
+            env.update(NEXUS_GATEWAY_URL="/", NEXUS_SHELL_STYLESHEET="1")
+        try:
+            server, port = start_server(env)
+            processes.append(server)
+            if gateway:
+                gateway_process, port = start_gateway(port)
+                processes.append(gateway_process)
+            websocket_run(port)  # Warm the process-wide caches (and publish the stylesheet) first
+
+            page_status, page_bytes, page_headers = http_fetch(port, "/")
+            revalidate_status, revalidate_bytes, _ = http_fetch(port, "/", page_headers.get("etag"))
+            ws_wire, ws_decoded, markdown = websocket_run(port)
+
+            stylesheet = None
+            links = [match for body in markdown for match in STYLESHEET_IMPORT.findall(body)]
+            if links:
+                path = "/" + links[0]
+                status, size, headers = http_fetch(port, path)
+                again_status, again_size, _ = http_fetch(port, path, headers.get("etag"))
+                immutable = "immutable" in headers.get("cache-control", "")
+                stylesheet = {
+                    "path": path, "status": status, "bytes": size, "content_encoding": headers.get("content-encoding"),
+                    "revalidate_status": again_status, "revalidate_bytes": again_size, "immutable": immutable,
+                }
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(10)
+
+    stylesheet_first = stylesheet["bytes"] if stylesheet else 0
+    stylesheet_repeat = 0 if not stylesheet or stylesheet["immutable"] else stylesheet["revalidate_bytes"]
+    return {
+        "gateway": gateway,
+        "page": {"status": page_status, "bytes": page_bytes, "content_encoding": page_headers.get("content-encoding"),
+                 "etag": page_headers.get("etag"), "revalidate_status": revalidate_status, "revalidate_bytes": revalidate_bytes},
+        "stylesheet": stylesheet,
+        "websocket": {"wire_bytes": ws_wire, "decoded_bytes": ws_decoded,
+                      "markdown_bytes": sum(len(body.encode("utf-8")) for body in markdown)},
+        "per_page_view_bytes": {
+            "first_visit": page_bytes + stylesheet_first + ws_wire,
+            "repeat_visit": revalidate_bytes + stylesheet_repeat + ws_wire,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gateway", action="store_true", help="measure through gateway.py fronting the portal")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {"commit": _git_commit(), **measure(args.gateway)}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Deltas and bytes the server sends per interaction with the page.
+
+One session loads the page, searches the tools, then types a name, types
+feedback and submits like the load test's users. For each step it reports
+how many deltas (elements and blocks) came back over the websocket and how
+many message bytes they took. A widget inside an ``st.fragment`` is rerun the way the browser does
+it (``rerun_script.fragment_id`` set), so only the fragment's elements come
+back; a widget outside one reruns, and re-sends, the whole page.
+
+Usage:
+    python bench/rerun_deltas.py [--catalog solutions.json] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from loadtest import ServerSession, _git_commit, start_server  # noqa: E402
+
+TIMEOUT = 60
+
+
+def measure(catalog_path=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, NEXUS_FEEDBACK_PATH=os.path.join(workdir, "feedback.db"), NEXUS_TRACK_OPENS="0",
+                   NEXUS_HEALTH_INTERVAL="3600")
+        if catalog_path:
+            env["NEXUS_CATALOG_PATH"] = os.path.abspath(catalog_path)
+        server, port = start_server(env)
+        try:
+            ServerSession(port, TIMEOUT).close()  # Warm the process-wide caches first
+            session = ServerSession(port, TIMEOUT)
+            steps = {}
+
+            def step(name, run):
+                deltas, received = session.deltas, session.bytes_received
+                started = time.perf_counter()
+                run()
+                steps[name] = {"deltas": session.deltas - deltas, "bytes": session.bytes_received - received,
+                               "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+            step("load", session._rerun)
+            step("search", lambda: session._type("Search Tools", "pulse"))
+            step("type_name", lambda: session._type("Your Name", "rerun-deltas"))
+            step("type_feedback", lambda: session._type("Your Feedback", "Measuring what one keystroke re-sends."))
+            submit_id = session.widget_ids["Submit Feedback"]
+            step("submit", lambda: session._rerun(trigger_id=submit_id, fragment_id=session.fragment_ids.get(submit_id)))
+            session.close()
+        finally:
+            server.terminate()
+            server.wait(10)
+    form_fragment = bool(session.fragment_ids.get(session.widget_ids["Your Name"]))
+    return {"form_in_fragment": form_fragment, "steps": steps}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", help="solutions catalog to serve (default: the app's own)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {"commit": _git_commit(), "catalog": args.catalog, **measure(args.catalog)}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Cold-start benchmark for the portal, checked against a regression budget.
+
+Measures, each in a fresh interpreter so nothing is warm:
+  * import time of the app's dependencies (``python -X importtime``), with the
+    slowest modules listed so regressions can be traced to an import;
+  * time to first render: interpreter start -> first full script run under
+    Streamlit's AppTest (no browser needed);
+  * optionally (``--server``), time until ``streamlit run`` answers its health
+    endpoint, which is what Cloud Run waits on during scale-from-zero.
+
+Usage:
+    python bench/startup.py [--runs 5] [--server] [--json out.json] [--no-budget]
+
+Exits non-zero when a median exceeds bench/startup_budget.json.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+APP_SCRIPT = APP_DIR / "streamlit_app.py"
+BUDGET_PATH = Path(__file__).resolve().parent / "startup_budget.json"
+
+# Modules streamlit_app.py imports at the top; heavy optional ones (pandas, openpyxl, PIL, psycopg) must not be here
+APP_IMPORTS = ["streamlit", "feedback_store", "feedback_export", "feedback_writer", "feedback_guard", "feedback_clusters", "session_registry", "render_cache", "static_assets", "health", "health_history", "catalog", "search", "telemetry", "shared_storage", "webfonts"]
+# Imported only on the paths that need them; a cold start must not pull these in
+DEFERRED_MODULES = ["pandas", "numpy", "openpyxl", "PIL", "psycopg"]
+
+FIRST_RENDER_SNIPPET = """
+import json, sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({script!r}, default_timeout=60).run()
+if at.exception:
+    sys.exit("render failed: " + str(at.exception[0].message))
+loaded = sorted(name for name in {deferred!r} if name in sys.modules)
+print(json.dumps(loaded))
+"""
+
+
+def _env():
+    # Keep benchmark runs away from the real feedback store
+    env = dict(os.environ, NEXUS_FEEDBACK_PATH=os.path.join(tempfile.gettempdir(), "nexus-bench-feedback.db"))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(APP_DIR), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure_imports():
+    """Total import time (ms) of APP_IMPORTS plus the ten slowest cumulative imports."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(APP_IMPORTS)],
+        cwd=APP_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    top_level = sum(us for us, name in rows if name in APP_IMPORTS)
+    slowest = sorted(rows, reverse=True)[:10]
+    return wall_ms, top_level / 1000, [(name, round(us / 1000, 1)) for us, name in slowest]
+
+
+def measure_first_render():
+    """Wall time (ms) from interpreter start to the end of the first script run, and deferred modules loaded."""
+    snippet = FIRST_RENDER_SNIPPET.format(script=str(APP_SCRIPT), deferred=DEFERRED_MODULES)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=APP_DIR, env=_env(), capture_output=True, text=True)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    return elapsed_ms, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_server_ready(timeout=60):
+    """Wall time (ms) from `streamlit run` until /_stcore/health returns 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP_SCRIPT), "--server.port", str(port),
+         "--server.headless", "true", "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("streamlit server did not become healthy in time")
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--server", action="store_true", help="also time `streamlit run` until healthy")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--no-budget", action="store_true", help="report only, never fail")
+    args = parser.parse_args()
+
+    import_wall, import_top, slowest, first_render, server_ready = [], [], None, [], []
+    deferred_loaded = set()
+    for _ in range(args.runs):
+        wall_ms, top_ms, slowest = measure_imports()
+        import_wall.append(wall_ms)
+        import_top.append(top_ms)
+        render_ms, loaded = measure_first_render()
+        first_render.append(render_ms)
+        deferred_loaded.update(loaded)
+        if args.server:
+            server_ready.append(measure_server_ready())
+
+    results = {
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "import_ms": round(statistics.median(import_top), 1),
+        "import_wall_ms": round(statistics.median(import_wall), 1),
+        "first_render_ms": round(statistics.median(first_render), 1),
+        "server_ready_ms": round(statistics.median(server_ready), 1) if server_ready else None,
+        "deferred_modules_loaded": sorted(deferred_loaded),
+        "slowest_imports_ms": slowest,
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    if args.no_budget:
+        return 0
+    budget = json.loads(BUDGET_PATH.read_text())
+    failures = [
+        f"{metric}: {results[metric]} ms > budget {limit} ms"
+        for metric, limit in budget.items()
+        if metric.endswith("_ms") and results.get(metric) is not None and results[metric] > limit
+    ]
+    if budget.get("forbid_deferred_imports") and deferred_loaded:
+        failures.append(f"heavy modules imported on first render: {', '.join(sorted(deferred_loaded))}")
+    for failure in failures:
+        print(f"BUDGET EXCEEDED - {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
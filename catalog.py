@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""Solutions catalog loaded from disk, validated, indexed by name and hot-reloaded.
+
+The catalog source is either a single JSON/YAML file holding a list of tools
+(``solutions.json`` by default) or a directory of per-tool manifests, one
+JSON/YAML file each. It is parsed once into an immutable Catalog; CatalogLoader
+re-checks file signatures at most every few seconds and swaps in a new Catalog
+when something changed, so adding a tool needs no rebuild or restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent / "solutions.json"
+RELOAD_CHECK_SECONDS = 2.0
+MANIFEST_SUFFIXES = (".json", ".yaml", ".yml")
+
+# --- Schema: field -> (type, required) ---
+SOLUTION_FIELDS = {
+    "name": (str, True),
+    "description": (str, True),
+    "link": (str, True),
+    "status": (str, False),
+    "version": (str, False),
+    "documentation": (str, False),
+    "feedback": (str, False),
+    "image": (str, False),
+    "tags": (list, False),
+}
+
+
+def slugify(name):
+    """URL-safe identifier for a solution name, e.g. "IP: Geospatial Data Extraction" -> "ip-geospatial-data-extraction"."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+class Solution(NamedTuple):
+    """One validated tool entry: a plain tuple (no per-entry dict), immutable and hashable."""
+    name: str
+    description: str
+    link: str
+    status: str = "ACTIVE"
+    version: str = "N/A"
+    documentation: Optional[str] = None
+    feedback: Optional[str] = None
+    image: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+
+
+class CatalogError(ValueError):
+    """Raised when the catalog source is missing, unparseable or fails validation."""
+
+
+def validate_solution(data, source):
+    """Check one tool entry against SOLUTION_FIELDS and return it as a Solution."""
+    if not isinstance(data, dict):
+        raise CatalogError(f"{source}: each solution must be an object, got {type(data).__name__}")
+    unknown = sorted(set(data) - set(SOLUTION_FIELDS))
+    if unknown:
+        raise CatalogError(f"{source}: unknown field(s) {', '.join(unknown)}")
+    for field, (field_type, required) in SOLUTION_FIELDS.items():
+        if field not in data:
+            if required:
+                raise CatalogError(f"{source}: missing required field '{field}'")
+            continue
+        if not isinstance(data[field], field_type):
+            raise CatalogError(f"{source}: field '{field}' must be {field_type.__name__}")
+    if not data["name"].strip():
+        raise CatalogError(f"{source}: 'name' must not be empty")
+    tags = data.get("tags", [])
+    if not all(isinstance(tag, str) for tag in tags):
+        raise CatalogError(f"{source}: 'tags' must be a list of strings")
+    # Tags become a tuple so entries stay immutable and hashable
+    return Solution(**{**data, "tags": tuple(tags)})
+
+
+class Catalog:
+    """Immutable, name-indexed set of solutions. ``version`` changes whenever the source content does."""
+
+    def __init__(self, solutions, version):
+        self.solutions = tuple(solutions)
+        self.names = tuple(solution.name for solution in self.solutions)
+        index = {}
+        for solution in self.solutions:
+            if solution.name in index:
+                raise CatalogError(f"Duplicate solution name '{solution.name}'")
+            index[solution.name] = solution
+        self.by_name = MappingProxyType(index)
+        slugs = {}
+        for solution in self.solutions:
+            slug = slugify(solution.name)
+            if slug in slugs:
+                raise CatalogError(f"Solution names '{slugs[slug].name}' and '{solution.name}' map to the same slug '{slug}'")
+            slugs[slug] = solution
+        self.by_slug = MappingProxyType(slugs)
+        self.version = version
+
+    def __iter__(self):
+        return iter(self.solutions)
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+
+def _parse_file(path, raw):
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml  # Optional: only needed for YAML manifests
+        except ImportError:
+            raise CatalogError(f"{path}: PyYAML is required to read YAML manifests")
+        try:
+            return yaml.safe_load(raw)
+        except yaml.YAMLError as e:
+            raise CatalogError(f"{path}: invalid YAML ({e})")
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        raise CatalogError(f"{path}: invalid JSON ({e})")
+
+
+def _source_files(path):
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.suffix in MANIFEST_SUFFIXES and p.is_file())
+    return [path]
+
+
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    """Parse and validate the catalog at ``path`` (file or manifest directory)."""
+    path = Path(path)
+    if not path.exists():
+        raise CatalogError(f"Catalog not found at {path}")
+    digest = hashlib.sha256()
+    solutions = []
+    for file_path in _source_files(path):
+        raw = file_path.read_bytes()
+        digest.update(file_path.name.encode() + b"\0" + raw)
+        data = _parse_file(file_path, raw)
+        entries = data if isinstance(data, list) else [data]
+        for position, entry in enumerate(entries):
+            solutions.append(validate_solution(entry, f"{file_path.name}[{position}]"))
+    return Catalog(solutions, digest.hexdigest()[:16])
+
+
+def _signature(path):
+    """Cheap change detector: (name, mtime, size) of every source file."""
+    try:
+        return tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in _source_files(path))
+    except FileNotFoundError:
+        return None
+
+
+class CatalogLoader:
+    """Holds the current Catalog and reloads it when the source files change.
+
+    An invalid edit is logged and the last good catalog keeps being served.
+    """
+
+    def __init__(self, path=None, check_interval=RELOAD_CHECK_SECONDS):
+        self.path = Path(path or os.environ.get("NEXUS_CATALOG_PATH", DEFAULT_CATALOG_PATH))
+        self.check_interval = check_interval
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._signature = _signature(self.path)
+        self._catalog = load_catalog(self.path)  # A broken catalog at start-up is fatal
+        self._checked_at = time.monotonic()
+
+    def get(self):
+        """Current catalog; at most one stat pass per check_interval across all sessions."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._catalog
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                signature = _signature(self.path)
+                if signature != self._signature:
+                    self._reload(signature)
+        return self._catalog
+
+    def _reload(self, signature):
+        try:
+            catalog = load_catalog(self.path)
+        except CatalogError as e:
+            self.last_error = str(e)
+            logger.error("Catalog reload failed, keeping version %s: %s", self._catalog.version, e)
+        else:
+            logger.info("Catalog reloaded: version %s, %d solutions", catalog.version, len(catalog))
+            self._catalog = catalog
+            self.last_error = None
+        self._signature = signature
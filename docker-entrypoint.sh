@@ -0,0 +1,35 @@
+#!/bin/bash
+# Serve the portal and warm its process-wide caches in the background once it is listening.
+set -e
+
+PORT="${PORT:-8080}"
+
+if [ "${NEXUS_GATEWAY:-0}" = "1" ]; then
+    # Gateway mode: the gateway owns $PORT and fronts both the tools (/tools/<slug>/) and the portal
+    STREAMLIT_PORT=8501
+    export NEXUS_GATEWAY_URL="${NEXUS_GATEWAY_URL:-/}"
+    # The gateway serves app/static/ itself (precompressed, with ETags), so the theme can ship as a stylesheet
+    export NEXUS_SHELL_STYLESHEET="${NEXUS_SHELL_STYLESHEET:-1}"
+    # The gateway appends its own X-Forwarded-For entry: the client address is two hops from the right
+    export NEXUS_TRUSTED_PROXY_HOPS="${NEXUS_TRUSTED_PROXY_HOPS:-2}"
+    # The gateway counts card click-throughs with a plain redirect, so they cost no portal page load
+    export NEXUS_TRACK_OPENS="${NEXUS_TRACK_OPENS:-1}"
+    python warmup.py --port "$STREAMLIT_PORT" &
+    streamlit run streamlit_app.py --server.port "$STREAMLIT_PORT" --server.address 127.0.0.1 &
+    portal=$!
+    python gateway.py --port "$PORT" --portal "http://127.0.0.1:$STREAMLIT_PORT" &
+    gateway=$!
+    # As PID 1 the shell only sees `docker stop` through a trap; pass it on to both servers
+    trap 'kill -TERM "$portal" "$gateway" 2>/dev/null' TERM INT
+    # Whichever server exits first (a crashed portal would leave the gateway answering 502s) ends the
+    # container, so the orchestrator restarts both; the warm-up run finishing on its own is not waited on
+    status=0
+    wait -n "$portal" "$gateway" || status=$?
+    kill -TERM "$portal" "$gateway" 2>/dev/null || true
+    wait "$portal" "$gateway" || true
+    exit "$status"
+fi
+
+python warmup.py --port "$PORT" &
+
+exec streamlit run streamlit_app.py --server.port "$PORT" --server.address 0.0.0.0
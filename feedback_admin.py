@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""In-app feedback admin view (``?view=admin``).
+
+Queries every solution's feedback through FeedbackStore.query(): filters by
+solution, category, time range and free text, newest first, one keyset page
+at a time. Nothing is loaded beyond the page on screen. The bulk export
+(feedback_export.py) lives here too, behind the same admin token.
+
+Given a FeedbackClusterIndex, the view groups near-duplicate submissions by
+default: one row per cluster with its count, under the same filters.
+Submissions the writer dropped after its retries are listed at the top, with
+the error and a button that queues them again.
+"""
+import hmac
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import streamlit as st
+
+from feedback_clusters import REFRESH_MIN_SECONDS
+from feedback_export import EXPORT_FORMATS, export_feedback
+from feedback_store import FEEDBACK_CATEGORIES, FEEDBACK_COLUMNS, TIME_FORMAT
+
+PAGE_SIZE = 50
+ALL_SOLUTIONS = "All solutions"
+
+
+def admin_authorized(admin_token, allow_without_token=False):
+    """Gate the view behind NEXUS_ADMIN_TOKEN; without a token it is only open when explicitly allowed (debug)."""
+    if not admin_token:
+        if allow_without_token:
+            return True
+        st.error("The feedback admin view is disabled. Set NEXUS_ADMIN_TOKEN to enable it.")
+        return False
+    if st.session_state.get("admin_authorized"):
+        return True
+    entered = st.text_input("Admin Token", type="password", key="admin_token_input")
+    if entered and hmac.compare_digest(entered, admin_token):
+        st.session_state["admin_authorized"] = True
+        return True
+    if entered:
+        st.warning("Invalid admin token.")
+    return False
+
+
+def _reset_pages():
+    st.session_state["admin_cursors"] = [None]
+
+
+def _next_page(cursor):
+    st.session_state["admin_cursors"].append(cursor)
+
+
+def _previous_page():
+    if len(st.session_state["admin_cursors"]) > 1:
+        st.session_state["admin_cursors"].pop()
+
+
+def render_feedback_admin(writer, solution_names, clusters=None):
+    """Filter controls, the current page of results and keyset paging buttons (or the clusters, when grouped), and the export.
+
+    ``writer`` is the process's FeedbackWriter: queries go to its store, and the export flushes it first.
+    """
+    store = writer.store
+    st.markdown("<h2>Feedback Admin</h2>", unsafe_allow_html=True)
+    _render_failed(writer)
+
+    solution_col, category_col = st.columns(2)
+    with solution_col:
+        solution = st.selectbox("Solution", [ALL_SOLUTIONS, *solution_names], key="admin_solution", on_change=_reset_pages)
+    with category_col:
+        categories = st.multiselect("Category", FEEDBACK_CATEGORIES, key="admin_categories", on_change=_reset_pages)
+    date_col, text_col = st.columns(2)
+    with date_col:
+        date_range = st.date_input("Time Range", value=(), key="admin_dates", on_change=_reset_pages)
+    with text_col:
+        text = st.text_input("Search Feedback", key="admin_text", placeholder="Words in the feedback or name", on_change=_reset_pages)
+
+    since = until = None
+    if len(date_range) >= 1:
+        since = date_range[0].strftime(TIME_FORMAT)
+    if len(date_range) == 2:
+        until = (date_range[1] + timedelta(days=1)).strftime(TIME_FORMAT)  # End date is inclusive
+
+    solution = None if solution == ALL_SOLUTIONS else solution
+    if clusters is not None and st.toggle("Group near-duplicates", value=True, key="admin_grouped"):
+        _render_clusters(clusters, store, solution, tuple(categories), since, until, text)
+    else:
+        _render_rows(store, solution, tuple(categories), since, until, text)
+    _render_export(writer)
+
+
+def _render_failed(writer):
+    """Submissions the writer gave up on, if any, with a button that queues them again."""
+    failed, last_error = writer.failed()
+    if not failed:
+        return
+    st.error(f"{len(failed)} submissions could not be saved ({writer.stats()['failed']} dropped since start). Last error: {last_error}")
+    with st.expander("Unsaved submissions"):
+        st.dataframe(
+            [{"Solution": solution, **{column: record[column] for column in FEEDBACK_COLUMNS}} for solution, record in failed],
+            use_container_width=True,
+            hide_index=True,
+        )
+    if st.button("Retry unsaved submissions", key="admin_retry_failed"):
+        st.toast(f"{writer.retry_failed()} submissions queued again")
+
+
+def _render_rows(store, solution, categories, since, until, text):
+    """One keyset page of matching rows, newest first, with Newer / Older buttons."""
+    cursors = st.session_state.setdefault("admin_cursors", [None])
+    started = time.perf_counter()
+    rows, next_cursor = store.query(
+        solution=solution,
+        categories=categories,
+        since=since,
+        until=until,
+        text=text,
+        before=cursors[-1],
+        limit=PAGE_SIZE,
+    )
+    query_ms = (time.perf_counter() - started) * 1000
+
+    if rows:
+        st.dataframe(
+            [{"Solution": row["Solution"], **{column: row[column] for column in FEEDBACK_COLUMNS}} for row in rows],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("No feedback matches these filters.")
+
+    previous_col, status_col, next_col = st.columns([1, 2, 1])
+    with previous_col:
+        st.button("← Newer", on_click=_previous_page, disabled=len(cursors) == 1, key="admin_previous")
+    with status_col:
+        st.caption(f"Page {len(cursors)} · {len(rows)} rows · query {query_ms:.1f} ms")
+    with next_col:
+        st.button("Older →", on_click=_next_page, args=(next_cursor,), disabled=next_cursor is None, key="admin_next")
+
+
+def _render_clusters(clusters, store, solution, categories, since, until, text):
+    """The PAGE_SIZE largest near-duplicate clusters matching the filters.
+
+    New feedback is clustered at most every REFRESH_MIN_SECONDS, not on every rerun,
+    unless the admin asks for it.
+    """
+    refresh_now = st.button("Refresh clusters", key="admin_refresh_clusters")
+    started = time.perf_counter()
+    added = clusters.refresh(store) if refresh_now else clusters.refresh_if_stale(store)
+    matches = clusters.clusters(solution=solution, categories=categories, since=since, until=until, text=text)
+    refresh_ms = (time.perf_counter() - started) * 1000
+
+    if matches:
+        st.dataframe(
+            [{"Solution": cluster.solution, "Count": cluster.size, "Total (unfiltered)": cluster.total, "Feedback": cluster.feedback,
+              "Categories": ", ".join(f"{category} ({count})" for category, count in cluster.categories),
+              "First": cluster.first_time, "Last": cluster.last_time}
+             for cluster in matches[:PAGE_SIZE]],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("No feedback matches these filters.")
+    submissions = sum(cluster.size for cluster in matches)  # Only the submissions matching the filters
+    if added is None:
+        refreshed = f"clustered {clusters.refreshed_ago():.0f} s ago (refreshes every {REFRESH_MIN_SECONDS:.0f} s)"
+    else:
+        refreshed = f"{added} new rows clustered in {refresh_ms:.1f} ms"
+    st.caption(f"{len(matches)} clusters · {submissions} matching submissions · showing the {min(len(matches), PAGE_SIZE)} largest"
+               f" · {refreshed}")
+
+
+def _render_export(writer):
+    """Streams the store into a temporary file in the chosen format, then offers it for download."""
+    fmt = st.selectbox("Export Format", list(EXPORT_FORMATS), key="export_format")
+    if st.button("Prepare Export"):
+        _, suffix, mime = EXPORT_FORMATS[fmt]
+        try:
+            writer.flush(timeout=5.0)  # Include submissions still waiting in the queue
+            # Rows go straight to disk in chunks; only the finished file is handed to Streamlit
+            with tempfile.TemporaryDirectory() as export_dir:
+                export_path = os.path.join(export_dir, f"feedback{suffix}")
+                count = export_feedback(writer.store, fmt, export_path)
+                with open(export_path, "rb") as export_file:
+                    st.download_button(
+                        f"Download feedback{suffix} ({count} rows)",
+                        data=export_file,
+                        file_name=f"feedback{suffix}",
+                        mime=mime,
+                    )
+        except Exception as e:
+            st.error(f"An error occurred exporting feedback: {e}")
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Near-duplicate clustering of feedback, per solution, kept up to date incrementally.
+
+Each feedback text is reduced to a MinHash signature: NUM_PERM minimums of
+random linear hashes over its character SHINGLE_CHARS-grams (case and
+punctuation folded), computed for all permutations at once in NumPy. Two
+signatures agree in about as many positions as the texts' shingle sets
+overlap (Jaccard similarity).
+
+Signatures are split into LSH_BANDS bands and every band is a key into a hash
+table scoped to the solution, so a new submission only meets the few earlier
+ones that share a band with it. It joins the most similar candidate's cluster
+when their estimated similarity reaches SIMILARITY_THRESHOLD, and starts a new
+cluster otherwise. Placing one submission costs LSH_BANDS dict lookups plus a
+handful of signature comparisons, however much feedback there already is. Only
+the first MAX_INDEXED_MEMBERS of a cluster go into the tables: later copies of
+a complaint just add to its counts, so a flood of them costs no memory.
+
+``refresh()`` reads only the rows stored since the last call, one page at a
+time through the store's ``read_after()`` cursor (the row id, so rows written
+late with an older Time are not skipped). The index follows every instance's
+submissions without re-reading the history. The admin view calls
+``refresh_if_stale()``, so its reruns (filters, paging) reuse an index
+refreshed less than REFRESH_MIN_SECONDS ago. Each cluster keeps its counts per
+(category, day), so the admin view's filters count only matching submissions.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import NamedTuple
+
+# --- MinHash / LSH parameters ---
+SHINGLE_CHARS = 4
+NUM_PERM = 64
+LSH_BANDS = 16                      # 16 bands of 4 rows: ~90% of pairs at 0.6 similarity share a band
+SIMILARITY_THRESHOLD = 0.6          # Estimated Jaccard similarity that makes two texts near-duplicates
+MAX_INDEXED_MEMBERS = 8             # Members per cluster whose signatures are kept and indexed
+REFRESH_PAGE_SIZE = 1000           # Rows read, hashed and indexed per lock hold
+REFRESH_MIN_SECONDS = float(os.environ.get("NEXUS_CLUSTER_REFRESH_SECONDS", "30"))
+SEED = 20240501                     # Fixed, so clusters come out the same in every process
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+class ClusterSummary(NamedTuple):
+    solution: str
+    size: int            # Submissions matching the category / date filters
+    total: int           # All submissions in the cluster
+    feedback: str        # The earliest submission of the cluster
+    categories: tuple    # (category, count) pairs among the matching submissions, most common first
+    first_time: str
+    last_time: str
+
+
+class _Cluster:
+    __slots__ = ("solution", "feedback", "total", "counts", "first_time", "last_time", "indexed")
+
+    def __init__(self, solution, record):
+        self.solution = solution
+        self.feedback = record["Feedback"]
+        self.total = 0
+        self.counts = Counter()  # (category, day) -> submissions
+        self.first_time = self.last_time = record["Time"]
+        self.indexed = 0
+
+    def add(self, record):
+        self.total += 1
+        self.counts[record["Category"], record["Time"][:10]] += 1
+        if record["Time"] < self.first_time:  # Rows arrive in storage order, not always by Time
+            self.first_time, self.feedback = record["Time"], record["Feedback"]
+        self.last_time = max(self.last_time, record["Time"])
+
+    def summary(self, categories=(), since=None, until=None):
+        """Counts restricted to ``categories`` and the days from ``since`` up to ``until`` (TIME_FORMAT, day resolution)."""
+        matching = Counter()
+        for (category, day), count in self.counts.items():
+            if (not categories or category in categories) and (not since or day >= since[:10]) and (not until or day < until[:10]):
+                matching[category] += count
+        return ClusterSummary(self.solution, sum(matching.values()), self.total, self.feedback, tuple(matching.most_common()),
+                              self.first_time, self.last_time)
+
+
+def shingles(text, size=SHINGLE_CHARS):
+    """Character ``size``-grams of ``text`` with case, punctuation and spacing folded."""
+    normalized = _NON_WORD.sub(" ", text.casefold()).strip()
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[start:start + size] for start in range(len(normalized) - size + 1)}
+
+
+class FeedbackClusterIndex:
+    """MinHash/LSH index of feedback texts, grouped into near-duplicate clusters per solution."""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS, seed=SEED, clock=time.monotonic):
+        import numpy as np  # Only needed once the admin view groups feedback
+
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self._np = np
+        self.threshold = threshold
+        self.bands = bands
+        self._rows = num_perm // bands
+        random = np.random.default_rng(seed)
+        # a*x + b with x, a, b < 2**32 cannot overflow uint64 before the modulo
+        self._a = random.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = random.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # One refresh at a time; others return at once
+        self._clusters = []
+        self._signatures = []      # Indexed member -> signature
+        self._member_cluster = []  # Indexed member -> cluster number
+        self._buckets = {}         # (solution, band, band bytes) -> indexed members
+        self._records = 0
+        self._cursor = None        # The store's read_after() cursor after the last row added
+        self._clock = clock
+        self._refreshed_at = None  # clock() when the last refresh caught up with the store
+
+    def signature(self, text):
+        np = self._np
+        values = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text)), dtype=np.uint64)
+        hashed = (np.outer(values, self._a) + self._b) % np.uint64(_MERSENNE_PRIME)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, solution, signature):
+        rows = self._rows
+        return [(solution, band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, solution, record):
+        """Place one record in its cluster (an existing near-duplicate's, or a new one); returns the cluster number."""
+        with self._lock:
+            return self._add(solution, record)
+
+    def _add(self, solution, record, signature=None):
+        if signature is None:
+            signature = self.signature(record["Feedback"])
+        keys = self._band_keys(solution, signature)
+        candidates = {member for key in keys for member in self._buckets.get(key, ())}
+        cluster_number = None
+        if candidates:
+            members = sorted(candidates)
+            agreement = (self._np.stack([self._signatures[member] for member in members]) == signature).mean(axis=1)
+            best = int(agreement.argmax())
+            if agreement[best] >= self.threshold:
+                cluster_number = self._member_cluster[members[best]]
+        if cluster_number is None:
+            cluster_number = len(self._clusters)
+            self._clusters.append(_Cluster(solution, record))
+        cluster = self._clusters[cluster_number]
+        cluster.add(record)
+        if cluster.indexed < MAX_INDEXED_MEMBERS:
+            cluster.indexed += 1
+            member = len(self._signatures)
+            self._signatures.append(signature)
+            self._member_cluster.append(cluster_number)
+            for key in keys:
+                self._buckets.setdefault(key, []).append(member)
+        self._records += 1
+        return cluster_number
+
+    def refresh(self, store, page_size=REFRESH_PAGE_SIZE):
+        """Add the rows ``store`` received since the last refresh (all of them the first time); returns how many.
+
+        Pages are read, hashed and added one at a time, and the index lock is only
+        held while a hashed page is placed, so clusters() keeps answering during a
+        long first build. A refresh already running in another session is not waited for.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            added = 0
+            while True:
+                rows, cursor = store.read_after(self._cursor, limit=page_size)
+                signatures = [self.signature(row["Feedback"]) for row in rows]  # Outside the lock: the costly part
+                with self._lock:
+                    for row, signature in zip(rows, signatures):
+                        self._add(row["Solution"], row, signature)
+                    self._cursor = cursor
+                added += len(rows)
+                if len(rows) < page_size:
+                    self._refreshed_at = self._clock()
+                    return added
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_if_stale(self, store, min_interval=REFRESH_MIN_SECONDS):
+        """refresh() unless the last one caught up less than ``min_interval`` seconds ago; returns rows added, or None if skipped."""
+        refreshed_at = self._refreshed_at
+        if refreshed_at is not None and self._clock() - refreshed_at < min_interval:
+            return None
+        return self.refresh(store)
+
+    def refreshed_ago(self):
+        """Seconds since the last refresh caught up with the store (None before the first)."""
+        refreshed_at = self._refreshed_at
+        return None if refreshed_at is None else self._clock() - refreshed_at
+
+    def clusters(self, solution=None, categories=(), since=None, until=None, text=None):
+        """Cluster summaries with matching submissions, largest first.
+
+        Filters match like FeedbackStore.query(), at day resolution for the dates; ``text``
+        matches words of the cluster's earliest submission.
+        """
+        words = [word.lower() for word in re.findall(r"\w+", text or "")]
+        with self._lock:
+            summaries = [cluster.summary(categories, since, until) for cluster in self._clusters
+                         if not solution or cluster.solution == solution]
+        summaries = [
+            summary for summary in summaries
+            if summary.size and all(word in summary.feedback.lower() for word in words)
+        ]
+        summaries.sort(key=lambda summary: (summary.size, summary.last_time), reverse=True)
+        return summaries
+
+    def stats(self):
+        with self._lock:
+            return {"records": self._records, "clusters": len(self._clusters), "indexed": len(self._signatures),
+                    "buckets": len(self._buckets)}
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Streaming export of the feedback store to CSV, XLSX or Parquet.
+
+Rows are pulled from the store one solution at a time through
+``iter_records()`` and written out in chunks, so memory stays flat however
+large the history is:
+
+* CSV     - the csv module, row by row
+* XLSX    - openpyxl write-only mode, one sheet per solution (the legacy layout)
+* Parquet - pyarrow ParquetWriter, one row group per chunk (optional dependency)
+
+Also usable from the command line for scheduled dumps:
+
+    python feedback_export.py --format csv --output /exports/feedback.csv
+"""
+import argparse
+import csv
+import io
+import itertools
+import re
+import sys
+from datetime import datetime
+
+from feedback_store import FEEDBACK_COLUMNS, open_feedback_store
+
+EXPORT_COLUMNS = ("Solution",) + FEEDBACK_COLUMNS
+CHUNK_SIZE = 5000
+SHEET_TITLE_LIMIT = 31  # Excel's cap on sheet titles
+_SHEET_TITLE_FORBIDDEN = re.compile(r"[:\\/?*\[\]]")  # Characters Excel refuses in sheet titles
+
+
+def iter_rows(store):
+    """Yield (Solution, Name, Time, Category, Feedback) tuples for every record, solution by solution."""
+    for solution in store.solutions():
+        for record in store.iter_records(solution):
+            yield (solution,) + tuple(record[column] for column in FEEDBACK_COLUMNS)
+
+
+def sheet_title(solution):
+    """The sheet title Excel accepts for ``solution``: forbidden characters replaced, no edge quotes, 31 characters."""
+    title = _SHEET_TITLE_FORBIDDEN.sub("-", solution).strip("'")
+    return title[:SHEET_TITLE_LIMIT].rstrip("'") or "Feedback"
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_csv(store, destination):
+    """Write CSV to a path or a binary file object; returns the number of rows written."""
+    handle = open(destination, "wb") if isinstance(destination, str) else destination
+    text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        count = 0
+        for chunk in _chunks(iter_rows(store)):
+            writer.writerows(chunk)
+            count += len(chunk)
+        text.flush()
+        return count
+    finally:
+        text.detach()  # Leave the caller's file object open
+        if handle is not destination:
+            handle.close()
+
+
+def export_xlsx(store, destination):
+    """Write a workbook with one sheet per solution using openpyxl's write-only (streaming) mode."""
+    from openpyxl import Workbook  # Only needed for XLSX exports
+
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    count = 0
+    for solution in store.solutions():
+        # Cleaned and truncated titles can collide (Excel compares them case-insensitively): keep them unique
+        title = base = sheet_title(solution)
+        suffix = 2
+        while title.casefold() in used_titles:
+            title = f"{base[:SHEET_TITLE_LIMIT - 1 - len(str(suffix))]}~{suffix}"
+            suffix += 1
+        used_titles.add(title.casefold())
+        sheet = workbook.create_sheet(title=title)
+        sheet.append(FEEDBACK_COLUMNS)
+        for record in store.iter_records(solution):
+            sheet.append([record[column] for column in FEEDBACK_COLUMNS])
+            count += 1
+    if not used_titles:
+        workbook.create_sheet(title="Feedback").append(FEEDBACK_COLUMNS)
+    workbook.save(destination)
+    return count
+
+
+def export_parquet(store, destination):
+    """Write Parquet with one row group per CHUNK_SIZE rows (requires pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(destination, schema, compression="zstd") as writer:
+        for chunk in _chunks(iter_rows(store)):
+            columns = list(zip(*chunk))
+            writer.write_table(pa.table({name: list(values) for name, values in zip(EXPORT_COLUMNS, columns)}, schema=schema))
+            count += len(chunk)
+    return count
+
+
+# --- format -> (writer, file suffix, MIME type) ---
+EXPORT_FORMATS = {
+    "csv": (export_csv, ".csv", "text/csv"),
+    "xlsx": (export_xlsx, ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": (export_parquet, ".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def export_feedback(store, fmt, destination):
+    """Export every record in ``fmt`` to ``destination`` (path or binary file object); returns the row count."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Expected one of: {', '.join(EXPORT_FORMATS)}")
+    return EXPORT_FORMATS[fmt][0](store, destination)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export all feedback from the configured store.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--output", help="destination file (default: feedback-<timestamp>.<format>)")
+    parser.add_argument("--backend", help="feedback backend (default: NEXUS_FEEDBACK_BACKEND or sqlite)")
+    parser.add_argument("--path", help="store location (default: NEXUS_FEEDBACK_PATH)")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"feedback-{datetime.now().strftime('%Y%m%d-%H%M%S')}{EXPORT_FORMATS[args.format][1]}"
+    store = open_feedback_store(args.backend, args.path)
+    try:
+        count = export_feedback(store, args.format, output)
+    finally:
+        store.close()
+    print(f"Exported {count} feedback rows to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
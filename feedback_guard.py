@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Admission control for feedback submissions: size caps, rate limits, dedup.
+
+Every submission passes ``FeedbackGuard.check()`` before it reaches the
+writer queue, so the store only grows as fast as the limits allow:
+
+* name and feedback longer than MAX_NAME_CHARS / MAX_FEEDBACK_CHARS are
+  refused (the form enforces the same limits client-side);
+* a token bucket per browser (``browser_id()``: Streamlit's XSRF cookie, which
+  outlives page reloads) and one per client IP bound how often anyone can
+  submit; buckets are kept in LRU order and dropped once idle long enough to
+  be full again, which is indistinguishable from a fresh bucket;
+* identical submissions (same solution, name, category and text after
+  normalizing case and whitespace) are recognized by a content hash and
+  refused for DEDUP_WINDOW_SECONDS. The hash is not the record's idempotency
+  key: once the window has passed the same complaint is stored again, so
+  repeats stay visible to triage.
+
+The duplicate check, recording the hash and spending the tokens happen in one
+step under the guard's lock, so two identical submits racing each other admit
+one. A submission the writer then refuses is ``release()``-d: its tokens are
+refunded and its hash forgotten.
+"""
+import collections
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import NamedTuple, Optional
+
+# --- Limits (overridable per deployment via environment) ---
+MAX_NAME_CHARS = 100
+MAX_FEEDBACK_CHARS = 4000
+SESSION_BURST = int(os.environ.get("NEXUS_FEEDBACK_SESSION_BURST", "3"))
+SESSION_PER_MINUTE = float(os.environ.get("NEXUS_FEEDBACK_SESSION_PER_MINUTE", "1"))
+IP_BURST = int(os.environ.get("NEXUS_FEEDBACK_IP_BURST", "20"))
+IP_PER_MINUTE = float(os.environ.get("NEXUS_FEEDBACK_IP_PER_MINUTE", "10"))
+# X-Forwarded-For entries appended by proxies we trust (Cloud Run's front end appends one)
+TRUSTED_PROXY_HOPS = int(os.environ.get("NEXUS_TRUSTED_PROXY_HOPS", "1"))
+MAX_TRACKED_KEYS = 10000           # Buckets per limiter; least recently used are evicted first
+DEDUP_WINDOW_SECONDS = 24 * 3600
+MAX_TRACKED_HASHES = 50000
+BROWSER_COOKIE = "_streamlit_xsrf"  # Set once per browser by Streamlit while XSRF protection is on (the default)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class FeedbackRejected(ValueError):
+    """A submission refused by the guard; the message is meant for the user."""
+
+
+class Admission(NamedTuple):
+    """What check() charged for a submission, so release() can undo it."""
+    key: str                      # Content hash
+    session_id: Optional[str]
+    client_ip: Optional[str]
+    admitted_at: float
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by an arbitrary string, in one bounded LRU map.
+
+    Each entry is a (tokens, last update) pair; tokens refill continuously at
+    ``per_minute`` up to ``burst``. Not thread-safe: FeedbackGuard serializes.
+    """
+
+    def __init__(self, burst, per_minute, max_keys=MAX_TRACKED_KEYS):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._refill_seconds = burst / self.rate if self.rate else float("inf")
+        self._buckets = collections.OrderedDict()
+
+    def available(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def take(self, key, now):
+        self._buckets[key] = (self.available(key, now) - 1, now)
+        self._buckets.move_to_end(key)
+        self._evict(now)
+
+    def refund(self, key, now):
+        """Give back a token taken for a submission that was not stored (a no-op once the bucket was dropped)."""
+        if key in self._buckets:
+            self._buckets[key] = (min(self.burst, self.available(key, now) + 1), now)
+
+    def retry_after(self, key, now):
+        """Seconds until ``key`` has a whole token again."""
+        missing = 1 - self.available(key, now)
+        return max(0.0, missing / self.rate) if self.rate else float("inf")
+
+    def _evict(self, now):
+        buckets = self._buckets
+        while buckets:
+            _, updated = next(iter(buckets.values()))
+            if len(buckets) <= self.max_keys and now - updated < self._refill_seconds:
+                return
+            buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def client_address(forwarded_for, trusted_hops=TRUSTED_PROXY_HOPS):
+    """The client IP from an X-Forwarded-For header, or None.
+
+    Entries left of the ones our own proxies appended are client-supplied and
+    cannot be trusted, so the address is taken ``trusted_hops`` from the right.
+    """
+    hops = [hop.strip() for hop in (forwarded_for or "").split(",") if hop.strip()]
+    if not hops or trusted_hops < 1:
+        return None
+    return hops[max(0, len(hops) - trusted_hops)]
+
+
+def browser_id(cookies, cookie_name=BROWSER_COOKIE):
+    """A stable id for the browser behind ``cookies`` (a mapping, e.g. st.context.cookies), or None.
+
+    Streamlit sets its XSRF cookie once per browser, but re-masks it whenever it
+    sends it again (tornado's "2|mask|masked token|time" format), so the id is
+    derived from the unmasked token. A page reload keeps it; clearing cookies
+    does not, which the per-IP bucket still bounds.
+    """
+    value = cookies.get(cookie_name) if cookies else None
+    if not value:
+        return None
+    parts = value.split("|")
+    try:
+        if parts[0] == "2" and len(parts) == 4:
+            mask, masked = bytes.fromhex(parts[1]), bytes.fromhex(parts[2])
+            token = bytes(byte ^ mask[index % len(mask)] for index, byte in enumerate(masked))
+        else:
+            token = value.encode("utf-8")  # Version 1 cookies hold the token itself
+    except (ValueError, ZeroDivisionError):
+        return None
+    return hashlib.blake2b(token, digest_size=12).hexdigest()
+
+
+def content_hash(solution, name, category, feedback):
+    """Stable hash of a submission's content, insensitive to case and whitespace."""
+    normalized = "\x1f".join(_WHITESPACE.sub(" ", part).strip().casefold() for part in (solution, name, category, feedback))
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FeedbackGuard:
+    """Thread-safe admission check shared by every session in the process."""
+
+    def __init__(self, session_limiter=None, ip_limiter=None, dedup_window=DEDUP_WINDOW_SECONDS,
+                 max_hashes=MAX_TRACKED_HASHES, clock=time.monotonic):
+        # Not `or`: a limiter with no buckets yet is falsy (__len__)
+        self.session_limiter = session_limiter if session_limiter is not None else TokenBucketLimiter(SESSION_BURST, SESSION_PER_MINUTE)
+        self.ip_limiter = ip_limiter if ip_limiter is not None else TokenBucketLimiter(IP_BURST, IP_PER_MINUTE)
+        self.dedup_window = dedup_window
+        self.max_hashes = max_hashes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._recent = collections.OrderedDict()  # content hash -> time it was accepted
+        self._refused = collections.Counter()
+
+    def check(self, session_id, client_ip, solution, name, category, feedback):
+        """Admit a submission and return its Admission, or raise FeedbackRejected.
+
+        Size and duplicate checks cost nothing; every submission that gets past
+        them spends a token from the session's bucket and the client IP's and is
+        recorded for the dedup window, all under one lock hold. Call release() if
+        it is not stored after all.
+        """
+        if len(name) > MAX_NAME_CHARS or len(feedback) > MAX_FEEDBACK_CHARS:
+            self._refuse("too_long")
+            raise FeedbackRejected(f"Please keep your name under {MAX_NAME_CHARS} and your feedback under {MAX_FEEDBACK_CHARS} characters.")
+        key = content_hash(solution, name, category, feedback)
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            if key in self._recent:
+                self._refused["duplicate"] += 1
+                raise FeedbackRejected("We already received this exact feedback. Thank you!")
+            limited = [(limiter, bucket) for limiter, bucket in ((self.session_limiter, session_id), (self.ip_limiter, client_ip))
+                       if bucket is not None and limiter.available(bucket, now) < 1]
+            if limited:
+                self._refused["rate_limited"] += 1
+                wait = max(limiter.retry_after(bucket, now) for limiter, bucket in limited)
+                raise FeedbackRejected(f"You are sending feedback too quickly. Please try again in {wait:.0f} seconds.")
+            for limiter, bucket in ((self.session_limiter, session_id), (self.ip_limiter, client_ip)):
+                if bucket is not None:
+                    limiter.take(bucket, now)
+            self._recent[key] = now
+        return Admission(key, session_id, client_ip, now)
+
+    def release(self, admission):
+        """Undo check() for a submission that was not stored: refund its tokens and forget its hash."""
+        now = self._clock()
+        with self._lock:
+            if self._recent.get(admission.key) == admission.admitted_at:
+                del self._recent[admission.key]
+            for limiter, bucket in ((self.session_limiter, admission.session_id), (self.ip_limiter, admission.client_ip)):
+                if bucket is not None:
+                    limiter.refund(bucket, now)
+            self._refused["not_stored"] += 1
+
+    def _expire(self, now):
+        recent = self._recent
+        while recent:
+            accepted_at = next(iter(recent.values()))
+            if len(recent) <= self.max_hashes and now - accepted_at < self.dedup_window:
+                return
+            recent.popitem(last=False)
+
+    def _refuse(self, reason):
+        with self._lock:
+            self._refused[reason] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions_tracked": len(self.session_limiter),
+                "ips_tracked": len(self.ip_limiter),
+                "hashes_tracked": len(self._recent),
+                "refused": dict(self._refused),
+            }
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""One-off migration of the legacy ``feedback.xlsx`` into the feedback store.
+
+    python feedback_migrate.py feedback.xlsx [--backend sqlite] [--path feedback.db]
+    python feedback_migrate.py feedback.xlsx --verify-only
+
+The old ``feedback_form()`` kept one sheet per solution (Name, Time, Category,
+Feedback). Each sheet is streamed with openpyxl in read-only mode and written
+to the configured store in batches of ``--batch-size`` rows, one transaction
+per batch, so memory stays flat however large the workbook is.
+
+Resumable: after every committed batch the sheet's position is saved to a
+checkpoint file next to the workbook, and a rerun continues from there. Every
+migrated row carries a deterministic idempotency key (sheet + row number), so
+a batch that committed just before a crash is a no-op when it is replayed.
+
+Verified: per sheet, the row count and an order-independent checksum of the
+rows read from the workbook are compared with the rows the store holds under
+that sheet's keys. Exits non-zero on any mismatch.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+from catalog import DEFAULT_CATALOG_PATH, CatalogError, load_catalog
+from feedback_export import sheet_title
+from feedback_store import FEEDBACK_COLUMNS, IDEMPOTENCY_KEY, TIME_FORMAT, open_feedback_store
+
+BATCH_SIZE = 5000
+CHECKSUM_MODULUS = 1 << 64
+CHECKPOINT_VERSION = 1
+HEADER_ROW = 1
+
+
+# --- Reading the legacy workbook ---
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).strftime(TIME_FORMAT)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def sheet_columns(worksheet):
+    """Map each FEEDBACK_COLUMNS name to its 0-based position in the sheet's header row (None if absent)."""
+    header = next(worksheet.iter_rows(min_row=HEADER_ROW, max_row=HEADER_ROW, values_only=True), ())
+    positions = {_cell_text(value).strip().lower(): index for index, value in enumerate(header)}
+    columns = {column: positions.get(column.lower()) for column in FEEDBACK_COLUMNS}
+    if columns["Feedback"] is None:
+        raise ValueError(f"Sheet '{worksheet.title}' has no Feedback column in row {HEADER_ROW}")
+    return columns
+
+
+def iter_sheet_records(worksheet, columns, start_row):
+    """Yield (row number, record) for the non-empty rows of a sheet from ``start_row`` on."""
+    for row_number, values in enumerate(worksheet.iter_rows(min_row=start_row, values_only=True), start_row):
+        if not any(value is not None and str(value).strip() for value in values):
+            continue
+        yield row_number, {
+            column: _cell_text(values[position]) if position is not None and position < len(values) else ""
+            for column, position in columns.items()
+        }
+
+
+def sheet_solution(title, solution_names):
+    """The solution a sheet belongs to: its title, or the one catalog name whose sheet_title() it is (cleaned, truncated)."""
+    if title in solution_names:
+        return title
+    matches = [name for name in solution_names if sheet_title(name) == title]
+    return matches[0] if len(matches) == 1 else title
+
+
+def sheet_key_prefix(title):
+    return f"xlsx:{hashlib.blake2b(title.encode('utf-8'), digest_size=4).hexdigest()}:"
+
+
+# --- Checksums ---
+def row_digest(solution, record):
+    """64-bit hash of one row; a sheet's checksum is the sum of these, so row order does not matter."""
+    data = "\x1f".join((solution,) + tuple(record[column] for column in FEEDBACK_COLUMNS)).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def _add(checksum, solution, record):
+    return (checksum + row_digest(solution, record)) % CHECKSUM_MODULUS
+
+
+# --- Checkpoint ---
+def _source_identity(workbook_path):
+    stat = os.stat(workbook_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_checkpoint(checkpoint_path, workbook_path):
+    """The saved progress for this workbook, or a fresh one if there is none or the workbook changed."""
+    source = _source_identity(workbook_path)
+    try:
+        checkpoint = json.loads(Path(checkpoint_path).read_text())
+    except (FileNotFoundError, ValueError):
+        checkpoint = None
+    if not checkpoint or checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint.get("source") != source:
+        checkpoint = {"version": CHECKPOINT_VERSION, "source": source, "sheets": {}}
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    # Write-then-rename: an interrupted save leaves the previous checkpoint intact
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+
+# --- Migration ---
+def migrate(workbook_path, store, checkpoint_path, batch_size=BATCH_SIZE, solution_names=(), log=print):
+    """Copy every sheet into ``store``, resuming from ``checkpoint_path``; returns the final checkpoint."""
+    from openpyxl import load_workbook  # Only needed for the migration
+
+    checkpoint = load_checkpoint(checkpoint_path, workbook_path)
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            title = worksheet.title
+            state = checkpoint["sheets"].setdefault(title, {
+                "solution": sheet_solution(title, solution_names),
+                "next_row": HEADER_ROW + 1,
+                "rows": 0,
+                "checksum": f"{0:016x}",
+                "done": False,
+            })
+            if state["done"]:
+                log(f"{title}: already migrated ({state['rows']} rows)")
+                continue
+            if state["rows"]:
+                log(f"{title}: resuming at row {state['next_row']} ({state['rows']} rows already migrated)")
+            worksheet.reset_dimensions()  # Some writers record a wrong used range; read until the last row instead
+            solution, prefix = state["solution"], sheet_key_prefix(title)
+            started = time.perf_counter()
+            batch = []
+
+            def commit(batch):
+                store.append_many([(solution, dict(record, **{IDEMPOTENCY_KEY: f"{prefix}{row}"})) for row, record in batch])
+                checksum = int(state["checksum"], 16)
+                for _, record in batch:
+                    checksum = _add(checksum, solution, record)
+                state.update(next_row=batch[-1][0] + 1, rows=state["rows"] + len(batch), checksum=f"{checksum:016x}")
+                save_checkpoint(checkpoint_path, checkpoint)
+
+            for row_number, record in iter_sheet_records(worksheet, sheet_columns(worksheet), state["next_row"]):
+                batch.append((row_number, record))
+                if len(batch) >= batch_size:
+                    commit(batch)
+                    batch = []
+            if batch:
+                commit(batch)
+            state["done"] = True
+            save_checkpoint(checkpoint_path, checkpoint)
+            log(f"{title} -> {solution}: {state['rows']} rows in {time.perf_counter() - started:.1f} s")
+    finally:
+        workbook.close()
+    return checkpoint
+
+
+# --- Verification ---
+def source_tallies(workbook_path, solution_names=()):
+    """{sheet title: (solution, rows, checksum hex)} re-read from the workbook, independent of any checkpoint."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    tallies = {}
+    try:
+        for worksheet in workbook.worksheets:
+            worksheet.reset_dimensions()
+            solution = sheet_solution(worksheet.title, solution_names)
+            rows, checksum = 0, 0
+            for _, record in iter_sheet_records(worksheet, sheet_columns(worksheet), HEADER_ROW + 1):
+                rows += 1
+                checksum = _add(checksum, solution, record)
+            tallies[worksheet.title] = (solution, rows, f"{checksum:016x}")
+    finally:
+        workbook.close()
+    return tallies
+
+
+def store_tally(store, title, solution):
+    """(rows, checksum hex) of the records the store holds under one sheet's keys."""
+    prefix = sheet_key_prefix(title)
+    rows, checksum = 0, 0
+    for key, record in store.iter_keyed_records(solution):
+        if key and key.startswith(prefix):
+            rows += 1
+            checksum = _add(checksum, solution, record)
+    return rows, f"{checksum:016x}"
+
+
+def verify(store, tallies, log=print):
+    """Compare source tallies with the store; returns True when every sheet matches."""
+    ok = True
+    for title, (solution, rows, checksum) in tallies.items():
+        stored_rows, stored_checksum = store_tally(store, title, solution)
+        match = (stored_rows, stored_checksum) == (rows, checksum)
+        ok = ok and match
+        log(f"{'OK      ' if match else 'MISMATCH'} {title}: workbook {rows} rows / {checksum}, "
+            f"store {stored_rows} rows / {stored_checksum}")
+    return ok
+
+
+def _solution_names(catalog_path):
+    try:
+        return load_catalog(catalog_path).names
+    except CatalogError as e:
+        print(f"Catalog unavailable ({e}); sheet titles are used as solution names", file=sys.stderr)
+        return ()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the legacy multi-sheet feedback.xlsx into the feedback store.")
+    parser.add_argument("workbook", help="legacy workbook (one sheet per solution)")
+    parser.add_argument("--backend", help="feedback backend (default: NEXUS_FEEDBACK_BACKEND or sqlite)")
+    parser.add_argument("--path", help="store location (default: NEXUS_FEEDBACK_PATH)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--checkpoint", help="progress file (default: <workbook>.migration.json)")
+    parser.add_argument("--catalog", default=os.environ.get("NEXUS_CATALOG_PATH") or DEFAULT_CATALOG_PATH,
+                        help="solutions catalog, used to recover sheet names Excel truncated")
+    parser.add_argument("--verify-only", action="store_true", help="only compare the workbook with the store")
+    args = parser.parse_args(argv)
+
+    solution_names = _solution_names(args.catalog)
+    store = open_feedback_store(args.backend, args.path)
+    try:
+        started = time.perf_counter()
+        if args.verify_only:
+            tallies = source_tallies(args.workbook, solution_names)
+        else:
+            checkpoint_path = args.checkpoint or f"{args.workbook}.migration.json"
+            checkpoint = migrate(args.workbook, store, checkpoint_path, args.batch_size, solution_names)
+            tallies = {title: (state["solution"], state["rows"], state["checksum"]) for title, state in checkpoint["sheets"].items()}
+            print(f"Migrated {sum(rows for _, rows, _ in tallies.values())} rows from {len(tallies)} sheets "
+                  f"in {time.perf_counter() - started:.1f} s")
+        ok = verify(store, tallies)
+    finally:
+        store.close()
+    print("Verification passed" if ok else "Verification FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""Append-only feedback storage for Phronesis Nexus.
+
+Each submission is a single append (O(1)) instead of the old read-modify-write
+of a whole ``feedback.xlsx`` sheet. The Excel workbook is now an export that is
+generated on demand from whichever store is configured.
+
+SQLite and JSONL keep feedback on the local disk; the PostgreSQL backend is
+shared by every instance of a scaled-out deployment (see shared_storage.py).
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from shared_storage import PostgresConnection, warn_if_instance_local
+
+# --- Record layout (matches the columns of the legacy feedback.xlsx sheets) ---
+FEEDBACK_COLUMNS = ("Name", "Time", "Category", "Feedback")
+FEEDBACK_CATEGORIES = ("Status Inactive", "Urgent Fix", "New features request", "General feedback")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # Lexicographic order of this format is chronological order
+# Optional record field: a store keeps only the first record written with a given key,
+# so a retried write (or a rerun that resubmits the same form) never duplicates feedback
+IDEMPOTENCY_KEY = "Key"
+
+# --- Backend selection (overridable per deployment via environment) ---
+DEFAULT_BACKEND = "sqlite"
+DEFAULT_LOCATIONS = {
+    "sqlite": "feedback.db",
+    "jsonl": "feedback",
+    "postgres": None,  # A postgresql:// URL must be configured
+}
+
+
+class FeedbackStore:
+    """Interface every feedback backend implements."""
+
+    def append(self, solution, record):
+        """Persist one feedback record (a dict keyed by FEEDBACK_COLUMNS) for a solution."""
+        raise NotImplementedError
+
+    def append_many(self, items):
+        """Persist several (solution, record) pairs; backends override this to write them in one go."""
+        for solution, record in items:
+            self.append(solution, record)
+
+    def solutions(self):
+        """Return the names of all solutions that have feedback, sorted."""
+        raise NotImplementedError
+
+    def iter_records(self, solution):
+        """Yield the records for one solution in submission order."""
+        for _, record in self.iter_keyed_records(solution):
+            yield record
+
+    def iter_keyed_records(self, solution):
+        """Yield (idempotency key or None, record) pairs for one solution in submission order."""
+        raise NotImplementedError
+
+    def query(self, solution=None, categories=(), since=None, until=None, text=None, before=None, limit=50):
+        """One page of feedback across solutions, newest first.
+
+        ``since``/``until`` bound Time (TIME_FORMAT strings, until exclusive), ``text``
+        matches words in the feedback or name, and ``before`` is the cursor returned
+        with the previous page (keyset pagination). Returns (rows, next_cursor); rows
+        are dicts with "id" and "Solution" plus FEEDBACK_COLUMNS, next_cursor is None
+        on the last page.
+
+        This fallback scans every record; indexed backends override it.
+        """
+        words = [word.lower() for word in re.findall(r"\w+", text or "")]
+        matches = []
+        for name in ([solution] if solution else self.solutions()):
+            for row_id, record in enumerate(self.iter_records(name)):
+                if categories and record["Category"] not in categories:
+                    continue
+                if (since and record["Time"] < since) or (until and record["Time"] >= until):
+                    continue
+                haystack = f"{record['Feedback']} {record['Name']}".lower()
+                if any(word not in haystack for word in words):
+                    continue
+                matches.append(dict(record, id=f"{name}:{row_id}", Solution=name))
+        matches.sort(key=lambda row: (row["Time"], row["id"]), reverse=True)
+        if before:
+            matches = [row for row in matches if (row["Time"], row["id"]) < tuple(before)]
+        page = matches[:limit]
+        next_cursor = (page[-1]["Time"], page[-1]["id"]) if len(matches) > limit else None
+        return page, next_cursor
+
+    def read_after(self, cursor=None, limit=1000):
+        """Up to ``limit`` rows stored after ``cursor``, in storage order, and the cursor to pass next time.
+
+        Rows are the dicts query() returns. The cursor is opaque and follows the
+        order rows were stored in, not their Time, so rows written late with an
+        older Time (imports, skewed clocks) are still read once. None starts at
+        the first row.
+
+        This fallback counts the records already read per solution and skips that
+        many again; backends with an increasing row id override it.
+        """
+        done = dict(cursor or ())
+        rows = []
+        for name in self.solutions():
+            if len(rows) >= limit:
+                break
+            start = done.get(name, 0)
+            for index, record in enumerate(itertools.islice(self.iter_records(name), start, start + limit - len(rows)), start):
+                rows.append(dict(record, id=f"{name}:{index}", Solution=name))
+                done[name] = index + 1
+        return rows, tuple(sorted(done.items()))
+
+    def close(self):
+        pass
+
+
+def _query_filters(solution, categories, since, until, before, mark="?"):
+    """WHERE clauses and parameters shared by the SQL backends' query() (text search is backend-specific)."""
+    clauses, params = [], []
+    if solution:
+        clauses.append(f"solution = {mark}")
+        params.append(solution)
+    if categories:
+        clauses.append(f"category IN ({', '.join([mark] * len(categories))})")
+        params.extend(categories)
+    if since:
+        clauses.append(f"time >= {mark}")
+        params.append(since)
+    if until:
+        clauses.append(f"time < {mark}")
+        params.append(until)
+    if before:
+        clauses.append(f"(time, id) < ({mark}, {mark})")
+        params.extend(before)
+    return clauses, params
+
+
+def _rows_after(rows, cursor):
+    """read_after() result for SQL rows selected ``WHERE id > cursor ORDER BY id``."""
+    page = [{"id": row_id, "Solution": solution_name, **dict(zip(FEEDBACK_COLUMNS, values))} for row_id, solution_name, *values in rows]
+    return page, page[-1]["id"] if page else cursor
+
+
+def _page(rows, limit):
+    page = [
+        {"id": row_id, "Solution": solution_name, **dict(zip(FEEDBACK_COLUMNS, values))}
+        for row_id, solution_name, *values in rows[:limit]
+    ]
+    next_cursor = (page[-1]["Time"], page[-1]["id"]) if len(rows) > limit else None
+    return page, next_cursor
+
+
+class SQLiteFeedbackStore(FeedbackStore):
+    """Single-table SQLite store in WAL mode; appends never rewrite existing rows."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        # Streamlit runs every session on its own thread, so the connection is shared
+        # and serialized through self._lock rather than bound to one thread.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                solution TEXT NOT NULL,
+                name TEXT NOT NULL,
+                time TEXT NOT NULL,
+                category TEXT NOT NULL,
+                feedback TEXT NOT NULL,
+                key TEXT
+            )
+            """
+        )
+        if "key" not in {row[1] for row in self._conn.execute("PRAGMA table_info(feedback)")}:
+            self._conn.execute("ALTER TABLE feedback ADD COLUMN key TEXT")  # Databases created before idempotency keys
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS feedback_key ON feedback (key)")
+        # Indexes for the admin queries: every filter combination reads newest-first by (time, id)
+        self._conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS feedback_time ON feedback (time, id);
+            CREATE INDEX IF NOT EXISTS feedback_solution_time ON feedback (solution, time, id);
+            CREATE INDEX IF NOT EXISTS feedback_category_time ON feedback (category, time, id);
+            """
+        )
+        self.full_text = self._init_full_text()
+        self._local = threading.local()
+
+    def _init_full_text(self):
+        """FTS5 index over feedback text and name, kept in sync by trigger; False if SQLite lacks FTS5."""
+        try:
+            exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback_fts'").fetchone()
+            self._conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts
+                    USING fts5(feedback, name, content='feedback', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON feedback BEGIN
+                    INSERT INTO feedback_fts (rowid, feedback, name) VALUES (new.id, new.feedback, new.name);
+                END;
+                """
+            )
+            if not exists:
+                # Index rows written before the full-text table existed
+                self._conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _reader(self):
+        """Per-thread read connection; WAL lets these read while the writer commits."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+
+    _INSERT = (
+        "INSERT INTO feedback (solution, name, time, category, feedback, key) VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (key) DO NOTHING"
+    )
+
+    @staticmethod
+    def _row(solution, record):
+        return (solution, record["Name"], record["Time"], record["Category"], record["Feedback"], record.get(IDEMPOTENCY_KEY))
+
+    def append(self, solution, record):
+        with self._lock:
+            self._conn.execute(self._INSERT, self._row(solution, record))
+
+    def append_many(self, items):
+        rows = [self._row(solution, record) for solution, record in items]
+        with self._lock:
+            # One transaction (and one WAL sync) for the whole batch
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(self._INSERT, rows)
+
+    def solutions(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT solution FROM feedback ORDER BY solution").fetchall()
+        return [row[0] for row in rows]
+
+    def iter_keyed_records(self, solution):
+        # A separate read cursor keeps the writer lock free while an export streams rows.
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(
+                "SELECT key, name, time, category, feedback FROM feedback WHERE solution = ? ORDER BY id",
+                (solution,),
+            )
+            for row in cursor:
+                yield row[0], dict(zip(FEEDBACK_COLUMNS, row[1:]))
+        finally:
+            conn.close()
+
+    def query(self, solution=None, categories=(), since=None, until=None, text=None, before=None, limit=50):
+        clauses, params = _query_filters(solution, categories, since, until, before)
+        words = re.findall(r"\w+", text or "")
+        if words and self.full_text:
+            clauses.append("id IN (SELECT rowid FROM feedback_fts WHERE feedback_fts MATCH ?)")
+            params.append(" ".join(f'"{word}"*' for word in words))  # Every word, as a prefix
+        elif words:
+            for word in words:
+                clauses.append("(feedback LIKE ? OR name LIKE ?)")
+                params.extend([f"%{word}%"] * 2)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._reader().execute(
+            f"SELECT id, solution, name, time, category, feedback FROM feedback {where} "
+            "ORDER BY time DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        return _page(rows, limit)
+
+    def read_after(self, cursor=None, limit=1000):
+        rows = self._reader().execute(
+            "SELECT id, solution, name, time, category, feedback FROM feedback WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor or 0, limit),
+        ).fetchall()
+        return _rows_after(rows, cursor)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _slug(solution):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", solution).strip("_")
+
+
+class JsonlFeedbackStore(FeedbackStore):
+    """One append-only JSON Lines log per solution inside a directory.
+
+    Logs are named after a slug of the solution plus a hash of its exact name,
+    so "A/B" and "A B" never share one. Logs written before the hash (named by
+    the slug alone, possibly shared) are still read, filtered by their records'
+    Solution.
+    """
+
+    _HASHED_NAME = re.compile(r".*-[0-9a-f]{12}\.jsonl")
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_name(solution):
+        digest = hashlib.blake2b(solution.encode("utf-8"), digest_size=6).hexdigest()
+        return f"{_slug(solution)}-{digest}.jsonl"
+
+    @staticmethod
+    def _legacy_file_name(solution):
+        return _slug(solution) + ".jsonl"
+
+    def append(self, solution, record):
+        self.append_many([(solution, record)])
+
+    def append_many(self, items):
+        lines_by_file = {}
+        for solution, record in items:
+            line = json.dumps(dict(record, Solution=solution), ensure_ascii=False) + "\n"
+            lines_by_file.setdefault(self._file_name(solution), []).append(line)
+        with self._lock:
+            for file_name, lines in lines_by_file.items():
+                # O_APPEND keeps each write at the end of the log even if another process appends too.
+                with open(self.directory / file_name, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+
+    def solutions(self):
+        names = set()
+        for log_path in self.directory.glob("*.jsonl"):
+            with open(log_path, encoding="utf-8") as f:
+                if self._HASHED_NAME.fullmatch(log_path.name):
+                    first_line = f.readline()  # One solution per log
+                    if first_line:
+                        names.add(json.loads(first_line)["Solution"])
+                else:
+                    names.update(json.loads(line)["Solution"] for line in f if line.strip())
+        return sorted(names)
+
+    def iter_keyed_records(self, solution):
+        seen_keys = set()
+        # The legacy log holds the older records, so it is read first
+        for file_name in dict.fromkeys((self._legacy_file_name(solution), self._file_name(solution))):
+            log_path = self.directory / file_name
+            if not log_path.exists():
+                continue
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("Solution", solution) != solution:
+                        continue  # Another solution whose name mapped to the same legacy log
+                    key = data.get(IDEMPOTENCY_KEY)
+                    if key:
+                        if key in seen_keys:
+                            continue  # A retried append; the first copy wins
+                        seen_keys.add(key)
+                    yield key, {column: data.get(column, "") for column in FEEDBACK_COLUMNS}
+
+
+class PostgresFeedbackStore(FeedbackStore):
+    """Shared PostgreSQL table for deployments that run several instances (e.g. Cloud SQL).
+
+    Same layout and indexes as the SQLite store. Batches are written in one
+    transaction and the unique idempotency key turns a retried batch into a
+    no-op. Requires psycopg 3.
+    """
+
+    def __init__(self, dsn):
+        self._db = PostgresConnection(dsn)
+        with self._db.lock:
+            self._db.get().execute(
+                """
+                CREATE TABLE IF NOT EXISTS feedback (
+                    id BIGSERIAL PRIMARY KEY,
+                    solution TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    feedback TEXT NOT NULL,
+                    key TEXT UNIQUE
+                );
+                CREATE INDEX IF NOT EXISTS feedback_time ON feedback (time, id);
+                CREATE INDEX IF NOT EXISTS feedback_solution_time ON feedback (solution, time, id);
+                CREATE INDEX IF NOT EXISTS feedback_category_time ON feedback (category, time, id);
+                CREATE INDEX IF NOT EXISTS feedback_search ON feedback
+                    USING GIN (to_tsvector('simple', feedback || ' ' || name));
+                """
+            )
+
+    _INSERT = (
+        "INSERT INTO feedback (solution, name, time, category, feedback, key) VALUES (%s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (key) DO NOTHING"
+    )
+
+    def append(self, solution, record):
+        self.append_many([(solution, record)])
+
+    def append_many(self, items):
+        rows = [SQLiteFeedbackStore._row(solution, record) for solution, record in items]
+        with self._db.lock:
+            conn = self._db.get()
+            with conn.transaction(), conn.cursor() as cursor:
+                cursor.executemany(self._INSERT, rows)
+
+    def solutions(self):
+        with self._db.lock:
+            rows = self._db.get().execute("SELECT DISTINCT solution FROM feedback ORDER BY solution").fetchall()
+        return [row[0] for row in rows]
+
+    def iter_keyed_records(self, solution):
+        # Server-side cursor on its own connection: rows arrive in batches, never all at once
+        with self._db.connect() as conn, conn.cursor(name="feedback_export") as cursor:
+            cursor.execute(
+                "SELECT key, name, time, category, feedback FROM feedback WHERE solution = %s ORDER BY id",
+                (solution,),
+            )
+            for row in cursor:
+                yield row[0], dict(zip(FEEDBACK_COLUMNS, row[1:]))
+
+    def query(self, solution=None, categories=(), since=None, until=None, text=None, before=None, limit=50):
+        clauses, params = _query_filters(solution, categories, since, until, before, mark="%s")
+        words = re.findall(r"\w+", text or "")
+        if words:
+            clauses.append("to_tsvector('simple', feedback || ' ' || name) @@ to_tsquery('simple', %s)")
+            params.append(" & ".join(f"{word}:*" for word in words))  # Every word, as a prefix
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db.lock:
+            rows = self._db.get().execute(
+                f"SELECT id, solution, name, time, category, feedback FROM feedback {where} "
+                "ORDER BY time DESC, id DESC LIMIT %s",
+                (*params, limit + 1),
+            ).fetchall()
+        return _page(rows, limit)
+
+    def read_after(self, cursor=None, limit=1000):
+        with self._db.lock:
+            rows = self._db.get().execute(
+                "SELECT id, solution, name, time, category, feedback FROM feedback WHERE id > %s ORDER BY id LIMIT %s",
+                (cursor or 0, limit),
+            ).fetchall()
+        return _rows_after(rows, cursor)
+
+    def close(self):
+        self._db.close()
+
+
+BACKENDS = {
+    "sqlite": SQLiteFeedbackStore,
+    "jsonl": JsonlFeedbackStore,
+    "postgres": PostgresFeedbackStore,
+}
+
+
+def open_feedback_store(backend=None, location=None):
+    """Open the configured feedback store (NEXUS_FEEDBACK_BACKEND / NEXUS_FEEDBACK_PATH)."""
+    backend = (backend or os.environ.get("NEXUS_FEEDBACK_BACKEND", DEFAULT_BACKEND)).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown feedback backend '{backend}'. Expected one of: {', '.join(BACKENDS)}")
+    location = location or os.environ.get("NEXUS_FEEDBACK_PATH", DEFAULT_LOCATIONS[backend])
+    if not location:
+        raise ValueError(f"The '{backend}' feedback backend needs NEXUS_FEEDBACK_PATH set to a connection URL")
+    warn_if_instance_local("Feedback", location)
+    return BACKENDS[backend](location)
+
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Single-writer queue in front of the feedback store.
+
+Every Streamlit session in a process hands its submission to one background
+thread, which owns the store and drains a bounded in-memory queue in batches.
+Sessions never touch the store concurrently and never wait on disk I/O unless
+they choose to wait on the Receipt submit() returns.
+
+A batch still failing after DEFAULT_RETRIES attempts is not silently lost: its
+submissions are kept (up to MAX_FAILED_KEPT) for the admin view, which shows
+the error and can queue them again. Their idempotency keys make that safe even
+if a failed attempt did reach the store.
+"""
+import collections
+import logging
+import queue
+import threading
+import time
+
+from feedback_store import IDEMPOTENCY_KEY
+from shared_storage import new_idempotency_key
+
+logger = logging.getLogger(__name__)
+
+# --- Writer tuning ---
+DEFAULT_MAX_QUEUE = 1000   # Submissions held in memory before submit() starts refusing
+DEFAULT_MAX_BATCH = 200    # Submissions written to the store in one transaction
+DEFAULT_RETRIES = 3        # Attempts per batch before it is dropped and counted as failed
+RETRY_BACKOFF_SECONDS = 0.5
+MAX_FAILED_KEPT = 1000     # Dropped submissions held for the admin to retry; older ones are only counted
+
+_STOP = object()
+
+
+class Receipt:
+    """Returned by submit() for a queued submission; wait() tells whether it reached the store."""
+
+    __slots__ = ("_done", "written")
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.written = None
+
+    def _settle(self, written):
+        self.written = written
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """True once written, False if it was dropped after the retries, None if still pending after ``timeout``."""
+        self._done.wait(timeout)
+        return self.written
+
+
+class FeedbackWriter:
+    """Background thread that owns a FeedbackStore and writes submissions in batches."""
+
+    def __init__(self, store, max_queue=DEFAULT_MAX_QUEUE, max_batch=DEFAULT_MAX_BATCH, on_flush=None):
+        self.store = store
+        self.max_batch = max_batch
+        self.on_flush = on_flush  # Optional callback(batch_size, elapsed_ms) after each successful write
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._written = 0
+        self._rejected = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._failed_items = collections.deque(maxlen=MAX_FAILED_KEPT)  # (solution, record) of dropped batches
+        self._last_error = None
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, solution, record):
+        """Queue one submission and return its Receipt immediately.
+
+        Returns False when the queue is full so the caller can ask the user to retry.
+        Records without an idempotency key get one, so batch retries cannot duplicate them.
+        """
+        if not record.get(IDEMPOTENCY_KEY):
+            record = dict(record, **{IDEMPOTENCY_KEY: new_idempotency_key()})
+        receipt = Receipt()
+        try:
+            self._queue.put_nowait((solution, record, receipt))
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            return False
+        with self._stats_lock:
+            self._submitted += 1
+        return receipt
+
+    def failed(self):
+        """(kept dropped submissions as (solution, record) pairs, the last write error) for the admin view."""
+        with self._stats_lock:
+            return list(self._failed_items), self._last_error
+
+    def retry_failed(self):
+        """Queue the kept dropped submissions again; returns how many were queued (the rest stay kept)."""
+        with self._stats_lock:
+            items = list(self._failed_items)
+            self._failed_items.clear()
+        queued = 0
+        for solution, record in items:
+            if not self.submit(solution, record):
+                with self._stats_lock:
+                    self._failed_items.append((solution, record))
+                continue
+            queued += 1
+        return queued
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written (or timeout expires).
+
+        Returns True if the queue drained in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=5.0):
+        """Drain pending submissions and stop the writer thread, giving up after ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)  # A full queue must not hang shutdown
+        except queue.Full:
+            logger.warning("Feedback writer still had %d submissions queued at shutdown", self._queue.qsize())
+            return
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        """Snapshot of queue depth, throughput counters and flush latency (milliseconds)."""
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "submitted": self._submitted,
+                "written": self._written,
+                "rejected": self._rejected,
+                "failed": self._failed,
+                "failed_kept": len(self._failed_items),
+                "batches": self._batches,
+                "last_flush_ms": round(self._last_flush_ms, 2),
+                "avg_flush_ms": round(self._total_flush_ms / self._batches, 2) if self._batches else 0.0,
+                "max_flush_ms": round(self._max_flush_ms, 2),
+            }
+
+    # --- Writer thread ---
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting so bursts become one write
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
+            items = [item for item in batch if item is not _STOP]
+            if items:
+                self._write(items)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, items):
+        pairs = [(solution, record) for solution, record, _ in items]
+        for attempt in range(1, DEFAULT_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                self.store.append_many(pairs)
+            except Exception as e:
+                logger.exception("Feedback batch of %d failed (attempt %d/%d)", len(items), attempt, DEFAULT_RETRIES)
+                error = f"{type(e).__name__}: {e}"
+                if attempt < DEFAULT_RETRIES:
+                    time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._stats_lock:
+                self._written += len(items)
+                self._batches += 1
+                self._last_flush_ms = elapsed_ms
+                self._total_flush_ms += elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            if self.on_flush is not None:
+                self.on_flush(len(items), elapsed_ms)
+            for _, _, receipt in items:
+                receipt._settle(True)
+            return
+        with self._stats_lock:
+            self._failed += len(items)
+            self._failed_items.extend(pairs)
+            self._last_error = error
+        for _, _, receipt in items:
+            receipt._settle(False)
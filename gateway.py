@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""Optional reverse-proxy gateway: every tool served under the hub's own origin.
+
+    python gateway.py [--host 0.0.0.0] [--port 8080] [--portal http://127.0.0.1:8501]
+
+Routes:
+
+* ``/tools/<slug>/...`` - proxied to that solution's ``link`` (slug as in
+  catalog.slugify; the catalog is hot-reloaded like the portal's)
+* ``/_gateway/metrics`` - Prometheus text: per-route latency histograms,
+  response counts by status class and upstream errors
+* ``/_gateway/open/<slug>`` - records a tool open (analytics.py, when the
+  gateway has a recorder) and redirects to ``/tools/<slug>/``: the portal's
+  click-through count without loading a Streamlit page first
+* ``/app/static/...``   - with ``--portal``, files under static/ are served
+  straight from disk: the precompressed ``.br`` / ``.gz`` variant the client
+  accepts, with an ETag so revalidations come back as 304 Not Modified
+* anything else         - proxied to the Streamlit portal when ``--portal`` is set;
+  the portal page gets a ``Link: rel=preload`` header for the self-hosted fonts
+  (webfonts.py), so they download with the page instead of after its styles
+
+Each upstream origin gets its own pooled keep-alive client, so repeated
+requests reuse connections instead of reconnecting to the tool. Request and
+response bodies are streamed chunk by chunk, websockets (which Streamlit tools
+run on) are passed through frame by frame, and upstream redirects are
+rewritten so internal addresses never reach the browser.
+
+The portal links cards to ``<NEXUS_GATEWAY_URL>/tools/<slug>/`` when
+NEXUS_GATEWAY_URL is set, or to ``/_gateway/open/<slug>`` when NEXUS_TRACK_OPENS
+is also on. Needs httpx, websockets and uvicorn.
+"""
+import argparse
+import asyncio
+import collections
+import logging
+import mimetypes
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
+from websockets.asyncio.client import connect as websocket_connect
+
+from analytics import TOOL_OPEN, open_analytics
+from catalog import CatalogLoader
+from static_assets import PRECOMPRESSED_ENCODINGS, STATIC_DIR, STATIC_URL_PREFIX, asset_url
+from telemetry import SPAN_BUCKETS_SECONDS, Histogram
+from webfonts import build_font_assets, preload_paths
+
+logger = logging.getLogger(__name__)
+
+TOOLS_PREFIX = "/tools/"
+METRICS_PATH = "/_gateway/metrics"
+OPEN_PREFIX = "/_gateway/open/"
+OPEN_ROUTE = "open"
+PORTAL_ROUTE = "portal"
+STATIC_PREFIX = f"/{STATIC_URL_PREFIX}/"
+STATIC_ROUTE = "static"
+# Hashed (?v=...) URLs never change; anything else is revalidated with its ETag on every use
+IMMUTABLE_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = b"no-cache"
+
+# --- Upstream connection pools (one per origin) ---
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+UPSTREAM_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+WEBSOCKET_OPEN_TIMEOUT = 10.0
+
+# Connection-level headers that must not be forwarded (RFC 9110 section 7.6.1)
+HOP_BY_HOP = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade",
+}
+
+
+class Target(NamedTuple):
+    route: str       # Metrics label: the tool's slug, or "portal"
+    origin: str      # scheme://host:port of the upstream
+    base_path: str   # Path of the tool's link ("" at the root)
+    path: str        # Upstream path for this request
+    prefix: str      # Public path the upstream is mounted under
+
+
+class RouteMetrics:
+    """Per-route request latency (time to first byte and total), status classes and upstream errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first_byte = {}
+        self._duration = {}
+        self._responses = collections.Counter()
+        self._errors = collections.Counter()
+
+    def observe(self, route, kind, status, first_byte_seconds, total_seconds):
+        with self._lock:
+            for histograms, seconds in ((self._first_byte, first_byte_seconds), (self._duration, total_seconds)):
+                histogram = histograms.get((route, kind))
+                if histogram is None:
+                    histogram = histograms[(route, kind)] = Histogram(len(SPAN_BUCKETS_SECONDS))
+                histogram.observe(seconds, SPAN_BUCKETS_SECONDS)
+            self._responses[(route, kind, f"{status // 100}xx")] += 1
+
+    def error(self, route, kind):
+        with self._lock:
+            self._errors[(route, kind)] += 1
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for metric, histograms, help_text in (
+                ("nexus_gateway_first_byte_seconds", self._first_byte, "Time until the upstream answered (websockets: handshake)."),
+                ("nexus_gateway_request_duration_seconds", self._duration, "Time until the response was fully streamed."),
+            ):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (route, kind), histogram in sorted(histograms.items()):
+                    labels = f'route="{route}",kind="{kind}"'
+                    cumulative = 0
+                    for bound, count in zip(SPAN_BUCKETS_SECONDS, histogram.buckets):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram.total:.6f}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+            lines.append("# HELP nexus_gateway_responses_total Proxied responses by status class.")
+            lines.append("# TYPE nexus_gateway_responses_total counter")
+            for (route, kind, status_class), count in sorted(self._responses.items()):
+                lines.append(f'nexus_gateway_responses_total{{route="{route}",kind="{kind}",status="{status_class}"}} {count}')
+            lines.append("# HELP nexus_gateway_upstream_errors_total Requests that failed to reach the upstream.")
+            lines.append("# TYPE nexus_gateway_upstream_errors_total counter")
+            for (route, kind), count in sorted(self._errors.items()):
+                lines.append(f'nexus_gateway_upstream_errors_total{{route="{route}",kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+class Gateway:
+    """ASGI application proxying /tools/<slug>/ to the catalog's links (and the rest to the portal)."""
+
+    def __init__(self, catalog_loader=None, portal_url=None, analytics=None):
+        self.catalog_loader = catalog_loader or CatalogLoader()
+        self.portal_url = portal_url.rstrip("/") if portal_url else None
+        self.analytics = analytics  # AnalyticsRecorder for /_gateway/open/ (None: redirect without recording)
+        self.metrics = RouteMetrics()
+        self._clients = {}
+        self._font_preload = None
+
+    # --- Routing ---
+    def _resolve(self, path):
+        """The Target for a request path; a str is a redirect to that path, None means 404."""
+        if path.startswith(TOOLS_PREFIX):
+            slug, slash, rest = path[len(TOOLS_PREFIX):].partition("/")
+            solution = self.catalog_loader.get().by_slug.get(slug)
+            if solution is None:
+                return None
+            if not slash:
+                return f"{TOOLS_PREFIX}{slug}/"  # Relative URLs in the tool need the trailing slash
+            link = urlsplit(solution.link)
+            base_path = link.path.rstrip("/")
+            return Target(slug, f"{link.scheme}://{link.netloc}", base_path, f"{base_path}/{rest}", f"{TOOLS_PREFIX}{slug}")
+        if self.portal_url:
+            return Target(PORTAL_ROUTE, self.portal_url, "", path, "")
+        return None
+
+    def _static_file(self, path):
+        """The file under static/ for an /app/static/ path, or None to leave the request to the portal."""
+        if not self.portal_url or not path.startswith(STATIC_PREFIX):
+            return None
+        root = STATIC_DIR.resolve()
+        candidate = (root / path[len(STATIC_PREFIX):]).resolve()
+        if root not in candidate.parents or not candidate.is_file():
+            return None
+        return candidate
+
+    def _font_preload_header(self):
+        """``Link`` header value preloading the fonts every page uses (b"" when none are vendored)."""
+        if self._font_preload is None:
+            try:
+                faces = build_font_assets()
+            except OSError:
+                faces = ()  # Read-only filesystem without the build step's assets
+            self._font_preload = ", ".join(
+                f'</{asset_url(path)}>; rel=preload; as=font; type="font/woff2"; crossorigin' for path in preload_paths(faces)
+            ).encode()
+        return self._font_preload
+
+    def _client(self, origin):
+        client = self._clients.get(origin)
+        if client is None:
+            client = self._clients[origin] = httpx.AsyncClient(
+                base_url=origin, limits=POOL_LIMITS, timeout=UPSTREAM_TIMEOUT, follow_redirects=False,
+            )
+        return client
+
+    @staticmethod
+    def _forward_headers(scope, prefix, skip=()):
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in HOP_BY_HOP and name != b"host" and name not in skip and not name.startswith(b"x-forwarded-")
+        ]
+        # uvicorn (proxy_headers=True) has already resolved client and scheme from a trusted front proxy
+        client_host = (scope.get("client") or ("", 0))[0]
+        original_host = dict(scope["headers"]).get(b"host", b"")
+        # Appended, not replaced: upstreams pick the client out by counting trusted hops from the right
+        forwarded_for = dict(scope["headers"]).get(b"x-forwarded-for", b"")
+        headers += [
+            (b"x-forwarded-for", (forwarded_for + b", " if forwarded_for else b"") + client_host.encode()),
+            (b"x-forwarded-proto", scope.get("scheme", "http").encode()),
+            (b"x-forwarded-host", original_host),
+            (b"x-forwarded-prefix", prefix.encode()),
+        ]
+        return headers
+
+    # --- ASGI entry point ---
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for client in self._clients.values():
+                    await client.aclose()
+                if self.analytics is not None:
+                    self.analytics.close()  # Flush the buffered opens
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _plain(send, status, text, headers=()):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/plain; charset=utf-8"), *headers]})
+        await send({"type": "http.response.body", "body": text.encode()})
+
+    @staticmethod
+    async def _request_body(receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            if message.get("body"):
+                yield message["body"]
+            if not message.get("more_body"):
+                return
+
+    async def _http(self, scope, receive, send):
+        if scope["path"] == METRICS_PATH:
+            await self._plain(send, 200, self.metrics.prometheus_text())
+            return
+        if scope["path"].startswith(OPEN_PREFIX):
+            await self._open(scope, send)
+            return
+        static_file = self._static_file(scope["path"]) if scope["method"] in ("GET", "HEAD") else None
+        if static_file is not None:
+            await self._serve_static(scope, send, static_file)
+            return
+        target = self._resolve(scope["path"])
+        if target is None:
+            await self._plain(send, 404, "Unknown tool")
+            return
+        if isinstance(target, str):
+            await self._plain(send, 307, "", headers=[(b"location", target.encode())])
+            return
+        headers = self._forward_headers(scope, target.prefix)
+        has_body = any(name in (b"content-length", b"transfer-encoding") for name, _ in scope["headers"])
+        query = scope.get("query_string", b"").decode("latin-1")
+        client = self._client(target.origin)
+        request = client.build_request(
+            scope["method"], target.path + (f"?{query}" if query else ""),
+            headers=headers, content=self._request_body(receive) if has_body else None,
+        )
+        started = time.perf_counter()
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            self.metrics.error(target.route, "http")
+            logger.warning("Upstream %s failed for %s: %s", target.origin, scope["path"], e)
+            await self._plain(send, 502, "The tool is not reachable right now.")
+            return
+        first_byte = time.perf_counter() - started
+        try:
+            response_headers = []
+            for name, value in response.headers.raw:
+                if name.lower() in HOP_BY_HOP:
+                    continue
+                if name.lower() == b"location":
+                    value = self._rewrite_location(value, target)
+                response_headers.append((name, value))
+            if target.route == PORTAL_ROUTE and scope["path"] == "/" and response.status_code == 200 and self._font_preload_header():
+                response_headers.append((b"link", self._font_preload_header()))
+            await send({"type": "http.response.start", "status": response.status_code, "headers": response_headers})
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+            self.metrics.observe(target.route, "http", response.status_code, first_byte, time.perf_counter() - started)
+
+    async def _open(self, scope, send):
+        """Count a click-through on a card, then send the browser on to the tool's route (no portal page involved)."""
+        started = time.perf_counter()
+        slug = scope["path"][len(OPEN_PREFIX):].strip("/")
+        solution = self.catalog_loader.get().by_slug.get(slug)
+        if solution is None:
+            status = 404
+            await self._plain(send, status, "Unknown tool")
+        else:
+            if self.analytics is not None:
+                self.analytics.record(TOOL_OPEN, tool=solution.name)
+            status = 303
+            await self._plain(send, status, "", headers=[(b"location", f"{TOOLS_PREFIX}{slug}/".encode()),
+                                                         (b"cache-control", b"no-store")])  # Every click must reach us
+        elapsed = time.perf_counter() - started
+        self.metrics.observe(OPEN_ROUTE, "http", status, elapsed, elapsed)
+
+    async def _serve_static(self, scope, send, file_path):
+        started = time.perf_counter()
+        request_headers = dict(scope["headers"])
+        accepted = _accepted_encodings(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        body_path, encoding = file_path, None
+        for name, suffix in PRECOMPRESSED_ENCODINGS:
+            variant = file_path.with_name(file_path.name + suffix)
+            if name in accepted and variant.is_file():
+                body_path, encoding = variant, name
+                break
+        stat = body_path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'.encode()
+        versioned = b"v=" in scope.get("query_string", b"")
+        headers = [
+            (b"content-type", (mimetypes.guess_type(file_path.name)[0] or "application/octet-stream").encode()),
+            (b"cache-control", IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL),
+            (b"etag", etag),
+            (b"vary", b"accept-encoding"),
+            (b"x-content-type-options", b"nosniff"),
+        ]
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+        if _etag_matches(request_headers.get(b"if-none-match", b""), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            status = 304
+        else:
+            body = await asyncio.to_thread(body_path.read_bytes) if scope["method"] == "GET" else b""
+            headers.append((b"content-length", str(stat.st_size).encode()))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            status = 200
+        elapsed = time.perf_counter() - started
+        self.metrics.observe(STATIC_ROUTE, "http", status, elapsed, elapsed)
+
+    @staticmethod
+    def _rewrite_location(value, target):
+        """Map an upstream redirect back under the gateway so internal addresses stay hidden."""
+        location = value.decode("latin-1")
+        if location.startswith(target.origin):
+            location = location[len(target.origin):] or "/"
+        if location.startswith(target.base_path + "/"):
+            location = target.prefix + location[len(target.base_path):]
+        return location.encode("latin-1")
+
+    async def _websocket(self, scope, receive, send):
+        target = self._resolve(scope["path"])
+        await receive()  # websocket.connect
+        if target is None or isinstance(target, str):
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        query = scope.get("query_string", b"").decode("latin-1")
+        url = target.origin.replace("http", "ws", 1) + target.path + (f"?{query}" if query else "")
+        # The upstream checks Origin against its own address, as if the browser talked to it directly
+        headers = self._forward_headers(scope, target.prefix, skip={b"origin", b"sec-websocket-key", b"sec-websocket-version",
+                                                             b"sec-websocket-extensions", b"sec-websocket-protocol"})
+        headers.append((b"origin", target.origin.encode()))
+        started = time.perf_counter()
+        try:
+            upstream = await websocket_connect(
+                url,
+                subprotocols=scope.get("subprotocols") or None,
+                additional_headers=[(name.decode("latin-1"), value.decode("latin-1")) for name, value in headers],
+                open_timeout=WEBSOCKET_OPEN_TIMEOUT,
+                max_size=None,
+                compression=None,
+            )
+        except Exception as e:
+            self.metrics.error(target.route, "websocket")
+            logger.warning("Upstream websocket %s failed: %s", url, e)
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        first_byte = time.perf_counter() - started
+        await send({"type": "websocket.accept", "subprotocol": upstream.subprotocol})
+
+        async def client_to_upstream():
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await upstream.send(message["bytes"] if message.get("bytes") is not None else message["text"])
+
+        async def upstream_to_client():
+            async for data in upstream:
+                await send({"type": "websocket.send", "bytes": data} if isinstance(data, bytes) else {"type": "websocket.send", "text": data})
+            await send({"type": "websocket.close", "code": upstream.close_code or 1000})
+
+        tasks = [asyncio.ensure_future(client_to_upstream()), asyncio.ensure_future(upstream_to_client())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+            self.metrics.observe(target.route, "websocket", 101, first_byte, time.perf_counter() - started)
+
+
+def _accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, minus those refused with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        try:
+            quality = float(params.replace(" ", "").lower().removeprefix("q=")) if params else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match, etag):
+    tags = [tag.strip().removeprefix(b"W/") for tag in if_none_match.split(b",")]
+    return etag in tags or b"*" in tags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reverse-proxy gateway for the portal's tools.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--portal", help="Streamlit portal URL to serve everything outside /tools/ (e.g. http://127.0.0.1:8501)")
+    args = parser.parse_args()
+
+    import uvicorn  # Only needed to run the gateway standalone
+
+    logging.basicConfig(level=logging.INFO)
+    # Same switch and store as the portal's: the opens land in the portal's usage tables
+    analytics = open_analytics() if os.environ.get("NEXUS_TRACK_OPENS") == "1" else None
+    uvicorn.run(Gateway(portal_url=args.portal, analytics=analytics), host=args.host, port=args.port,
+                proxy_headers=True, lifespan="on")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Background health probing for each solution's ``link``.
+
+One HealthMonitor per process probes every target concurrently on a thread
+pool, keeps the latest result per URL in a shared TTL cache and refreshes it on
+a background thread. Page renders only read the cache, so they never wait on a
+probe. Given a HealthHistory (health_history.py), every result is also folded
+into the per-tool uptime and latency history.
+"""
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Probe tuning (overridable per deployment via environment) ---
+PROBE_TIMEOUT_SECONDS = float(os.environ.get("NEXUS_HEALTH_TIMEOUT", "2.0"))
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("NEXUS_HEALTH_INTERVAL", "30"))
+RESULT_TTL_SECONDS = REFRESH_INTERVAL_SECONDS * 3   # Older results are reported as unknown
+DEGRADED_LATENCY_MS = 1500                           # Slower than this counts as degraded
+MAX_PROBE_WORKERS = 16
+
+# --- Health states ---
+UP = "up"
+DEGRADED = "degraded"
+DOWN = "down"
+UNKNOWN = "unknown"
+
+
+class ProbeResult(NamedTuple):
+    state: str
+    latency_ms: Optional[float]
+    status_code: Optional[int]
+    checked_at: float
+    error: Optional[str] = None
+
+
+UNKNOWN_RESULT = ProbeResult(UNKNOWN, None, None, 0.0)
+
+
+def probe(url, timeout=PROBE_TIMEOUT_SECONDS, degraded_ms=DEGRADED_LATENCY_MS):
+    """Issue one GET against ``url`` and classify the response.
+
+    Any response below 500 means the service is reachable (up, or degraded when
+    slow); 5xx is degraded; connection errors and timeouts are down.
+    """
+    request = urllib.request.Request(url, method="GET", headers={"User-Agent": "phronesis-nexus-health/1"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read(1)  # Time to first byte, without downloading the page
+            status_code = response.status
+    except urllib.error.HTTPError as e:
+        status_code = e.code
+    except Exception as e:  # URLError, timeouts, resets
+        return ProbeResult(DOWN, None, None, time.time(), str(getattr(e, "reason", e)))
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    if status_code >= 500 or latency_ms > degraded_ms:
+        state = DEGRADED
+    else:
+        state = UP
+    return ProbeResult(state, round(latency_ms, 1), status_code, time.time())
+
+
+class HealthMonitor:
+    """Shared, periodically refreshed cache of probe results keyed by URL."""
+
+    def __init__(self, interval=REFRESH_INTERVAL_SECONDS, ttl=RESULT_TTL_SECONDS,
+                 timeout=PROBE_TIMEOUT_SECONDS, max_workers=MAX_PROBE_WORKERS, probe_func=probe, history=None):
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self.history = history
+        self._probe = probe_func
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="health-probe")
+        self._lock = threading.Lock()
+        self._targets = ()
+        self._results = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_targets(self, urls):
+        """Replace the probed URLs; new ones are probed on the next cycle (triggered immediately)."""
+        urls = tuple(dict.fromkeys(u for u in urls if u))
+        with self._lock:
+            if urls == self._targets:
+                return
+            self._targets = urls
+            self._results = {u: r for u, r in self._results.items() if u in urls}
+        if self.history is not None:
+            self.history.retain(urls)
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._executor.shutdown(wait=False)
+        if self.history is not None:
+            self.history.flush(force=True)
+
+    def refresh(self):
+        """Probe every target concurrently and store the results; returns them."""
+        with self._lock:
+            targets = self._targets
+        futures = {url: self._executor.submit(self._probe, url, self.timeout) for url in targets}
+        results = {}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                results[url] = ProbeResult(DOWN, None, None, time.time(), str(e))
+        with self._lock:
+            self._results.update(results)
+        if self.history is not None:
+            for url, result in results.items():
+                self.history.record(url, result)
+        return results
+
+    def get(self, url):
+        """Latest result for ``url``; UNKNOWN until first probed or once older than the TTL."""
+        with self._lock:
+            result = self._results.get(url)
+        if result is None or time.time() - result.checked_at > self.ttl:
+            return UNKNOWN_RESULT
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            targets = self._targets
+        return {url: self.get(url) for url in targets}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Health refresh failed")
+            if self.history is not None:
+                self.history.flush()
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Per-tool uptime and latency history, bounded by downsampling.
+
+Every probe result the HealthMonitor gets is folded straight into three
+resolutions, each a fixed ring of buckets per URL:
+
+  1m x 1440  the last day
+  1h x 720   the last thirty days
+  1d x 400   about thirteen months
+
+A bucket holds aggregates (samples, down, degraded, latency sum and max),
+never the samples themselves, so memory and the history file stay the same
+size however long the portal runs. Each ring keeps one ``array`` per column,
+indexed by ``bucket number % slots``; a slot still holding an older bucket
+number reads as empty, so nothing ever has to be expired.
+
+Cards only read these aggregates: an hourly mean-latency sparkline for the
+last day and the uptime over the last thirty daily buckets (degraded counts as
+up: the service answered). ``series()`` serves any resolution, by Resolution
+or name, so the minute ring answers "what happened in the last hour".
+
+The history lives in NEXUS_HEALTH_HISTORY_PATH (a local JSON file, written
+then renamed), saved every NEXUS_HEALTH_HISTORY_SAVE_INTERVAL seconds and on
+shutdown, and reloaded on start.
+"""
+import base64
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from array import array
+from typing import NamedTuple, Optional
+
+from health import DEGRADED, DOWN, UNKNOWN
+from shared_storage import warn_if_instance_local
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = "health_history.json"
+SAVE_INTERVAL_SECONDS = 300
+SPARKLINE_HOURS = 24
+UPTIME_DAYS = 30
+FORMAT_VERSION = 1
+
+
+class Resolution(NamedTuple):
+    name: str
+    seconds: int
+    slots: int
+
+
+MINUTE, HOUR, DAY = RESOLUTIONS = (
+    Resolution("1m", 60, 1440),
+    Resolution("1h", 3600, 720),
+    Resolution("1d", 86400, 400),
+)
+
+
+class Bucket(NamedTuple):
+    start: float                  # Unix time the bucket starts at
+    samples: int
+    down: int
+    degraded: int
+    latency_ms: Optional[float]   # Mean over the samples that got an answer
+    max_latency_ms: Optional[float]
+
+
+class HistorySummary(NamedTuple):
+    uptime_percent: Optional[float]  # Over UPTIME_DAYS; None before the first sample
+    latency_ms: tuple                # Hourly mean for SPARKLINE_HOURS, oldest first; None where nothing answered
+    outages: tuple                   # Per hour, whether any probe found the tool down
+
+
+EMPTY_SUMMARY = HistorySummary(None, (None,) * SPARKLINE_HOURS, (False,) * SPARKLINE_HOURS)
+
+
+class BucketRing:
+    """Fixed ring of aggregate buckets at one resolution, one array per column."""
+
+    COLUMNS = (("bucket", "q", -1), ("samples", "I", 0), ("down", "I", 0), ("degraded", "I", 0),
+               ("latency_sum", "d", 0.0), ("latency_max", "f", 0.0))
+
+    def __init__(self, slots):
+        self.slots = slots
+        for name, code, empty in self.COLUMNS:
+            setattr(self, name, array(code, [empty]) * slots)
+
+    def add(self, bucket, state, latency_ms):
+        slot = bucket % self.slots
+        if self.bucket[slot] != bucket:
+            if self.bucket[slot] > bucket:
+                return  # A late sample for a bucket the ring has already moved past
+            self.bucket[slot] = bucket
+            self.samples[slot] = self.down[slot] = self.degraded[slot] = 0
+            self.latency_sum[slot] = self.latency_max[slot] = 0.0
+        self.samples[slot] += 1
+        if state == DOWN:
+            self.down[slot] += 1
+        elif state == DEGRADED:
+            self.degraded[slot] += 1
+        if latency_ms is not None:
+            self.latency_sum[slot] += latency_ms
+            self.latency_max[slot] = max(self.latency_max[slot], latency_ms)
+
+    def totals(self, first, last):
+        """(samples, down) summed over buckets ``first``..``last`` inclusive."""
+        samples = down = 0
+        for bucket in range(max(first, last - self.slots + 1), last + 1):
+            slot = bucket % self.slots
+            if self.bucket[slot] == bucket:
+                samples += self.samples[slot]
+                down += self.down[slot]
+        return samples, down
+
+    def get(self, bucket, seconds):
+        slot = bucket % self.slots
+        if self.bucket[slot] != bucket:
+            return Bucket(bucket * seconds, 0, 0, 0, None, None)
+        answered = self.samples[slot] - self.down[slot]
+        return Bucket(
+            bucket * seconds, self.samples[slot], self.down[slot], self.degraded[slot],
+            self.latency_sum[slot] / answered if answered else None,
+            self.latency_max[slot] if answered else None,
+        )
+
+    def dump(self):
+        return {
+            name: base64.b64encode(zlib.compress(getattr(self, name).tobytes())).decode("ascii")
+            for name, _, _ in self.COLUMNS
+        }
+
+    @classmethod
+    def restore(cls, slots, columns, byteorder):
+        ring = cls(slots)
+        for name, code, _ in cls.COLUMNS:
+            column = array(code)
+            column.frombytes(zlib.decompress(base64.b64decode(columns[name])))
+            if byteorder != sys.byteorder:
+                column.byteswap()
+            if len(column) != slots:
+                raise ValueError(f"{name}: {len(column)} slots, expected {slots}")
+            setattr(ring, name, column)
+        return ring
+
+
+class HealthHistory:
+    """Downsampled probe history per URL, shared by every session of the process."""
+
+    def __init__(self, path=None, save_interval=SAVE_INTERVAL_SECONDS, resolutions=RESOLUTIONS, clock=time.time):
+        self.path = path
+        self.save_interval = save_interval
+        self.resolutions = tuple(resolutions)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rings = {}      # url -> one BucketRing per resolution
+        self._version = 0     # Bumped by every record(); summaries are cached against it
+        self._summaries = {}  # url -> (version, hour, HistorySummary)
+        self._saved_version = 0
+        self._saved_at = clock()
+        if path:
+            self.load()
+
+    def record(self, url, result):
+        """Fold one ProbeResult into every resolution (UNKNOWN results are not samples)."""
+        if result.state == UNKNOWN:
+            return
+        with self._lock:
+            rings = self._rings.get(url)
+            if rings is None:
+                rings = self._rings[url] = tuple(BucketRing(resolution.slots) for resolution in self.resolutions)
+            for resolution, ring in zip(self.resolutions, rings):
+                ring.add(int(result.checked_at // resolution.seconds), result.state, result.latency_ms)
+            self._version += 1
+
+    def retain(self, urls):
+        """Forget URLs no longer probed, so removed tools do not hold their rings forever."""
+        urls = set(urls)
+        with self._lock:
+            for url in [url for url in self._rings if url not in urls]:
+                del self._rings[url]
+                self._summaries.pop(url, None)
+                self._version += 1
+
+    def series(self, url, resolution, count):
+        """The last ``count`` buckets at ``resolution`` (one of RESOLUTIONS, or its name), oldest first."""
+        if isinstance(resolution, str):
+            resolution = {kept.name: kept for kept in self.resolutions}.get(resolution, resolution)
+        index = self.resolutions.index(resolution)  # ValueError for a resolution this history does not keep
+        count = min(count, resolution.slots)
+        current = int(self._clock() // resolution.seconds)
+        with self._lock:
+            rings = self._rings.get(url)
+            if rings is None:
+                return [Bucket(bucket * resolution.seconds, 0, 0, 0, None, None) for bucket in range(current - count + 1, current + 1)]
+            return [rings[index].get(bucket, resolution.seconds) for bucket in range(current - count + 1, current + 1)]
+
+    def uptime(self, url, days=UPTIME_DAYS):
+        """Percentage of samples over the last ``days`` daily buckets that were not down; None without samples."""
+        current = int(self._clock() // DAY.seconds)
+        with self._lock:
+            rings = self._rings.get(url)
+            if rings is None:
+                return None
+            samples, down = rings[self.resolutions.index(DAY)].totals(current - days + 1, current)
+        return 100.0 * (samples - down) / samples if samples else None
+
+    def summary(self, url):
+        """Sparkline points and 30-day uptime for a card, recomputed only after new samples or a new hour."""
+        hour = int(self._clock() // HOUR.seconds)
+        with self._lock:
+            cached = self._summaries.get(url)
+            version = self._version
+            if url not in self._rings:
+                return EMPTY_SUMMARY
+        if cached is not None and cached[:2] == (version, hour):
+            return cached[2]
+        hourly = self.series(url, HOUR, SPARKLINE_HOURS)
+        uptime = self.uptime(url)
+        summary = HistorySummary(
+            round(uptime, 1) if uptime is not None else None,
+            tuple(round(bucket.latency_ms) if bucket.latency_ms is not None else None for bucket in hourly),
+            tuple(bucket.down > 0 for bucket in hourly),
+        )
+        with self._lock:
+            self._summaries[url] = (version, hour, summary)
+        return summary
+
+    # --- Persistence ---
+    def save(self):
+        """Write every ring to ``path`` (write-then-rename, so a crash never leaves half a file)."""
+        with self._lock:
+            version = self._version
+            document = {
+                "format": FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "resolutions": [list(resolution) for resolution in self.resolutions],
+                "tools": {
+                    url: {resolution.name: ring.dump() for resolution, ring in zip(self.resolutions, rings)}
+                    for url, rings in self._rings.items()
+                },
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._saved_version, self._saved_at = version, self._clock()
+
+    def flush(self, force=False):
+        """Save if anything changed and the save interval has passed (or ``force``); never raises."""
+        if not self.path or self._version == self._saved_version:
+            return
+        if not force and self._clock() - self._saved_at < self.save_interval:
+            return
+        try:
+            self.save()
+        except OSError:
+            logger.exception("Could not save health history to %s", self.path)
+
+    def load(self):
+        """Restore the rings saved at ``path``; a resolution saved with another slot count starts empty, one no longer kept is dropped."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                document = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception("Ignoring unreadable health history at %s", self.path)
+            return
+        if document.get("format") != FORMAT_VERSION:
+            return
+        saved = {name: Resolution(name, seconds, slots) for name, seconds, slots in document.get("resolutions", ())}
+        rings = {}
+        for url, columns in document.get("tools", {}).items():
+            restored = []
+            for resolution in self.resolutions:
+                try:
+                    if saved.get(resolution.name) != resolution:
+                        raise ValueError("resolution changed")
+                    restored.append(BucketRing.restore(resolution.slots, columns[resolution.name], document["byteorder"]))
+                except (KeyError, ValueError, zlib.error):
+                    restored.append(BucketRing(resolution.slots))
+            rings[url] = tuple(restored)
+        with self._lock:
+            self._rings.update(rings)
+            self._version += 1
+            self._saved_version = self._version
+
+
+def open_health_history():
+    """HealthHistory at NEXUS_HEALTH_HISTORY_PATH (empty: memory only), saved every NEXUS_HEALTH_HISTORY_SAVE_INTERVAL seconds."""
+    path = os.environ.get("NEXUS_HEALTH_HISTORY_PATH", DEFAULT_HISTORY_PATH) or None
+    if path:
+        warn_if_instance_local("Health history", path)
+    return HealthHistory(path, save_interval=float(os.environ.get("NEXUS_HEALTH_HISTORY_SAVE_INTERVAL", SAVE_INTERVAL_SECONDS)))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Process-wide cache for static assets and rendered HTML/CSS fragments.
+
+Streamlit re-executes the whole script on every interaction, so anything that
+only depends on files on disk (the logo, the theme source) is read, encoded and
+rendered once per process here and then shared by every session.
+
+Files are tracked by (mtime, size); when that changes the file is re-read and
+re-hashed, and renders keyed on the old content hash simply stop matching.
+"""
+import base64
+import hashlib
+import os
+import threading
+
+
+class RenderCache:
+    """Thread-safe memo of file contents and rendered strings with hit/miss counters."""
+
+    def __init__(self, max_renders=2048):
+        self.max_renders = max_renders
+        self._lock = threading.Lock()
+        self._files = {}    # path -> (mtime_ns, size, sha256 hex, bytes)
+        self._renders = {}  # key -> rendered value
+        self._hits = 0
+        self._misses = 0
+
+    # --- Files ---
+    def _file_entry(self, path):
+        path = os.fspath(path)
+        stat = os.stat(path)  # FileNotFoundError propagates to the caller
+        with self._lock:
+            entry = self._files.get(path)
+            if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._hits += 1
+                return entry
+            self._misses += 1
+        with open(path, "rb") as f:
+            data = f.read()
+        entry = (stat.st_mtime_ns, stat.st_size, hashlib.sha256(data).hexdigest(), data)
+        with self._lock:
+            self._files[path] = entry
+        return entry
+
+    def file_bytes(self, path):
+        return self._file_entry(path)[3]
+
+    def file_digest(self, path):
+        """Content hash (sha256 hex) of a file, re-computed only when its mtime/size changes."""
+        return self._file_entry(path)[2]
+
+    def file_base64(self, path):
+        digest = self.file_digest(path)
+        return self.render(("base64", os.fspath(path), digest), lambda: base64.b64encode(self.file_bytes(path)).decode())
+
+    # --- Rendered fragments ---
+    def render(self, key, build):
+        """Return the cached value for ``key``, calling ``build()`` once on a miss.
+
+        Keys should include whatever the output depends on (content hashes, data
+        tuples) so stale entries are never served.
+        """
+        with self._lock:
+            if key in self._renders:
+                self._hits += 1
+                return self._renders[key]
+            self._misses += 1
+        value = build()
+        with self._lock:
+            if len(self._renders) >= self.max_renders:
+                # Superseded keys (old content hashes) are the only growth; start over rather than track LRU order
+                self._renders.clear()
+            self._renders[key] = value
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "files": len(self._files),
+                "renders": len(self._renders),
+            }
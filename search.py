@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Precomputed search index over the solutions catalog.
+
+Postings are Python ints used as bitsets (bit i = catalog position i), so a
+query is a handful of dict lookups plus AND/OR on ints regardless of catalog
+size. Every prefix of every token is indexed, which gives search-as-you-type
+without scanning the vocabulary.
+"""
+import re
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SEARCHABLE_FIELDS = ("name", "description", "version")
+MAX_PREFIX_LENGTH = 24  # Longer query tokens are matched on their first 24 characters
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+_BYTE_POPCOUNT = bytes(bin(value).count("1") for value in range(256))
+
+
+def _count_bits(mask):
+    return bin(mask).count("1")
+
+
+def _mask_from_positions(positions, size):
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def _bit_positions(mask, skip, limit):
+    """Positions of set bits in ``mask``, skipping the first ``skip`` and returning at most ``limit``.
+
+    Walks the mask a byte at a time so deep pages skip whole bytes by popcount.
+    """
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    positions = []
+    seen = 0
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        if seen + _BYTE_POPCOUNT[byte] <= skip:
+            seen += _BYTE_POPCOUNT[byte]
+            continue
+        for bit in range(8):
+            if byte >> bit & 1:
+                if seen >= skip:
+                    positions.append(byte_index * 8 + bit)
+                    if len(positions) == limit:
+                        return positions
+                seen += 1
+    return positions
+
+
+class SearchIndex:
+    """Inverted index (token prefix, tag, status -> bitset) for one catalog version."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.version = catalog.version
+        self._all = (1 << len(catalog)) - 1
+        prefixes, tags, statuses = {}, {}, {}
+        for position, solution in enumerate(catalog.solutions):
+            for field in SEARCHABLE_FIELDS:
+                for token in tokenize(getattr(solution, field)):
+                    for end in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                        prefixes.setdefault(token[:end], []).append(position)
+            for tag in solution.tags:
+                tags.setdefault(tag, []).append(position)
+            statuses.setdefault(solution.status, []).append(position)
+        # Build each bitset once from its position list; OR-ing bit by bit would be quadratic
+        size = len(catalog)
+        self._prefixes = {key: _mask_from_positions(positions, size) for key, positions in prefixes.items()}
+        self._tags = {key: _mask_from_positions(positions, size) for key, positions in tags.items()}
+        self._statuses = {key: _mask_from_positions(positions, size) for key, positions in statuses.items()}
+        self.tags = tuple(sorted(self._tags))
+        self.statuses = tuple(sorted(self._statuses))
+
+    def match(self, query="", tags=(), statuses=()):
+        """Bitset of solutions matching every query token (as a prefix), any of ``tags`` and any of ``statuses``."""
+        mask = self._all
+        for token in tokenize(query):
+            mask &= self._prefixes.get(token[:MAX_PREFIX_LENGTH], 0)
+            if not mask:
+                return 0
+        if tags:
+            tag_mask = 0
+            for tag in tags:
+                tag_mask |= self._tags.get(tag, 0)
+            mask &= tag_mask
+        if statuses:
+            status_mask = 0
+            for status in statuses:
+                status_mask |= self._statuses.get(status, 0)
+            mask &= status_mask
+        return mask
+
+    def search(self, query="", tags=(), statuses=(), page=1, per_page=10):
+        """Return (solutions on the requested 1-based page, total match count), in catalog order."""
+        mask = self.match(query, tags, statuses)
+        positions = _bit_positions(mask, (max(page, 1) - 1) * per_page, per_page)
+        return [self.catalog.solutions[position] for position in positions], _count_bits(mask)
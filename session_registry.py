@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Process-wide record of live sessions, used to evict idle sessions' state.
+
+Streamlit drops a session a couple of minutes after its browser disconnects,
+but a tab left open keeps its session, and everything in its
+``st.session_state``, for as long as the server runs. Each script run touches
+the registry; at most once per SWEEP_INTERVAL_SECONDS the registry clears the
+state of sessions that have not run for IDLE_TTL_SECONDS.
+
+Clearing is safe: the browser sends every widget's value with its next rerun,
+so form drafts come back, and the app's own keys (search page, open
+expanders) simply start over as for a new visit. Keys passed as ``keep`` survive the
+sweep: the page-view flag (a returning tab is a rerun, not a new view), the
+admin login and the feedback rate-limit key (an idle tab must not come back
+with a fresh bucket).
+
+Reaching a session's state needs Streamlit internals (``session_state_of()``).
+They are only used on the releases in SUPPORTED_STREAMLIT and only when they
+look as expected; otherwise, or if a sweep fails anyway, eviction switches off
+with a warning instead of raising inside a visitor's script run.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+IDLE_TTL_SECONDS = float(os.environ.get("NEXUS_SESSION_IDLE_TTL", "1800"))
+SWEEP_INTERVAL_SECONDS = 60.0
+# Streamlit releases (>= first, < second) whose SafeSessionState._state / SessionState.filtered_state were checked
+SUPPORTED_STREAMLIT = ((1, 37), (2, 0))
+
+
+def _release(version):
+    try:
+        return tuple(int(part) for part in version.split(".")[:2])
+    except ValueError:
+        return None
+
+
+def session_state_of(ctx):
+    """The SessionState behind a script run's context, or None where eviction is not supported.
+
+    ``ctx.session_state`` only wraps the session's SessionState for one run; the
+    wrapper keeps it in the private ``_state``. It must live as long as the
+    session, so that is what the registry holds.
+    """
+    import streamlit
+
+    first, end = SUPPORTED_STREAMLIT
+    release = _release(streamlit.__version__)
+    if release is None or not first <= release < end:
+        return None
+    state = getattr(ctx.session_state, "_state", None)
+    try:
+        if not isinstance(state.filtered_state, dict) or not hasattr(state, "__delitem__"):
+            return None
+    except Exception:
+        return None
+    return state
+
+
+class SessionRegistry:
+    """Last script run and session state per session id.
+
+    ``is_active(session_id)`` tells a sweep which sessions Streamlit still has
+    connected; entries for the others are dropped so the registry never keeps
+    a closed session's state alive past the next sweep.
+    """
+
+    def __init__(self, idle_ttl=IDLE_TTL_SECONDS, sweep_interval=SWEEP_INTERVAL_SECONDS, is_active=None,
+                 keep=(), clock=time.monotonic):
+        self.idle_ttl = idle_ttl
+        self.keep = frozenset(keep)
+        self.sweep_interval = min(sweep_interval, idle_ttl)
+        self._is_active = is_active
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = {}  # session id -> (last run, its session state)
+        self._next_sweep = clock() + self.sweep_interval
+        self._evicted = 0
+        self.enabled = True
+
+    def touch(self, session_id, session_state):
+        """Record a script run; sweeps idle sessions when one is due.
+
+        ``session_state`` must live as long as the session: Streamlit's
+        SessionState (session_state_of()), not the wrapper a script run sees as
+        ``st.session_state``. None (unsupported Streamlit) switches eviction off.
+        """
+        if not self.enabled:
+            return
+        if session_state is None:
+            self.disable("this Streamlit release's session state is not supported")
+            return
+        now = self._clock()
+        with self._lock:
+            self._sessions[session_id] = (now, session_state)
+            due = now >= self._next_sweep
+            if due:
+                self._next_sweep = now + self.sweep_interval
+        if due:
+            self.sweep(now)
+
+    def sweep(self, now=None):
+        """Clear the state (but the ``keep`` keys) of every session idle for idle_ttl; returns how many were cleared."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            if self._is_active is not None:
+                for session_id in [session_id for session_id in self._sessions if not self._is_active(session_id)]:
+                    del self._sessions[session_id]  # Closed or disconnected: Streamlit expires it on its own
+            expired = [session_id for session_id, (last_run, _) in self._sessions.items() if now - last_run >= self.idle_ttl]
+            states = [self._sessions.pop(session_id)[1] for session_id in expired]
+        # Idle sessions run no script, so nothing else touches their state while it is cleared
+        try:
+            for state in states:
+                for key in [key for key in state.filtered_state if key not in self.keep]:
+                    try:
+                        del state[key]
+                    except KeyError:
+                        pass
+        except Exception as exc:
+            # Streamlit's internals moved: stop evicting rather than fail this (unrelated) script run
+            self.disable(f"clearing a session's state failed ({exc!r})")
+            return 0
+        with self._lock:
+            self._evicted += len(states)
+        return len(states)
+
+    def disable(self, reason):
+        """Stop recording and evicting sessions (logged once); idle sessions then keep their state."""
+        with self._lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+            self._sessions.clear()
+        logger.warning("Idle session eviction is off: %s", reason)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "evicted": self._evicted, "enabled": self.enabled}
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the stores that can live outside the instance.
+
+On Cloud Run every instance has its own ephemeral disk, so the default SQLite /
+JSONL stores only hold what that one instance saw and vanish when it scales
+down. Pointing NEXUS_FEEDBACK_PATH / NEXUS_ANALYTICS_PATH at a PostgreSQL URL
+(e.g. Cloud SQL) makes every instance write to the same tables; the SQLite
+stores keep the same interface and stand in for it offline and in tests.
+
+Writes from several instances stay safe because each one carries an
+idempotency key (feedback) or batch id (analytics): a batch retried after a
+lost commit acknowledgement is a no-op instead of a duplicate.
+"""
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_SCHEMES = ("postgres://", "postgresql://")
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+def is_postgres_url(location):
+    return str(location or "").startswith(POSTGRES_SCHEMES)
+
+
+def warn_if_instance_local(what, location):
+    """Log when Cloud Run (K_SERVICE is set) would keep ``what`` on the instance's own disk."""
+    if os.environ.get("K_SERVICE") and not is_postgres_url(location):
+        logger.warning(
+            "%s is stored at %s on this instance's ephemeral disk; it is not shared with other "
+            "instances and is lost on scale-down. Point it at a postgresql:// URL instead.",
+            what, location,
+        )
+
+
+class PostgresConnection:
+    """One autocommit psycopg connection, reopened transparently after it breaks.
+
+    Callers serialize access with ``self.lock``; statements run through ``get()``.
+    """
+
+    def __init__(self, dsn):
+        import psycopg  # Only needed when a shared backend is configured
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def get(self):
+        if self._conn is None or self._conn.closed or self._conn.broken:
+            self._conn = self._psycopg.connect(self.dsn, autocommit=True)
+        return self._conn
+
+    def connect(self, **kwargs):
+        """A separate connection (e.g. for a server-side cursor that streams an export)."""
+        return self._psycopg.connect(self.dsn, **kwargs)
+
+    def close(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Pre-sized, content-hashed image variants served through Streamlit static serving.
+
+The logo and solution icons are re-encoded once (optimized PNG + WebP at the
+sizes the page actually displays) into ``static/assets/`` with the content hash
+in the file name, so browsers can cache them indefinitely and the page only
+carries short URLs instead of inline base64.
+
+Run ``python static_assets.py`` at image build time to pre-generate them; the
+app falls back to generating them on first use.
+
+Text assets (the page shell's stylesheet) are minified, purged of rules that
+can match nothing the app renders, and published the same way, with ``.gz``
+and ``.br`` siblings compressed once at the highest level so the gateway can
+serve them without compressing per request.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+ICON_DIR = BASE_DIR / "icons"
+STATIC_DIR = BASE_DIR / "static"            # Served by Streamlit at app/static/ (server.enableStaticServing)
+ASSET_DIR = STATIC_DIR / "assets"
+MANIFEST_PATH = ASSET_DIR / "manifest.json"
+STATIC_URL_PREFIX = "app/static"
+
+# --- Variants to generate: logical name -> (source file, display height in CSS px) ---
+# Images are rendered at 2x the CSS size for high-DPI screens.
+LOGO_HEIGHT = 80
+ICON_HEIGHT = 48
+SCALE = 2
+WEBP_QUALITY = 85
+
+
+def image_sources():
+    """Map logical asset names to (source path, display height): the logo plus every icons/*.png.
+
+    Icons are keyed by the relative path used in each solution's ``image`` field.
+    """
+    sources = {"logo": (BASE_DIR / "ppl_logo.png", LOGO_HEIGHT)}
+    for icon_path in sorted(ICON_DIR.glob("*.png")):
+        sources[icon_path.relative_to(BASE_DIR).as_posix()] = (icon_path, ICON_HEIGHT)
+    return sources
+
+
+def _source_fingerprint(sources):
+    digest = hashlib.sha256()
+    for name, (path, height) in sorted(sources.items()):
+        digest.update(f"{name}:{height}:".encode())
+        try:
+            digest.update(Path(path).read_bytes())
+        except FileNotFoundError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def _encode_variants(path, height):
+    from PIL import Image  # Only needed when (re)generating assets
+
+    with Image.open(path) as image:
+        image.load()
+        target_height = min(height * SCALE, image.height)
+        target_width = max(1, round(image.width * target_height / image.height))
+        if (target_width, target_height) != image.size:
+            image = image.resize((target_width, target_height), Image.LANCZOS)
+        variants = {}
+        png = io.BytesIO()
+        image.save(png, format="PNG", optimize=True)
+        variants["png"] = png.getvalue()
+        webp = io.BytesIO()
+        image.save(webp, format="WEBP", quality=WEBP_QUALITY, method=6)
+        variants["webp"] = webp.getvalue()
+    return variants, target_width, target_height
+
+
+def build_static_assets(sources):
+    """Generate hashed variants for ``sources`` and write the manifest; reuses it if sources are unchanged."""
+    fingerprint = _source_fingerprint(sources)
+    manifest = load_manifest()
+    if manifest and manifest.get("fingerprint") == fingerprint:
+        return manifest
+
+    ASSET_DIR.mkdir(parents=True, exist_ok=True)
+    entries = {}
+    for name, (path, height) in sources.items():
+        if not Path(path).exists():
+            continue
+        variants, width, variant_height = _encode_variants(path, height)
+        entry = {"width": width, "height": variant_height}
+        for fmt, data in variants.items():
+            file_name = f"{Path(path).stem}-{variant_height}.{hashlib.sha256(data).hexdigest()[:12]}.{fmt}"
+            target = ASSET_DIR / file_name
+            if not target.exists():
+                target.write_bytes(data)
+            entry[fmt] = f"assets/{file_name}"
+        entries[name] = entry
+
+    manifest = {"fingerprint": fingerprint, "assets": entries}
+    # Write-then-rename so concurrent readers never see a half-written manifest
+    tmp_path = MANIFEST_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, MANIFEST_PATH)
+    return manifest
+
+
+# --- Minified, precompressed text assets ---
+# Content-Encoding -> file suffix, in server preference order
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+_HTML_BETWEEN_TAGS = re.compile(r">\s+<")
+
+
+def minify_css(css):
+    """Strip comments and insignificant whitespace (spaces before ``:`` are kept: ``a :hover`` differs from ``a:hover``)."""
+    css = _CSS_SPACE.sub(" ", _CSS_COMMENT.sub("", css))
+    css = _CSS_PUNCTUATION.sub(r"\1", css).replace(": ", ":")
+    return css.replace(";}", "}").strip()
+
+
+def minify_html(html):
+    """Drop the indentation between tags; text content is left alone."""
+    return _HTML_BETWEEN_TAGS.sub("><", html.strip())
+
+
+# --- Unused-CSS purge ---
+# The theme styles Streamlit's DOM through ``st``-prefixed class names and data-testid
+# values ("stTextInput"). Those hooks exist when the app calls the matching st.* element;
+# these are there on every page, or are named after something other than their call.
+STREAMLIT_PAGE_HOOKS = {"app", "header", "decoration", "toolbar", "markdown", "markdowncontainer"}
+STREAMLIT_HOOK_CALLS = {"alert": ("info", "warning", "error", "success", "exception")}
+STREAMLIT_LAYOUT_CLASSES = {"main", "block-container"}
+
+_CSS_CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_CSS_TESTID = re.compile(r"""\[data-testid=["']?st(\w+)""")
+_STREAMLIT_CLASS = re.compile(r"st[A-Z]\w*")
+_WORD = re.compile(r"[\w-]+")
+_STYLE_BLOCK = re.compile(r"<style>.*?</style>", re.S)
+
+
+def css_vocabulary(source_paths):
+    """Every word in the app's sources, less the stylesheet itself: what a selector may refer to.
+
+    Like PurgeCSS's default extractor this over-approximates (any identifier or
+    string counts), so a rule is only dropped when nothing could possibly render it.
+    """
+    words = set()
+    for path in source_paths:
+        words.update(_WORD.findall(_STYLE_BLOCK.sub("", Path(path).read_text(encoding="utf-8"))))
+    return frozenset(words)
+
+
+def _hook_used(hook, words, calls):
+    hook = hook.lower()
+    if hook in STREAMLIT_PAGE_HOOKS:
+        return True
+    return hook in calls or any(call in words for call in STREAMLIT_HOOK_CALLS.get(hook, ()))
+
+
+def _selector_used(selector, words, calls):
+    for hook in _CSS_TESTID.findall(selector):
+        if not _hook_used(hook, words, calls):
+            return False
+    for class_name in _CSS_CLASS.findall(selector):
+        if _STREAMLIT_CLASS.fullmatch(class_name):
+            if not _hook_used(class_name[2:], words, calls):
+                return False
+        elif class_name not in words and class_name not in STREAMLIT_LAYOUT_CLASSES:
+            return False
+    return True
+
+
+def _closing_brace(css, start):
+    depth = 0
+    for index in range(start, len(css)):
+        if css[index] == "{":
+            depth += 1
+        elif css[index] == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("Unbalanced braces in stylesheet")
+
+
+def purge_css(css, words):
+    """Drop selectors that match nothing in ``words`` (see css_vocabulary) from minified CSS.
+
+    Rules whose selectors all go are removed, and so are @media blocks left
+    empty; @font-face, @import and other at-rules are kept as they are.
+    """
+    calls = {word.replace("_", "").lower() for word in words}  # st.text_input -> stTextInput
+    return _purge_rules(css, words, calls)
+
+
+def _purge_rules(css, words, calls):
+    output, position = [], 0
+    while position < len(css):
+        brace = css.find("{", position)
+        semicolon = css.find(";", position)
+        if brace < 0 or 0 <= semicolon < brace and css.startswith("@", position):
+            end = len(css) if semicolon < 0 else semicolon + 1  # Statement at-rule (@import)
+            output.append(css[position:end])
+            position = end
+            continue
+        end = _closing_brace(css, brace)
+        prelude, body = css[position:brace].strip(), css[brace + 1:end]
+        position = end + 1
+        if prelude.startswith(("@media", "@supports")):
+            inner = _purge_rules(body, words, calls)
+            if inner:
+                output.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            output.append(f"{prelude}{{{body}}}")
+        else:
+            selectors = [selector for selector in prelude.split(",") if _selector_used(selector, words, calls)]
+            if selectors:
+                output.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(output)
+
+
+def _compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    try:
+        import brotli  # Optional: without it only the .gz variant is written
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def publish_text_asset(stem, extension, text):
+    """Write ``text`` to ``static/assets/<stem>.<hash>.<extension>`` plus precompressed siblings.
+
+    Files are content-addressed, so an existing one is never rewritten; returns the
+    path relative to STATIC_DIR (as stored in the image manifest).
+    """
+    return publish_asset(stem, extension, text.encode("utf-8"))
+
+
+def publish_asset(stem, extension, data, precompress=True):
+    """publish_text_asset() for bytes; already-compressed formats (WOFF2) pass ``precompress=False``."""
+    file_name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}.{extension}"
+    target = ASSET_DIR / file_name
+    if not target.exists():
+        ASSET_DIR.mkdir(parents=True, exist_ok=True)
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS if precompress else ():
+            compressed = _compress(data, encoding)
+            if compressed is not None:
+                _write_atomic(target.with_name(file_name + suffix), compressed)
+        _write_atomic(target, data)  # Last: its presence means the variants are complete
+    return f"assets/{file_name}"
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def load_manifest():
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def asset_url(relative_path, base=STATIC_URL_PREFIX):
+    """URL for a generated asset, relative to the page (or to ``base``: ".." from a published stylesheet).
+
+    The ``v`` query parameter repeats the content hash from the file name; Streamlit's
+    (Tornado) static handler answers versioned requests with a ten-year Cache-Control.
+    """
+    content_hash = relative_path.rsplit(".", 2)[-2]
+    return f"{base}/{relative_path}?v={content_hash}"
+
+
+def picture_html(entry, alt, css_class, lazy=False):
+    """<picture> element preferring WebP, with the optimized PNG as fallback."""
+    loading = ' loading="lazy"' if lazy else ""
+    return (
+        f'<picture><source srcset="{asset_url(entry["webp"])}" type="image/webp">'
+        f'<img src="{asset_url(entry["png"])}" alt="{alt}" class="{css_class}" '
+        f'width="{entry["width"] // SCALE}" height="{entry["height"] // SCALE}"{loading}></picture>'
+    )
+
+
+if __name__ == "__main__":
+    manifest = build_static_assets(image_sources())
+    for name, entry in manifest["assets"].items():
+        print(f"{name}: {entry['png']}, {entry['webp']} ({entry['width']}x{entry['height']})")
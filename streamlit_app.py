@@ -1,13 +1,37 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
-import openpyxl
-from PIL import Image
+import atexit
+import contextlib
+import json
+import math
 import os
-import base64 # Needed for logo embedding
+import time
+from functools import partial
 from pathlib import Path # Better path handling
 
+from feedback_store import open_feedback_store, FEEDBACK_CATEGORIES, IDEMPOTENCY_KEY
+from feedback_admin import admin_authorized, render_feedback_admin
+from feedback_clusters import FeedbackClusterIndex
+from feedback_writer import FeedbackWriter
+from feedback_guard import FeedbackGuard, FeedbackRejected, MAX_FEEDBACK_CHARS, MAX_NAME_CHARS, browser_id, client_address
+from render_cache import RenderCache
+from static_assets import (STATIC_URL_PREFIX, asset_url, build_static_assets, css_vocabulary, image_sources, minify_css,
+                           minify_html, picture_html, publish_text_asset, purge_css)
+from webfonts import build_font_assets, font_face_css, preload_links
+from health import HealthMonitor, UNKNOWN_RESULT
+from health_history import EMPTY_SUMMARY, open_health_history
+from catalog import CatalogLoader, slugify
+from search import SearchIndex
+from analytics import open_analytics, PAGE_VIEW, RERUN, TOOL_OPEN
+from warmup import WARMUP_QUERY_PARAM
+from telemetry import open_telemetry
+from shared_storage import new_idempotency_key
+from session_registry import SessionRegistry, session_state_of
+
+RUN_STARTED = time.perf_counter()  # Start of this script run, for render-time analytics
+
 # --- 1. Phronesis Apex Theme Configuration Constants ---
 # (Constants remain the same)
 PRIMARY_ACCENT_COLOR = "#cd669b"
@@ -44,17 +68,83 @@ TITLE_FONT = "'Montserrat', sans-serif"
 BODY_FONT = "'Roboto', sans-serif"
 CARD_TITLE_FONT = "'Montserrat', sans-serif"
 
+# --- Developer diagnostics (cache/writer readouts) ---
+DEBUG_MODE = os.environ.get("NEXUS_DEBUG") == "1"
+# Count card click-throughs (1): through the gateway's /_gateway/open/<slug> redirect when NEXUS_GATEWAY_URL is
+# set, otherwise through ?open=<slug>, which loads a whole portal page before forwarding (hence off by default)
+TRACK_TOOL_OPENS = os.environ.get("NEXUS_TRACK_OPENS", "0") == "1"
+# Set when gateway.py fronts the tools: links become <NEXUS_GATEWAY_URL>/tools/<slug>/ instead of internal
+# addresses ("/" when the gateway also serves this portal on the same origin)
+GATEWAY_URL = os.environ.get("NEXUS_GATEWAY_URL")
+# Set when gateway.py also serves app/static/ for this portal: the theme stylesheet then ships as a cached,
+# precompressed file instead of riding along with every page view (Streamlit's own static handler would
+# serve .css as text/plain, which browsers refuse to apply)
+SHELL_STYLESHEET = os.environ.get("NEXUS_SHELL_STYLESHEET") == "1"
+
+def tool_url(solution):
+    """Where a tool opens: its own link, or its route on the gateway."""
+    if GATEWAY_URL is None:
+        return solution.link
+    return f"{GATEWAY_URL.rstrip('/')}/tools/{slugify(solution.name)}/"
+
+def card_url(solution):
+    """Where a card links: the tool, or a click-through that counts the open on the way."""
+    if not TRACK_TOOL_OPENS:
+        return tool_url(solution)
+    if GATEWAY_URL is not None:
+        return f"{GATEWAY_URL.rstrip('/')}/_gateway/open/{slugify(solution.name)}"
+    return f"?open={slugify(solution.name)}"
+# Feedback admin view (?view=admin) requires this token; without it the view is only open in debug mode
+ADMIN_TOKEN = os.environ.get("NEXUS_ADMIN_TOKEN")
+# How long a submit waits for its write to land before thanking the user with "queued" instead of "saved"
+SUBMIT_CONFIRM_SECONDS = 5.0
+
+# --- Render-path telemetry (spans and markdown payload sizes per run; one aggregator per process) ---
+@st.cache_resource
+def get_telemetry():
+    return open_telemetry()
+
+telemetry = get_telemetry()
+run_trace = telemetry.start_run()
+
+# --- Idle-session eviction (state of sessions idle past NEXUS_SESSION_IDLE_TTL is cleared) ---
+@st.cache_resource
+def get_session_registry():
+    # Outside a server (bare `python streamlit_app.py`, AppTest) there is no runtime to ask
+    # Analytics, admin login and rate-limit keys survive eviction: a returning tab is the same visitor
+    return SessionRegistry(is_active=st.runtime.get_instance().is_active_session if st.runtime.exists() else None,
+                           keep=("page_view_recorded", "admin_authorized", "feedback_session_id"))
+
+def touch_session(registry):
+    # A local, not a script global: a global would keep this run's context (and all it references) alive
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is not None:
+        # None on Streamlit releases whose internals were not checked: their sessions are simply not evicted
+        registry.touch(ctx.session_id, session_state_of(ctx))
+
+session_registry = get_session_registry()
+touch_session(session_registry)
+
 # --- Logo Configuration (Adopted from Phronesis Apex reference) ---
 current_dir = Path(__file__).parent if "__file__" in locals() else Path.cwd()
 LOGO_PATH = current_dir / "ppl_logo.png" # Use pathlib for robustness
+APP_SOURCE_PATH = current_dir / "streamlit_app.py"
+
+# --- Process-wide asset/render cache (shared by every session and rerun) ---
+@st.cache_resource
+def get_render_cache():
+    return RenderCache()
+
+render_cache = get_render_cache()
+# Rendered CSS/HTML is keyed on this file's content hash so code edits invalidate it
+APP_SOURCE_DIGEST = render_cache.file_digest(APP_SOURCE_PATH)
 
 # Function to load and encode image to base64 (from Apex reference)
 def get_base64_of_bin_file(bin_file):
     try:
-        # Ensure the path is treated as a string for open() if needed, Path objects work directly too
-        with open(bin_file, 'rb') as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
+        # Read and encoded once per process; re-read only if the file's mtime/size changes
+        with run_trace.span("logo_load"):
+            return render_cache.file_base64(bin_file)
     except FileNotFoundError:
         st.warning(f"Warning: Logo file not found at {bin_file}")
         return None
@@ -62,18 +152,49 @@ def get_base64_of_bin_file(bin_file):
         st.error(f"Error loading logo: {e}")
         return None
 
-logo_base64 = get_base64_of_bin_file(LOGO_PATH)
-# Use a placeholder div if logo fails to load (from Apex reference)
-logo_html = f'<img src="data:image/png;base64,{logo_base64}" alt="Phronesis Partners Logo" class="logo">' if logo_base64 else '<div class="logo-placeholder">Logo</div>'
+# --- Static image variants (hashed files under static/assets, generated once per process) ---
+@st.cache_resource
+def get_static_manifest():
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    try:
+        return build_static_assets(image_sources())
+    except Exception:
+        # Read-only filesystem or missing Pillow: fall back to the inline logo, no card icons
+        return None
+
+static_manifest = get_static_manifest()
+static_images = static_manifest["assets"] if static_manifest else {}
+STATIC_FINGERPRINT = static_manifest["fingerprint"] if static_manifest else None
+
+if "logo" in static_images:
+    # Short, browser-cacheable URL instead of embedding the whole PNG in every page
+    logo_html = picture_html(static_images["logo"], "Phronesis Partners Logo", "logo")
+else:
+    logo_base64 = get_base64_of_bin_file(LOGO_PATH)
+    # Use a placeholder div if logo fails to load (from Apex reference)
+    logo_html = f'<img src="data:image/png;base64,{logo_base64}" alt="Phronesis Partners Logo" class="logo">' if logo_base64 else '<div class="logo-placeholder">Logo</div>'
+
+
+# --- Web fonts (vendored WOFF2 subsets under fonts/, published next to the images) ---
+@st.cache_resource
+def get_web_fonts():
+    if not static_manifest:
+        return ()
+    try:
+        return build_font_assets()
+    except OSError:
+        return ()  # Read-only filesystem: the font stacks' local fallbacks
 
+web_fonts = get_web_fonts()
 
 # --- 2. Apex Theme CSS Styling (Modified Header CSS) ---
-APP_STYLE = f"""
+def build_app_style(font_css):
+    """Renders the theme stylesheet (built once per process via render_cache)."""
+    return f"""
 <style>
-    /* --- Import Fonts --- */
-    @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@300;400&display=swap');
+    /* --- Fonts: self-hosted @font-face rules for the vendored fonts/ --- */
+    {font_css}
 
     /* --- Global Body & Streamlit App Styling --- */
     body {{
@@ -123,6 +244,8 @@ APP_STYLE = f"""
         vertical-align: middle;
     }}
 
+    .header-container picture {{ display: flex; flex-shrink: 0; }}
+
     /* Style for placeholder if logo fails */
     .logo-placeholder {{
         height: 80px;
@@ -216,7 +339,9 @@ APP_STYLE = f"""
     /* (Input CSS remains the same) */
     div[data-testid="stTextInput"] input,
     div[data-testid="stTextArea"] textarea,
-    div[data-testid="stSelectbox"] div[data-baseweb="select"] > div {{
+    div[data-testid="stSelectbox"] div[data-baseweb="select"] > div,
+    div[data-testid="stMultiSelect"] div[data-baseweb="select"] > div,
+    div[data-testid="stNumberInput"] input {{
         background-color: {INPUT_BG_COLOR} !important; color: {INPUT_TEXT_COLOR} !important;
         border: 1px solid {INPUT_BORDER_COLOR} !important; border-radius: 8px !important;
         box-shadow: none !important;
@@ -235,6 +360,8 @@ APP_STYLE = f"""
     div[data-testid="stTextInput"] label,
     div[data-testid="stTextArea"] label,
     div[data-testid="stSelectbox"] label,
+    div[data-testid="stMultiSelect"] label,
+    div[data-testid="stNumberInput"] label,
     div[data-testid="stRadio"] label {{
         color: {BODY_TEXT_COLOR} !important; font-weight: 600; font-family: {BODY_FONT}; margin-bottom: 0.5rem;
     }}
@@ -323,6 +450,11 @@ APP_STYLE = f"""
 
     /* --- App Card Styling --- */
     /* (App Card CSS remains mostly the same, including status badge) */
+    .app-grid {{
+        display: grid;
+        grid-template-columns: repeat(2, minmax(0, 1fr));
+        column-gap: 4rem; /* Matches the st.columns(gap="large") layout it replaces */
+    }}
     .app-card-link {{
         text-decoration: none !important;
         display: block;
@@ -372,8 +504,17 @@ APP_STYLE = f"""
         text-transform: uppercase;
         letter-spacing: 0.5px;
     }}
-    .card-status.active {{ background-color: {CHART_SUCCESS_COLOR}; }}
-    .card-status.inactive {{ background-color: {CHART_ERROR_COLOR}; }}
+    .card-status.up {{ background-color: {CHART_SUCCESS_COLOR}; }}
+    .card-status.degraded {{ background-color: {CHART_WARNING_COLOR}; }}
+    .card-status.down {{ background-color: {CHART_ERROR_COLOR}; }}
+    .card-status.unknown, .card-status.coming-soon {{ background-color: {INPUT_BORDER_COLOR}; }}
+    .app-card .card-icon {{
+        width: 48px;
+        height: 48px;
+        margin-bottom: 0.8rem;
+        z-index: 1;
+        position: relative;
+    }}
     .app-card .card-title {{
         font-family: {CARD_TITLE_FONT};
         font-weight: 600;
@@ -409,6 +550,19 @@ APP_STYLE = f"""
         transition: opacity 0.3s ease, transform 0.3s ease;
         z-index: 2;
     }}
+    .card-sparkline {{
+        display: block;
+        margin-top: 0.4rem;
+        overflow: visible;
+    }}
+    .card-sparkline polyline {{
+        fill: none;
+        stroke: {PRIMARY_ACCENT_COLOR};
+        stroke-width: 1.5;
+        stroke-linecap: round;
+        stroke-linejoin: round;
+    }}
+    .card-sparkline .outage {{ fill: {CHART_ERROR_COLOR}; }}
     .app-card:hover .card-arrow {{
         opacity: 1;
         transform: translateX(0);
@@ -477,6 +631,9 @@ APP_STYLE = f"""
         .footer {{ margin-top: 2rem; font-size: 0.8rem; }}
         div[data-testid="stExpander"] div[role="button"] p {{ font-size: 1.1em; }}
          div[data-testid="stExpander"] > div > div {{ padding: 0 15px 15px 15px; }}
+    }}
+    @media (max-width: 640px) {{
+        .app-grid {{ grid-template-columns: 1fr; }} /* Cards stack where st.columns used to */
     }}
      @media (max-width: 480px) {{
          .header-container {{
@@ -501,149 +658,248 @@ APP_STYLE = f"""
 </style>
 """
 
+def build_shell_style():
+    """The theme purged and minified: an @import of the published stylesheet, or inline when that is unavailable.
+
+    Self-hosted fonts get preload hints, so they download alongside the styles instead of after them.
+    """
+    words = css_vocabulary(current_dir.glob("*.py"))
+
+    def theme_css(url_base):
+        font_css = font_face_css(web_fonts, partial(asset_url, base=url_base))
+        css = minify_css(build_app_style(font_css).strip().removeprefix("<style>").removesuffix("</style>"))
+        return purge_css(css, words)
+
+    preload = preload_links(web_fonts)
+    if SHELL_STYLESHEET and static_manifest:
+        try:
+            # Font URLs in a stylesheet resolve against the stylesheet's own location, app/static/assets/
+            stylesheet = publish_text_asset("shell", "css", theme_css(".."))
+            return f'{preload}<style>@import url("{asset_url(stylesheet)}");</style>'
+        except OSError:
+            pass  # Read-only filesystem: keep it inline
+    return f"{preload}<style>{theme_css(STATIC_URL_PREFIX)}</style>"
+
 # --- 3. Inject the custom CSS ---
-st.markdown(APP_STYLE, unsafe_allow_html=True)
+with run_trace.span("css_injection"):
+    APP_STYLE = render_cache.render(
+        ("app_style", APP_SOURCE_DIGEST, STATIC_FINGERPRINT, tuple(face["path"] for face in web_fonts)), build_shell_style,
+    )
+    st.markdown(run_trace.payload("css", APP_STYLE), unsafe_allow_html=True)
 
 # --- Header (Logo and Title - Adopted from Apex) ---
 # Use the markdown structure from the reference code
-st.markdown(
-    f"""
+def build_header_html():
+    return minify_html(f"""
     <div class="header-container">
         {logo_html}
         <h1 class="title">Phronesis Nexus</h1>
     </div>
-    """,
+    """)
+
+st.markdown(
+    run_trace.payload("header", render_cache.render(("header", APP_SOURCE_DIGEST, logo_html), build_header_html)),
     unsafe_allow_html=True
 )
 
-# --- Placeholder for solutions data (remains the same) ---
-solutions = [
-  {
-      "name": "Phronesis Pulse 2.0",
-      "description": "Use unique Yahoo Finance Tickers to extract company profile and financial details",
-      "status": "ACTIVE",
-      "version": "2.0",
-      "documentation": "[Documentation](http://example.com/doc1)",
-      "feedback": "[Feedback](http://example.com/feedback1)",
-      "link": "http://192.168.4.126:9001",
-      "image": "icons/pulse_icon.png"
-  },
-  {
-      "name": "Database Search Engine",
-      "description": "Company database interactive front-end",
-      "status": "ACTIVE",
-      "version": "Beta",
-      "documentation": "[Documentation](http://example.com/doc2)",
-      "feedback": "[Feedback](http://example.com/feedback2)",
-      "link": "http://192.168.4.126:9002",
-      "image": "icons/explore_icon.png"
-  },
-  {
-      "name": "UID Generator",
-      "description": "Generate unique IDs for Companies",
-      "status": "ACTIVE",
-      "version": "Beta",
-      "documentation": "[Documentation](http://example.com/doc4)",
-      "feedback": "[Feedback](http://example.com/feedback4)",
-      "link": "http://192.168.4.126:9003",
-      "image": "icons/uid_icon.png"
-  },
-  {
-      "name": "IP: Geospatial Data Extraction",
-      "description": "Bulk Extraction and Dashboard of IP addresses",
-      "status": "ACTIVE",
-      "version": "Alpha",
-      "documentation": "[Documentation](http://example.com/doc4)",
-      "feedback": "[Feedback](http://example.com/feedback4)",
-      "link": "http://192.168.4.126:9004",
-      "image": "icons/ip_icon.png"
-  },
-  {
-      "name": "Database Updater",
-      "description": "Company database updates",
-      "status": "COMING SOON!",
-      "version": "Pre-Beta",
-      "documentation": "[Documentation](http://example.com/doc3)",
-      "feedback": "[Feedback](http://example.com/feedback3)",
-      "link": "http://192.168.4.126:9005",
-      "image": "icons/comingsoon.png"
-  }
-]
-
-# --- Function to generate HTML for an App Card (Using 'Active' only as before) ---
-def generate_app_card_html(solution):
-    """Generates the HTML string for a single solution card with status indicator (ALWAYS ACTIVE)."""
-    status_class = "active"
-    status_text = "Active"
+# --- Solutions catalog (solutions.json, validated and hot-reloaded; shared by all sessions) ---
+@st.cache_resource
+def get_catalog_loader():
+    return CatalogLoader()
+
+catalog = get_catalog_loader().get()
+solutions = catalog.solutions
+
+# --- Search index (built once per catalog version, shared by all sessions) ---
+@st.cache_resource(max_entries=2)
+def get_search_index(catalog_version, _catalog):
+    return SearchIndex(_catalog)
+
+search_index = get_search_index(catalog.version, catalog)
+
+# --- Usage analytics (ring buffer + background batcher, one per process) ---
+@st.cache_resource
+def get_analytics():
+    recorder = open_analytics()
+    atexit.register(recorder.close)  # Flush buffered events on shutdown
+    return recorder
+
+analytics = get_analytics()
+
+# --- Tracked click-through: record the open, then forward this tab to the tool ---
+open_slug = st.query_params.get("open")
+if open_slug and open_slug in catalog.by_slug:
+    opened = catalog.by_slug[open_slug]
+    analytics.record(TOOL_OPEN, tool=opened.name)
+    st.markdown(run_trace.payload("redirect", f'<meta http-equiv="refresh" content="0; url={tool_url(opened)}">'), unsafe_allow_html=True)
+    st.markdown(run_trace.payload("redirect", f"<h3 class='jobs-quote'>Opening {opened.name}…<br><a href=\"{tool_url(opened)}\">Continue</a></h3>"), unsafe_allow_html=True)
+    st.stop()
+
+# --- Health probing (one background monitor per process; renders only read its cache) ---
+@st.cache_resource
+def get_health_monitor():
+    history = open_health_history()  # Uptime / latency history, downsampled and saved to disk
+    atexit.register(history.flush, force=True)
+    return HealthMonitor(history=history).start()
+
+health_monitor = get_health_monitor()
+health_monitor.set_targets(solution.link for solution in solutions)  # No-op unless the catalog changed
+
+HEALTH_LABELS = {"up": "Up", "degraded": "Degraded", "down": "Down", "unknown": "Checking"}
+SPARKLINE_WIDTH = 96
+SPARKLINE_HEIGHT = 20
+
+def generate_sparkline_svg(summary):
+    """Inline SVG of the hourly mean latency over the last day; hours with an outage are marked red along the bottom."""
+    points = summary.latency_ms
+    peak = max((value for value in points if value is not None), default=None)
+    if peak is None and not any(summary.outages):
+        return ""
+    step = SPARKLINE_WIDTH / (len(points) - 1)
+    lines, line = [], []
+    for index, value in enumerate(points):
+        if value is None:  # No answer that hour: break the line
+            if line:
+                lines.append(line)
+            line = []
+            continue
+        y = SPARKLINE_HEIGHT - 3 - (SPARKLINE_HEIGHT - 6) * value / max(peak, 1)
+        line.append(f"{index * step:.1f},{y:.1f}")
+    if line:
+        lines.append(line)
+    polylines = "".join(f'<polyline points="{" ".join(line * (2 if len(line) == 1 else 1))}"/>' for line in lines)
+    outages = "".join(
+        f'<rect class="outage" x="{max(0.0, (index - 0.5) * step):.1f}" y="{SPARKLINE_HEIGHT - 2}" width="{step:.1f}" height="2"/>'
+        for index, outage in enumerate(summary.outages) if outage
+    )
+    title = f"Mean latency per hour, last {len(points)} h" + (f" (peak {peak} ms)" if peak is not None else "")
+    return (
+        f'<svg class="card-sparkline" width="{SPARKLINE_WIDTH}" height="{SPARKLINE_HEIGHT}" '
+        f'viewBox="0 0 {SPARKLINE_WIDTH} {SPARKLINE_HEIGHT}" role="img"><title>{title}</title>{polylines}{outages}</svg>'
+    )
+
+# --- Function to generate HTML for an App Card ---
+def generate_app_card_html(solution, health=UNKNOWN_RESULT, history=EMPTY_SUMMARY):
+    """Generates the HTML string for a single solution card with its live health status and history.
+
+    Solutions not declared ACTIVE (e.g. "COMING SOON!") show their declared status instead, and no history.
+    """
+    declared_status = solution.status
+    if declared_status.upper() != "ACTIVE":
+        status_class = "coming-soon"
+        status_text = declared_status.title()
+    else:
+        status_class = health.state
+        status_text = HEALTH_LABELS[health.state]
     status_indicator_html = f'<span class="card-status {status_class}">{status_text}</span>'
+    latency_html = f' · <strong>Latency:</strong> {health.latency_ms:.0f} ms' if health.latency_ms is not None else ""
+    if declared_status.upper() == "ACTIVE":
+        uptime_html = f' · <strong>Uptime (30d):</strong> {history.uptime_percent:.1f}%' if history.uptime_percent is not None else ""
+        sparkline_html = generate_sparkline_svg(history)
+    else:
+        uptime_html = sparkline_html = ""
+    card_href = card_url(solution)
+    icon = static_images.get(solution.image)
+    icon_html = picture_html(icon, "", "card-icon", lazy=True) if icon else ""
 
     card_html = f"""
-    <a href="{solution.get('link', '#')}" target="_blank" class="app-card-link" title="{solution.get('description', 'No description')}">
+    <a href="{card_href}" target="_blank" class="app-card-link" title="{solution.description}">
         <div class="app-card">
             {status_indicator_html}
-            <h2 class="card-title">{solution.get('name', 'Unnamed Solution')}</h2>
+            {icon_html}
+            <h2 class="card-title">{solution.name}</h2>
             <p class="card-description">
-                {solution.get('description', 'No description provided.')}<br>
-                <strong>Version:</strong> {solution.get('version', 'N/A')}
+                {solution.description}<br>
+                <strong>Version:</strong> {solution.version}{latency_html}{uptime_html}
+                {sparkline_html}
             </p>
             <span class="card-arrow">→</span>
         </div>
     </a>
     """
-    return card_html
+    return minify_html(card_html)
+
+def generate_grid_html(solutions, health, history):
+    """All cards of a page in one CSS grid block: one element and one delta however many cards there are.
+
+    Cards are cached on their own, so a health change only re-renders the cards it touched.
+    """
+    cards = "".join(
+        render_cache.render(
+            ("card", APP_SOURCE_DIGEST, STATIC_FINGERPRINT, solution, result.state, result.latency_ms, summary),
+            lambda: generate_app_card_html(solution, result, summary),
+        )
+        for solution, result, summary in zip(solutions, health, history)
+    )
+    return f'<div class="app-grid">{cards}</div>'
+
+# --- Feedback storage (one append-only store and one writer thread per process, shared by all sessions) ---
+@st.cache_resource
+def get_feedback_writer():
+    writer = FeedbackWriter(open_feedback_store(), on_flush=lambda count, elapsed_ms: telemetry.observe("feedback_flush", elapsed_ms))
+    atexit.register(writer.close)  # Drain queued submissions on shutdown
+    return writer
 
-# --- feedback_form function (remains the same) ---
-def feedback_form():
+# Size caps, per-session / per-IP rate limits and duplicate detection, shared by all sessions
+@st.cache_resource
+def get_feedback_guard():
+    return FeedbackGuard()
+
+# Near-duplicate clusters for the admin view; built on first use, then only fed new rows
+@st.cache_resource
+def get_feedback_clusters():
+    return FeedbackClusterIndex()
+
+# --- feedback_form function ---
+def feedback_form(trace):
   """Renders the feedback form elements within a pre-styled container."""
-  user_name = st.text_input("Your Name", key="user_name")
-  solution_names = [solution['name'] for solution in solutions]
-  selected_solution = st.selectbox("Select Solution", solution_names, key="selected_solution")
-  feedback_category = st.selectbox("Feedback Category", ["Status Inactive", "Urgent Fix", "New features request", "General feedback"], key="feedback_category")
-  feedback = st.text_area("Your Feedback", height=150, key="feedback")
+  user_name = st.text_input("Your Name", max_chars=MAX_NAME_CHARS, key="user_name")
+  selected_solution = st.selectbox("Select Solution", catalog.names, key="selected_solution")
+  feedback_category = st.selectbox("Feedback Category", FEEDBACK_CATEGORIES, key="feedback_category")
+  feedback = st.text_area("Your Feedback", height=150, max_chars=MAX_FEEDBACK_CHARS, key="feedback")
   if st.button("Submit Feedback", type="primary"):
       if not user_name or not feedback:
           st.warning("Please fill in all fields.")
           return
 
+      # The widgets' max_chars is only enforced in the browser; the guard re-checks sizes server-side
+      guard = get_feedback_guard()
+      # Rate-limited per browser, so reloading the page does not refill the bucket; per session without the cookie
+      session_id = browser_id(st.context.cookies) or st.session_state.setdefault("feedback_session_id", new_idempotency_key())
+      try:
+          # Identical feedback is only refused within the guard's dedup window; the store keeps repeats
+          admission = guard.check(session_id, client_address(st.context.headers.get("X-Forwarded-For")),
+                                  selected_solution, user_name, feedback_category, feedback)
+      except FeedbackRejected as e:
+          st.warning(str(e))
+          return
+
       current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+      # One key per filled-in form: a rerun that resubmits it is dropped by the store, on any instance
+      submission_key = st.session_state.setdefault("feedback_submission_key", new_idempotency_key())
       feedback_data = {
           "Name": user_name,
           "Time": current_time,
           "Category": feedback_category,
-          "Feedback": feedback
+          "Feedback": feedback,
+          IDEMPOTENCY_KEY: submission_key,
       }
-      df = pd.DataFrame([feedback_data])
-      file_path = 'feedback.xlsx'
-      try:
-          try:
-              # Try reading the specific sheet
-              existing_data = pd.read_excel(file_path, sheet_name=selected_solution)
-              new_data = pd.concat([existing_data, df], ignore_index=True)
-          except FileNotFoundError:
-              # If file doesn't exist, create a new DataFrame
-              new_data = df
-              # Ensure excel writer starts in write ('w') mode if file is new
-              write_mode = 'w'
-          except ValueError: # Handles case where sheet doesn't exist in an existing file
-              new_data = df
-              write_mode = 'a' # Append mode if file exists but sheet doesn't
+      # Hand off to the background writer, then wait (briefly) for the write to land before confirming
+      with trace.span("feedback_submit"):
+          receipt = get_feedback_writer().submit(selected_solution, feedback_data)
+          written = receipt.wait(SUBMIT_CONFIRM_SECONDS) if receipt else False
+      if written is False:
+          guard.release(admission)  # Nothing was stored: the retry must not count as a duplicate or cost a token
+          if receipt:
+              st.error("We could not save your feedback just now. Please try again in a moment.")
           else:
-              # If sheet was read successfully, use append mode
-              write_mode = 'a'
-
-          # Use ExcelWriter for more control over sheet writing/overwriting
-          # if_sheet_exists='replace' will overwrite the sheet if it exists, 'overlay' might be safer but complex
-          with pd.ExcelWriter(file_path, mode=write_mode, engine='openpyxl', if_sheet_exists='replace') as writer:
-              new_data.to_excel(writer, sheet_name=selected_solution, index=False)
-              # If opening in 'w' mode, ensure other sheets aren't lost (this requires reading all sheets first)
-              # Simpler approach for now: 'replace' assumes you manage sheets individually
-
+              st.error("Feedback is arriving faster than it can be saved right now. Please try again in a moment.")
+          return
+      st.session_state["feedback_submission_key"] = new_idempotency_key()  # The next submission is a new one
+      if written:
           st.success(f"Thank you for your feedback on {selected_solution}!")
-
-      except PermissionError:
-          st.error(f"Permission denied: Could not write to {file_path}. Ensure the file is not open elsewhere and the application has write permissions.")
-      except Exception as e:
-          st.error(f"An error occurred saving feedback: {e}")
+      else:
+          st.info(f"Thank you! Your feedback on {selected_solution} is queued and will be saved shortly.")
 
 
 # --- Main App Layout (Simplified Top Section) ---
@@ -657,35 +913,145 @@ def feedback_form():
 # --- REMOVED Available Solutions Header ---
 # st.markdown("<h2>Available Solutions</h2>", unsafe_allow_html=True)
 
+# --- Feedback Admin view (?view=admin) replaces the portal layout ---
+if st.query_params.get("view") == "admin":
+    if admin_authorized(ADMIN_TOKEN, allow_without_token=DEBUG_MODE):
+        render_feedback_admin(get_feedback_writer(), catalog.names, get_feedback_clusters())
+    st.stop()
+
 # --- Steve Jobs Quote (Kept) ---
 # Using the specific class 'jobs-quote' for styling defined in CSS
-st.markdown("<h3 class='jobs-quote'>\"You cannot mandate productivity, you must provide the tools to let people become their best.\" <br>— Steve Jobs</h3>", unsafe_allow_html=True)
+st.markdown(run_trace.payload("quote", "<h3 class='jobs-quote'>\"You cannot mandate productivity, you must provide the tools to let people become their best.\" <br>— Steve Jobs</h3>"), unsafe_allow_html=True)
+
+# --- Fragments: panels whose widgets rerun only the panel, not the styles, header and footer ---
+def fragment_rerun():
+    """True while Streamlit reruns only a fragment (a widget inside it changed), not the whole script."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+@contextlib.contextmanager
+def fragment_trace():
+    """The RunTrace a fragment records into: the page's during a full run, its own when it reruns alone."""
+    if not fragment_rerun():
+        yield run_trace
+        return
+    started = time.perf_counter()
+    trace = telemetry.start_run()  # The page's run_trace was finished when its run ended
+    try:
+        yield trace
+    finally:
+        # The top of the script did not run: keep the session live and the run counted
+        touch_session(session_registry)
+        analytics.record(RERUN, value=(time.perf_counter() - started) * 1000)
+        telemetry.finish_run(trace)
+
+# --- Search & Filters ---
+CARDS_PER_PAGE = 10
 
-# --- Display Solutions Cards ---
-num_columns = 2
-cols = st.columns(num_columns, gap="large") # Add gap like Apex example
+def reset_search_page():
+    st.session_state["search_page"] = 1
 
-for index, solution in enumerate(solutions):
-    card_html = generate_app_card_html(solution)
-    with cols[index % num_columns]:
-        st.markdown(card_html, unsafe_allow_html=True)
+@st.fragment
+def tool_grid():
+    """Search filters, the matching cards and the pager; filtering reruns just this."""
+    with fragment_trace() as trace:
+        search_col, tag_col, status_col = st.columns([2, 1, 1])
+        with search_col:
+            search_query = st.text_input("Search Tools", key="search_query", placeholder="Name, description or version", on_change=reset_search_page)
+        with tag_col:
+            search_tags = st.multiselect("Tags", search_index.tags, key="search_tags", on_change=reset_search_page)
+        with status_col:
+            search_statuses = st.multiselect("Status", search_index.statuses, key="search_statuses", on_change=reset_search_page)
+
+        # Only the requested page of matches is looked up and rendered
+        search_page = st.session_state.get("search_page", 1)
+        page_solutions, total_matches = search_index.search(search_query, search_tags, search_statuses, search_page, CARDS_PER_PAGE)
+        num_pages = max(1, math.ceil(total_matches / CARDS_PER_PAGE))
+        if search_page > num_pages:
+            search_page = st.session_state["search_page"] = num_pages
+            page_solutions, total_matches = search_index.search(search_query, search_tags, search_statuses, search_page, CARDS_PER_PAGE)
+
+        # --- Display Solutions Cards (one grid element for the whole page) ---
+        if not page_solutions:
+            st.info("No tools match your search.")
+        else:
+            health = tuple(health_monitor.get(solution.link) for solution in page_solutions)
+            history = tuple(health_monitor.history.summary(solution.link) for solution in page_solutions)  # Cached per hour and sample
+            with trace.span("grid_generation"):  # One lookup per run, shared by every session showing this page
+                grid_html = render_cache.render(
+                    ("grid", APP_SOURCE_DIGEST, STATIC_FINGERPRINT, catalog.version,
+                     tuple(solution.name for solution in page_solutions), tuple((result.state, result.latency_ms) for result in health), history),
+                    lambda: generate_grid_html(page_solutions, health, history),
+                )
+            st.markdown(trace.payload("grid", grid_html), unsafe_allow_html=True)
+
+        if num_pages > 1:
+            first_shown = (search_page - 1) * CARDS_PER_PAGE + 1
+            st.caption(f"Showing {first_shown}–{first_shown + len(page_solutions) - 1} of {total_matches} tools")
+            st.number_input("Page", min_value=1, max_value=num_pages, step=1, key="search_page")
+
+tool_grid()
+
+
+# --- Feedback Section (a fragment: typing in the form reruns only this panel) ---
+@st.fragment
+def feedback_panel():
+  """Feedback form; its widgets rerun just this function."""
+  with fragment_trace() as trace:
+      st.markdown(trace.payload("feedback", '<div class="theme-container">'), unsafe_allow_html=True)
+      st.markdown(trace.payload("feedback", "<h3>Feedback Form</h3>"), unsafe_allow_html=True) # Title inside container
+      feedback_form(trace)
+      st.markdown(trace.payload("feedback", '</div>'), unsafe_allow_html=True)
 
 
-# --- Feedback Section (remains the same) ---
 with st.expander("Click to expand Feedback Form", expanded=False):
-    st.markdown('<div class="theme-container">', unsafe_allow_html=True)
-    st.markdown("<h3>Feedback Form</h3>", unsafe_allow_html=True) # Title inside container
-    feedback_form()
-    st.markdown('</div>', unsafe_allow_html=True)
+    feedback_panel()
 
 
 # --- Footer (Adopted from Apex) ---
 st.markdown(
-    f"""
-    <div class="footer">
-        <p>© 2025 Phronesis Partners. All rights reserved.</p>
-    </div>
-    """,
+    run_trace.payload("footer", '<div class="footer"><p>© 2025 Phronesis Partners. All rights reserved.</p></div>'),
     unsafe_allow_html=True
 )
 
+if DEBUG_MODE:
+    cache_stats = render_cache.stats()
+    st.caption(f"Render cache: {cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']} hits / {cache_stats['misses']} misses)")
+    writer_stats = get_feedback_writer().stats()
+    st.caption(f"Feedback writer: {writer_stats['queue_depth']} queued · last flush {writer_stats['last_flush_ms']} ms · avg {writer_stats['avg_flush_ms']} ms")
+    st.caption(f"Feedback guard: {get_feedback_guard().stats()}")
+    st.caption(f"Sessions: {session_registry.stats()}")
+    with st.expander("Usage Analytics (last 7 days)"):
+        st.markdown(run_trace.payload("debug", "<h6>Tool opens per day</h6>"), unsafe_allow_html=True)
+        st.dataframe([{"Day": day, "Tool": tool, "Opens": opens} for day, tool, opens in analytics.store.tool_opens()], use_container_width=True)
+        st.markdown(run_trace.payload("debug", "<h6>Page views and p95 render time</h6>"), unsafe_allow_html=True)
+        st.dataframe([{"Day": day, "Page Views": views, "p95 Render (ms)": p95} for day, views, p95 in analytics.store.render_stats()], use_container_width=True)
+        st.caption(f"Analytics buffer: {analytics.stats()}")
+    with st.expander(f"Render Timings (last {telemetry.history} runs)"):
+        timing_rows = []
+        for trace in reversed(telemetry.recent_runs()):
+            span_ms, payload_bytes = trace.summary()
+            timing_rows.append({
+                "Started": datetime.fromtimestamp(trace.start_time_ns / 1e9).strftime("%H:%M:%S"),
+                "Total (ms)": round(trace.duration_ns / 1e6, 1),
+                **{f"{name} (ms)": round(ms, 2) for name, ms in sorted(span_ms.items())},
+                "Markdown (KB)": round(sum(payload_bytes.values()) / 1024, 1),
+            })
+        st.dataframe(timing_rows, use_container_width=True)
+        prometheus_col, otel_col = st.columns(2)
+        with prometheus_col:
+            st.download_button("Prometheus metrics", telemetry.prometheus_text(), file_name="nexus-metrics.prom", mime="text/plain")
+        with otel_col:
+            st.download_button("OTel JSON traces", json.dumps(telemetry.otel_json()), file_name="nexus-traces.json", mime="application/json")
+
+# --- Page-view analytics: the first run of a session is a page view, later runs are reruns ---
+render_ms = (time.perf_counter() - RUN_STARTED) * 1000
+if st.query_params.get(WARMUP_QUERY_PARAM) == "1":
+    pass  # The container's start-up run (warmup.py), not a visitor
+elif not st.session_state.get("page_view_recorded"):
+    st.session_state["page_view_recorded"] = True
+    analytics.record(PAGE_VIEW, value=render_ms)
+else:
+    analytics.record(RERUN, value=render_ms)
+
+telemetry.finish_run(run_trace)
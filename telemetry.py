@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Render-path instrumentation: timing spans and payload sizes per script run.
+
+Each script run gets a RunTrace. The app wraps the interesting steps in
+``trace.span(name)`` and routes every ``st.markdown`` body through
+``trace.payload(label, body)``. Recording is a perf_counter_ns() pair and a
+list append; all aggregation happens once, in ``Telemetry.finish_run()``.
+
+The process-wide Telemetry keeps:
+
+* cumulative span histograms and payload counters, exported as Prometheus
+  text (``prometheus_text()``);
+* the last N runs with their individual spans, exported as OpenTelemetry-style
+  JSON (``otel_json()``) and shown in the debug panel.
+
+With NEXUS_METRICS_PATH set, the export is also written to that file (``.json``
+for OTel JSON, anything else for Prometheus text, e.g. for node_exporter's
+textfile collector) at most every NEXUS_METRICS_INTERVAL seconds.
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# --- Tuning ---
+HISTORY_SIZE = 20                 # Runs kept with their individual spans
+EXPORT_INTERVAL_SECONDS = 15.0
+SPAN_BUCKETS_SECONDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SERVICE_NAME = "phronesis-nexus"
+SCRIPT_RUN = "script_run"         # Span covering the whole run
+
+
+class RunTrace:
+    """Spans and markdown payload sizes recorded during one script run."""
+
+    __slots__ = ("trace_id", "start_time_ns", "started_ns", "spans", "payloads", "duration_ns")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.start_time_ns = time.time_ns()
+        self.started_ns = time.perf_counter_ns()
+        self.spans = []      # (name, offset from run start ns, duration ns)
+        self.payloads = []   # (label, utf-8 bytes)
+        self.duration_ns = None
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start - self.started_ns, time.perf_counter_ns() - start))
+
+    def payload(self, label, body):
+        """Count the size of a markdown body and return it unchanged."""
+        self.payloads.append((label, len(body.encode("utf-8"))))
+        return body
+
+    def summary(self):
+        """Total milliseconds per span name and bytes per payload label for this run."""
+        span_ms = collections.defaultdict(float)
+        for name, _, duration in self.spans:
+            span_ms[name] += duration / 1e6
+        payload_bytes = collections.defaultdict(int)
+        for label, size in self.payloads:
+            payload_bytes[label] += size
+        return dict(span_ms), dict(payload_bytes)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (non-cumulative counts; exporters accumulate)."""
+
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self, size):
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds, bounds):
+        for index, bound in enumerate(bounds):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+        self.count += 1
+        self.total += seconds
+
+
+class Telemetry:
+    """Process-wide aggregation of RunTraces plus Prometheus / OTel JSON export."""
+
+    def __init__(self, history=HISTORY_SIZE, export_path=None, export_interval=EXPORT_INTERVAL_SECONDS):
+        self.history = history
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._runs = collections.deque(maxlen=history)
+        self._histograms = {}
+        self._payload_calls = collections.Counter()
+        self._payload_bytes = collections.Counter()
+        self._last_export = 0.0
+
+    def start_run(self):
+        return RunTrace()
+
+    def finish_run(self, trace):
+        """Close the run's root span, fold it into the aggregates and export if due."""
+        trace.duration_ns = time.perf_counter_ns() - trace.started_ns
+        with self._lock:
+            self._observe(SCRIPT_RUN, trace.duration_ns / 1e9)
+            for name, _, duration in trace.spans:
+                self._observe(name, duration / 1e9)
+            for label, size in trace.payloads:
+                self._payload_calls[label] += 1
+                self._payload_bytes[label] += size
+            self._runs.append(trace)
+        if self.export_path and time.monotonic() - self._last_export >= self.export_interval:
+            self._last_export = time.monotonic()
+            self.write(self.export_path)
+
+    def observe(self, name, duration_ms):
+        """Record a span measured outside a script run (e.g. the feedback writer thread)."""
+        with self._lock:
+            self._observe(name, duration_ms / 1000)
+
+    def _observe(self, name, seconds):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram(len(SPAN_BUCKETS_SECONDS))
+        histogram.observe(seconds, SPAN_BUCKETS_SECONDS)
+
+    def recent_runs(self):
+        """Finished RunTraces, oldest first."""
+        with self._lock:
+            return list(self._runs)
+
+    # --- Export ---
+    def prometheus_text(self):
+        lines = [
+            "# HELP nexus_span_duration_seconds Time spent in instrumented render-path steps.",
+            "# TYPE nexus_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(SPAN_BUCKETS_SECONDS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'nexus_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'nexus_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'nexus_span_duration_seconds_sum{{span="{name}"}} {histogram.total:.6f}')
+                lines.append(f'nexus_span_duration_seconds_count{{span="{name}"}} {histogram.count}')
+            lines.append("# HELP nexus_markdown_payload_bytes_total Bytes sent through st.markdown, by element.")
+            lines.append("# TYPE nexus_markdown_payload_bytes_total counter")
+            for label, size in sorted(self._payload_bytes.items()):
+                lines.append(f'nexus_markdown_payload_bytes_total{{element="{label}"}} {size}')
+            lines.append("# HELP nexus_markdown_calls_total st.markdown calls, by element.")
+            lines.append("# TYPE nexus_markdown_calls_total counter")
+            for label, calls in sorted(self._payload_calls.items()):
+                lines.append(f'nexus_markdown_calls_total{{element="{label}"}} {calls}')
+        return "\n".join(lines) + "\n"
+
+    def otel_json(self):
+        """The recent runs as an OTLP/JSON-shaped ``resourceSpans`` document; one trace per run."""
+        spans = []
+        for trace in self.recent_runs():
+            root_id = os.urandom(8).hex()
+            _, payload_bytes = trace.summary()
+            spans.append({
+                "traceId": trace.trace_id,
+                "spanId": root_id,
+                "name": SCRIPT_RUN,
+                "startTimeUnixNano": str(trace.start_time_ns),
+                "endTimeUnixNano": str(trace.start_time_ns + trace.duration_ns),
+                "attributes": [
+                    {"key": f"payload.bytes.{label}", "value": {"intValue": str(size)}}
+                    for label, size in sorted(payload_bytes.items())
+                ],
+            })
+            for name, offset, duration in trace.spans:
+                spans.append({
+                    "traceId": trace.trace_id,
+                    "spanId": os.urandom(8).hex(),
+                    "parentSpanId": root_id,
+                    "name": name,
+                    "startTimeUnixNano": str(trace.start_time_ns + offset),
+                    "endTimeUnixNano": str(trace.start_time_ns + offset + duration),
+                })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": "nexus.render"}, "spans": spans}],
+            }]
+        }
+
+    def write(self, path):
+        """Atomically write the Prometheus text (or OTel JSON for ``.json`` paths) to ``path``."""
+        body = json.dumps(self.otel_json()) if str(path).endswith(".json") else self.prometheus_text()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+
+def open_telemetry():
+    """Telemetry configured from NEXUS_METRICS_PATH / NEXUS_METRICS_INTERVAL / NEXUS_METRICS_HISTORY."""
+    return Telemetry(
+        history=int(os.environ.get("NEXUS_METRICS_HISTORY", HISTORY_SIZE)),
+        export_path=os.environ.get("NEXUS_METRICS_PATH") or None,
+        export_interval=float(os.environ.get("NEXUS_METRICS_INTERVAL", EXPORT_INTERVAL_SECONDS)),
+    )
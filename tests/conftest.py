@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""The app's modules live at the repository root, next to streamlit_app.py."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
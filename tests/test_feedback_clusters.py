@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""MinHash clustering of feedback and the store cursor it reads new rows through."""
+import pytest
+
+from feedback_clusters import FeedbackClusterIndex, shingles
+from feedback_store import open_feedback_store
+
+COMPLAINT = "The export button does nothing when I click it on the dashboard page"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def record(feedback, time="2024-05-01 10:00:00", category="General feedback", name="Ada"):
+    return {"Name": name, "Time": time, "Category": category, "Feedback": feedback}
+
+
+@pytest.fixture(params=["sqlite", "jsonl"])
+def store(request, tmp_path):
+    store = open_feedback_store(request.param, str(tmp_path / request.param))
+    yield store
+    store.close()
+
+
+def test_shingles_fold_case_and_punctuation():
+    assert shingles("Hello,   WORLD!") == shingles("hello world")
+    assert shingles("ab") == {"ab"}
+
+
+def test_near_duplicates_share_a_cluster():
+    index = FeedbackClusterIndex()
+    first = index.add("Alpha", record(COMPLAINT))
+    assert index.add("Alpha", record(COMPLAINT.upper() + "!!")) == first
+    assert index.add("Alpha", record(COMPLAINT.replace("nothing", "nothing at all"))) == first
+    assert index.add("Alpha", record("Please add a dark mode to the portal")) != first
+    assert index.add("Beta", record(COMPLAINT)) != first  # Clusters never span solutions
+    assert [(cluster.solution, cluster.size) for cluster in index.clusters()] == [("Alpha", 3), ("Alpha", 1), ("Beta", 1)]
+
+
+def test_clusters_count_only_matching_submissions():
+    index = FeedbackClusterIndex()
+    index.add("Alpha", record(COMPLAINT, time="2024-05-02 09:00:00", category="Urgent Fix"))
+    index.add("Alpha", record(COMPLAINT + ".", time="2024-05-01 09:00:00"))
+    index.add("Alpha", record(COMPLAINT + "!", time="2024-05-03 09:00:00"))
+    cluster, = index.clusters()
+    assert (cluster.size, cluster.total, cluster.first_time, cluster.last_time) == (3, 3, "2024-05-01 09:00:00", "2024-05-03 09:00:00")
+    assert cluster.feedback == COMPLAINT + "."  # The earliest submission, whatever order rows arrived in
+
+    urgent, = index.clusters(categories=("Urgent Fix",))
+    assert (urgent.size, urgent.total, urgent.categories) == (1, 3, (("Urgent Fix", 1),))
+    assert index.clusters(since="2024-05-02 00:00:00")[0].size == 2
+    assert index.clusters(until="2024-05-02 00:00:00")[0].size == 1
+    assert index.clusters(text="export dashboard")[0].size == 3
+    assert index.clusters(text="dark mode") == []
+    assert index.clusters(solution="Beta") == []
+
+
+def test_refresh_reads_only_new_rows(store):
+    index = FeedbackClusterIndex()
+    store.append_many([("Alpha", record(COMPLAINT)), ("Beta", record("Please add a dark mode"))])
+    assert index.refresh(store, page_size=1) == 2
+    assert index.refresh(store) == 0
+    store.append("Alpha", record(COMPLAINT + "!", time="2024-04-01 10:00:00"))  # Stored late with an older Time
+    assert index.refresh(store) == 1
+    assert index.stats()["records"] == 3
+    assert [cluster.size for cluster in index.clusters(solution="Alpha")] == [2]
+
+
+def test_refresh_if_stale_skips_recent_refreshes(store):
+    clock = Clock()
+    index = FeedbackClusterIndex(clock=clock)
+    assert index.refreshed_ago() is None
+    store.append("Alpha", record(COMPLAINT))
+    assert index.refresh_if_stale(store, min_interval=30) == 1
+    store.append("Alpha", record(COMPLAINT + "!"))
+    clock.now = 10.0
+    assert index.refresh_if_stale(store, min_interval=30) is None
+    assert index.refreshed_ago() == 10.0
+    clock.now = 31.0
+    assert index.refresh_if_stale(store, min_interval=30) == 1
+
+
+def test_read_after_pages_in_storage_order(store):
+    store.append_many([(("Alpha", "Beta")[index % 2], record(f"feedback {index}", time=f"2024-05-0{9 - index} 10:00:00"))
+                       for index in range(5)])
+    seen, cursor = [], None
+    while True:
+        rows, cursor = store.read_after(cursor, limit=2)
+        seen.extend(rows)
+        if len(rows) < 2:
+            break
+    assert sorted(row["Feedback"] for row in seen) == [f"feedback {index}" for index in range(5)]
+    assert {row["Solution"] for row in seen} == {"Alpha", "Beta"}
+    assert len({row["id"] for row in seen}) == 5
+    store.append("Alpha", record("late", time="2000-01-01 00:00:00"))
+    rows, cursor = store.read_after(cursor)
+    assert [row["Feedback"] for row in rows] == ["late"]
+    assert store.read_after(cursor) == ([], cursor)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Streaming exports from a SQLite feedback store, read back with the same libraries."""
+import csv
+import io
+from pathlib import Path
+
+import pytest
+
+from catalog import load_catalog
+from feedback_export import EXPORT_COLUMNS, SHEET_TITLE_LIMIT, export_feedback, sheet_title
+from feedback_migrate import sheet_solution
+from feedback_store import FEEDBACK_COLUMNS, SQLiteFeedbackStore
+
+CATALOG_PATH = Path(__file__).resolve().parent.parent / "solutions.json"
+
+
+def record(index, category="General feedback"):
+    return {"Name": f"user {index}", "Time": f"2024-05-01 10:{index // 60:02d}:{index % 60:02d}",
+            "Category": category, "Feedback": f"feedback {index}"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteFeedbackStore(tmp_path / "feedback.db")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def catalog_names():
+    return [solution.name for solution in load_catalog(str(CATALOG_PATH))]
+
+
+def test_sheet_title_cleans_forbidden_characters():
+    assert sheet_title("IP: Geospatial Data Extraction") == "IP- Geospatial Data Extraction"
+    assert sheet_title("a/b\\c?d*e[f]g") == "a-b-c-d-e-f-g"
+    assert sheet_title("'quoted'") == "quoted"
+    assert len(sheet_title("x" * 40)) == SHEET_TITLE_LIMIT
+    assert sheet_title(("y" * 30) + "'z") == "y" * 30  # No quote left at the cut
+    assert sheet_title("''") == "Feedback"
+
+
+def test_xlsx_export_of_the_shipped_catalog(store, catalog_names, tmp_path):
+    from openpyxl import load_workbook
+
+    # Regression: "IP: Geospatial Data Extraction" used to raise "Invalid character : found in sheet title"
+    assert any(":" in name for name in catalog_names)
+    store.append_many([(name, record(index)) for index, name in enumerate(catalog_names)])
+    destination = tmp_path / "feedback.xlsx"
+    assert export_feedback(store, "xlsx", str(destination)) == len(catalog_names)
+
+    workbook = load_workbook(destination, read_only=True)
+    try:
+        titles = workbook.sheetnames
+        assert sorted(titles) == sorted(sheet_title(name) for name in catalog_names)
+        for title in titles:
+            rows = list(workbook[title].iter_rows(values_only=True))
+            assert rows[0] == FEEDBACK_COLUMNS and len(rows) == 2
+            # The migration maps every exported sheet back to its catalog name
+            assert sheet_solution(title, catalog_names) in catalog_names
+    finally:
+        workbook.close()
+
+
+def test_xlsx_titles_stay_unique(store, tmp_path):
+    from openpyxl import load_workbook
+
+    names = ["A/B", "A:B", "a-b", "z" * 40, "z" * 41]
+    store.append_many([(name, record(index)) for index, name in enumerate(names)])
+    destination = tmp_path / "feedback.xlsx"
+    export_feedback(store, "xlsx", str(destination))
+    workbook = load_workbook(destination, read_only=True)
+    try:
+        titles = workbook.sheetnames
+    finally:
+        workbook.close()
+    assert len({title.casefold() for title in titles}) == len(names)
+    assert all(len(title) <= SHEET_TITLE_LIMIT for title in titles)
+
+
+def test_csv_export_streams_every_row(store):
+    items = [("Alpha", record(index)) for index in range(7)] + [("Beta", record(index, "Urgent Fix")) for index in range(3)]
+    store.append_many(items)
+    buffer = io.BytesIO()
+    assert export_feedback(store, "csv", buffer) == 10
+    rows = list(csv.reader(io.StringIO(buffer.getvalue().decode("utf-8"))))
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert [row[0] for row in rows[1:]] == ["Alpha"] * 7 + ["Beta"] * 3
+    assert rows[1][1:] == [record(0)[column] for column in FEEDBACK_COLUMNS]
+
+
+def test_parquet_export(store, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    store.append_many([("Alpha", record(index)) for index in range(5)])
+    destination = tmp_path / "feedback.parquet"
+    assert export_feedback(store, "parquet", str(destination)) == 5
+    table = pq.read_table(destination)
+    assert table.column_names == list(EXPORT_COLUMNS) and table.num_rows == 5
+
+
+def test_unknown_format(store):
+    with pytest.raises(ValueError):
+        export_feedback(store, "ods", io.BytesIO())
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""FeedbackGuard, its token buckets and the client / browser identification helpers."""
+import threading
+
+import pytest
+
+from feedback_guard import (MAX_FEEDBACK_CHARS, FeedbackGuard, FeedbackRejected, TokenBucketLimiter, browser_id,
+                            client_address, content_hash)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def guard(clock):
+    return FeedbackGuard(TokenBucketLimiter(2, 1), TokenBucketLimiter(5, 10), dedup_window=60, clock=clock)
+
+
+def submit(guard, text, session_id="s1", client_ip="10.0.0.1"):
+    return guard.check(session_id, client_ip, "Alpha", "Ada", "General feedback", text)
+
+
+def test_token_bucket_refills_up_to_burst():
+    limiter = TokenBucketLimiter(burst=2, per_minute=60)
+    limiter.take("k", 0.0)
+    limiter.take("k", 0.0)
+    assert limiter.available("k", 0.0) == 0
+    assert limiter.retry_after("k", 0.0) == pytest.approx(1.0)
+    assert limiter.available("k", 0.5) == pytest.approx(0.5)
+    assert limiter.available("k", 100.0) == 2
+    limiter.refund("k", 0.0)
+    assert limiter.available("k", 0.0) == 1
+    limiter.refund("unknown", 0.0)
+    assert len(limiter) == 1
+
+
+def test_token_bucket_evicts_least_recently_used():
+    limiter = TokenBucketLimiter(burst=2, per_minute=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.take(key, 0.0)
+    assert len(limiter) == 2
+    assert limiter.available("a", 0.0) == 2  # Dropped: a fresh bucket again
+    assert limiter.available("c", 0.0) == 1
+
+
+def test_client_address_skips_client_supplied_hops():
+    assert client_address("203.0.113.9") == "203.0.113.9"
+    assert client_address("1.2.3.4, 203.0.113.9", trusted_hops=1) == "203.0.113.9"
+    assert client_address("1.2.3.4, 203.0.113.9, 10.0.0.2", trusted_hops=2) == "203.0.113.9"
+    assert client_address("203.0.113.9", trusted_hops=3) == "203.0.113.9"
+    assert client_address("", trusted_hops=1) is None
+    assert client_address(None) is None
+    assert client_address("1.2.3.4", trusted_hops=0) is None
+
+
+def test_browser_id_ignores_the_cookie_mask():
+    token = bytes(range(16))
+
+    def cookie(mask):
+        masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(token))
+        return f"2|{mask.hex()}|{masked.hex()}|1700000000"
+
+    first = browser_id({"_streamlit_xsrf": cookie(b"\x01\x02\x03\x04")})
+    assert first and first == browser_id({"_streamlit_xsrf": cookie(b"\xaa\xbb\xcc\xdd")})
+    assert browser_id({"_streamlit_xsrf": token.hex()}) != first
+    assert browser_id({"_streamlit_xsrf": "2|zz|00|1"}) is None
+    assert browser_id({}) is None
+    assert browser_id(None) is None
+
+
+def test_content_hash_folds_case_and_whitespace():
+    assert content_hash("A", "Ada", "Bug", "It  is\nbroken") == content_hash("a", "ADA ", "bug", "it is broken")
+    assert content_hash("A", "Ada", "Bug", "broken") != content_hash("B", "Ada", "Bug", "broken")
+
+
+def test_check_refuses_duplicates_within_the_window(guard, clock):
+    submit(guard, "broken")
+    with pytest.raises(FeedbackRejected, match="already received"):
+        submit(guard, "  BROKEN ", session_id="s2")
+    clock.now += 61
+    submit(guard, "broken")
+    assert guard.stats()["refused"] == {"duplicate": 1}
+
+
+def test_check_rate_limits_per_session(guard, clock):
+    submit(guard, "one")
+    submit(guard, "two")
+    with pytest.raises(FeedbackRejected, match="too quickly"):
+        submit(guard, "three")
+    submit(guard, "three", session_id="s2")  # Another browser behind the same IP
+    clock.now += 60
+    submit(guard, "four")
+    assert guard.stats()["refused"] == {"rate_limited": 1}
+
+
+def test_check_rate_limits_per_ip(guard):
+    for index in range(5):
+        submit(guard, f"text {index}", session_id=f"s{index}")
+    with pytest.raises(FeedbackRejected, match="too quickly"):
+        submit(guard, "one more", session_id="fresh")
+    submit(guard, "one more", session_id="fresh", client_ip="10.0.0.2")
+
+
+def test_check_refuses_oversized_feedback(guard):
+    with pytest.raises(FeedbackRejected, match="under"):
+        submit(guard, "x" * (MAX_FEEDBACK_CHARS + 1))
+    assert guard.stats()["sessions_tracked"] == 0
+
+
+def test_release_refunds_and_forgets(guard):
+    admission = submit(guard, "one")
+    submit(guard, "two")
+    guard.release(admission)
+    submit(guard, "one")  # Neither a duplicate nor over the limit any more
+    assert guard.stats()["refused"] == {"not_stored": 1}
+
+
+def test_release_keeps_a_later_admission_of_the_same_text(guard, clock):
+    stale = submit(guard, "one")
+    clock.now += 61
+    submit(guard, "one")
+    guard.release(stale)
+    with pytest.raises(FeedbackRejected, match="already received"):
+        submit(guard, "one", session_id="s2")
+
+
+def test_identical_submits_racing_admit_one(guard):
+    guard = FeedbackGuard(TokenBucketLimiter(100, 1), TokenBucketLimiter(100, 1))
+    barrier = threading.Barrier(8)
+    admitted = []
+
+    def race(index):
+        barrier.wait()
+        try:
+            admitted.append(submit(guard, "same text", session_id=f"s{index}"))
+        except FeedbackRejected:
+            pass
+
+    threads = [threading.Thread(target=race, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(admitted) == 1
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""feedback_migrate: workbook to store, resume from the checkpoint, verification."""
+import json
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+import feedback_migrate
+from feedback_export import sheet_title
+from feedback_migrate import main, migrate, source_tallies, verify
+from feedback_store import IDEMPOTENCY_KEY, SQLiteFeedbackStore
+
+GEO = "IP: Geospatial Data Extraction and Mapping Assistant"
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Two sheets as the old feedback_form() wrote them, one titled by a cleaned and truncated catalog name."""
+    path = tmp_path / "feedback.xlsx"
+    book = openpyxl.Workbook()
+    alpha = book.active
+    alpha.title = "Alpha"
+    alpha.append(["Name", "Time", "Category", "Feedback"])
+    for index in range(5):
+        alpha.append([f"user {index}", f"2024-05-01 10:00:0{index}", "General feedback", f"feedback {index}"])
+    alpha.append([None, None, None, None])  # Blank rows are skipped
+    alpha.append(["user 5", datetime(2024, 5, 2, 9, 30), "Urgent Fix", 42.0])
+    geo = book.create_sheet(sheet_title(GEO))
+    geo.append(["Feedback", "Name"])  # Other column order, no Time / Category
+    geo.append(["maps are slow", "Ada"])
+    book.save(path)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteFeedbackStore(str(tmp_path / "feedback.db"))
+    yield store
+    store.close()
+
+
+def quiet(*args):
+    pass
+
+
+def test_migrates_every_sheet_and_verifies(workbook, store, tmp_path):
+    checkpoint = migrate(workbook, store, tmp_path / "progress.json", batch_size=2, solution_names=(GEO, "Alpha"), log=quiet)
+    assert {title: (state["solution"], state["rows"], state["done"]) for title, state in checkpoint["sheets"].items()} == {
+        "Alpha": ("Alpha", 6, True), sheet_title(GEO): (GEO, 1, True)}
+    alpha = list(store.iter_records("Alpha"))
+    assert [record["Name"] for record in alpha] == [f"user {index}" for index in range(6)]
+    assert alpha[5]["Time"] == "2024-05-02 09:30:00" and alpha[5]["Feedback"] == "42"
+    assert list(store.iter_records(GEO)) == [{"Name": "Ada", "Time": "", "Category": "", "Feedback": "maps are slow"}]
+    assert verify(store, source_tallies(workbook, (GEO, "Alpha")), log=quiet)
+
+
+def test_resumes_after_a_failed_batch(workbook, store, tmp_path, monkeypatch):
+    checkpoint_path = tmp_path / "progress.json"
+    append_many = store.append_many
+    calls = []
+
+    def fail_on_second_batch(items):
+        calls.append(len(items))
+        if len(calls) == 2:
+            raise OSError("connection lost")
+        append_many(items)
+
+    monkeypatch.setattr(store, "append_many", fail_on_second_batch)
+    with pytest.raises(OSError):
+        migrate(workbook, store, checkpoint_path, batch_size=2, log=quiet)
+    saved = json.loads(checkpoint_path.read_text())["sheets"]["Alpha"]
+    assert (saved["rows"], saved["next_row"], saved["done"]) == (2, 4, False)
+
+    monkeypatch.setattr(store, "append_many", append_many)
+    migrate(workbook, store, checkpoint_path, batch_size=2, log=quiet)
+    assert [record["Name"] for record in store.iter_records("Alpha")] == [f"user {index}" for index in range(6)]
+    assert verify(store, source_tallies(workbook), log=quiet)
+
+
+def test_replaying_a_committed_batch_adds_nothing(workbook, store, tmp_path):
+    checkpoint_path = tmp_path / "progress.json"
+    migrate(workbook, store, checkpoint_path, batch_size=2, log=quiet)
+    # A crash between a batch's commit and its checkpoint save: the rerun starts over
+    checkpoint_path.unlink()
+    migrate(workbook, store, checkpoint_path, batch_size=2, log=quiet)
+    assert len(list(store.iter_records("Alpha"))) == 6
+    assert verify(store, source_tallies(workbook), log=quiet)
+
+
+def test_a_changed_workbook_starts_a_fresh_checkpoint(workbook, store, tmp_path):
+    checkpoint_path = tmp_path / "progress.json"
+    migrate(workbook, store, checkpoint_path, log=quiet)
+    book = openpyxl.load_workbook(workbook)
+    book["Alpha"].append(["user 6", "2024-05-03 10:00:00", "General feedback", "feedback 6"])
+    book.save(workbook)
+    checkpoint = migrate(workbook, store, checkpoint_path, log=quiet)
+    assert checkpoint["sheets"]["Alpha"]["rows"] == 7
+    assert len(list(store.iter_records("Alpha"))) == 7  # The six already there were not written twice
+
+
+def test_verify_reports_missing_and_extra_rows(workbook, store, tmp_path):
+    tallies = source_tallies(workbook)
+    assert not verify(store, tallies, log=quiet)
+    migrate(workbook, store, tmp_path / "progress.json", log=quiet)
+    assert verify(store, tallies, log=quiet)
+    key = f"{feedback_migrate.sheet_key_prefix('Alpha')}999"
+    store.append("Alpha", {"Name": "x", "Time": "", "Category": "", "Feedback": "x", IDEMPOTENCY_KEY: key})
+    assert not verify(store, tallies, log=quiet)
+
+
+def test_main_migrates_then_verifies(workbook, tmp_path, capsys):
+    db = str(tmp_path / "cli.db")
+    catalog = tmp_path / "missing.json"
+    assert main([str(workbook), "--backend", "sqlite", "--path", db, "--catalog", str(catalog)]) == 0
+    assert main([str(workbook), "--backend", "sqlite", "--path", db, "--catalog", str(catalog), "--verify-only"]) == 0
+    assert "Verification passed" in capsys.readouterr().out
+    assert main([str(workbook), "--backend", "sqlite", "--path", str(tmp_path / "empty.db"), "--catalog", str(catalog),
+                 "--verify-only"]) == 1
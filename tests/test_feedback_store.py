@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Feedback store backends (SQLite and JSONL; PostgreSQL needs a server and is not covered here)."""
+import json
+
+import pytest
+
+from feedback_store import IDEMPOTENCY_KEY, JsonlFeedbackStore, SQLiteFeedbackStore, open_feedback_store
+
+
+def record(index, category="General feedback", time=None, **extra):
+    return {"Name": f"user {index}", "Time": time or f"2024-05-01 10:{index // 60:02d}:{index % 60:02d}",
+            "Category": category, "Feedback": f"feedback {index}", **extra}
+
+
+@pytest.fixture(params=["sqlite", "jsonl"])
+def store(request, tmp_path):
+    store = open_feedback_store(request.param, str(tmp_path / request.param))
+    yield store
+    store.close()
+
+
+def test_jsonl_solutions_never_share_a_log(tmp_path):
+    store = JsonlFeedbackStore(tmp_path)
+    names = ["A/B", "A B", "a b", "A_B"]
+    store.append_many([(name, record(index)) for index, name in enumerate(names)])
+    assert len(list(tmp_path.glob("*.jsonl"))) == len(names)
+    assert store.solutions() == sorted(names)
+    for index, name in enumerate(names):
+        assert [r["Name"] for r in store.iter_records(name)] == [f"user {index}"]
+
+
+def test_jsonl_reads_legacy_shared_logs(tmp_path):
+    # Before the hash, "A/B" and "A B" both appended to A_B.jsonl
+    with open(tmp_path / "A_B.jsonl", "w", encoding="utf-8") as f:
+        for index, name in enumerate(["A/B", "A B", "A/B"]):
+            f.write(json.dumps(dict(record(index), Solution=name)) + "\n")
+    store = JsonlFeedbackStore(tmp_path)
+    store.append("A/B", record(3))
+    assert store.solutions() == ["A B", "A/B"]
+    assert [r["Name"] for r in store.iter_records("A/B")] == ["user 0", "user 2", "user 3"]
+    assert [r["Name"] for r in store.iter_records("A B")] == ["user 1"]
+
+
+def test_append_and_iterate_in_submission_order(store):
+    store.append("Beta", record(0))
+    store.append_many([("Alpha", record(1)), ("Beta", record(2)), ("Alpha", record(3))])
+    assert store.solutions() == ["Alpha", "Beta"]
+    assert [r["Name"] for r in store.iter_records("Alpha")] == ["user 1", "user 3"]
+    assert list(store.iter_records("Beta"))[1] == {key: value for key, value in record(2).items()}
+    assert list(store.iter_records("Missing")) == []
+
+
+def test_idempotency_key_keeps_the_first_copy(store):
+    store.append("Alpha", record(0, **{IDEMPOTENCY_KEY: "k1"}))
+    store.append_many([("Alpha", record(1, **{IDEMPOTENCY_KEY: "k1"})), ("Alpha", record(2, **{IDEMPOTENCY_KEY: "k2"}))])
+    assert [(key, r["Name"]) for key, r in store.iter_keyed_records("Alpha")] == [("k1", "user 0"), ("k2", "user 2")]
+
+
+def test_query_pages_newest_first_without_gaps(store):
+    store.append_many([(("Alpha", "Beta")[index % 2], record(index)) for index in range(7)])
+    names, cursor = [], None
+    while True:
+        rows, cursor = store.query(before=cursor, limit=3)
+        names.extend(row["Name"] for row in rows)
+        if cursor is None:
+            break
+    assert names == [f"user {index}" for index in reversed(range(7))]
+    assert {row["Solution"] for row in store.query(limit=10)[0]} == {"Alpha", "Beta"}
+
+
+def test_query_pages_through_rows_with_the_same_time(store):
+    store.append_many([("Alpha", record(index, time="2024-05-01 10:00:00")) for index in range(5)])
+    first, cursor = store.query(limit=2)
+    second, cursor = store.query(before=cursor, limit=2)
+    third, cursor = store.query(before=cursor, limit=2)
+    assert cursor is None
+    assert sorted(row["Name"] for row in first + second + third) == [f"user {index}" for index in range(5)]
+
+
+def test_query_filters(store):
+    store.append_many([
+        ("Alpha", record(0, category="Urgent Fix", time="2024-05-01 09:00:00")),
+        ("Alpha", dict(record(1, time="2024-05-02 09:00:00"), Feedback="login button broken")),
+        ("Beta", record(2, category="Urgent Fix", time="2024-05-03 09:00:00")),
+    ])
+
+    def names(**filters):
+        return [row["Name"] for row in store.query(**filters)[0]]
+
+    assert names(solution="Alpha") == ["user 1", "user 0"]
+    assert names(categories=("Urgent Fix",)) == ["user 2", "user 0"]
+    assert names(since="2024-05-02 00:00:00") == ["user 2", "user 1"]
+    assert names(until="2024-05-03 09:00:00") == ["user 1", "user 0"]  # until is exclusive
+    assert names(text="login broken") == ["user 1"]
+    assert names(text="user 2") == ["user 2"]  # Names are searched too
+    assert names(solution="Beta", categories=("General feedback",)) == []
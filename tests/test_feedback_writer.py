@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""FeedbackWriter against in-memory stores that fail or block on demand."""
+import threading
+import time
+
+import pytest
+
+import feedback_writer
+from feedback_store import IDEMPOTENCY_KEY
+from feedback_writer import DEFAULT_RETRIES, FeedbackWriter
+
+
+class ListStore:
+    """Keeps appended pairs in a list; the first ``failures`` append_many() calls raise."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.items = []
+
+    def append_many(self, items):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("disk full")
+        self.items.extend(items)
+
+
+class BlockingStore(ListStore):
+    """append_many() waits until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.entered = threading.Event()
+
+    def append_many(self, items):
+        self.entered.set()
+        self.release.wait(5)
+        super().append_many(items)
+
+
+def record(index):
+    return {"Name": f"user {index}", "Time": "2024-05-01 10:00:00", "Category": "General feedback", "Feedback": f"feedback {index}"}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(feedback_writer, "RETRY_BACKOFF_SECONDS", 0.0)
+
+
+def test_submit_writes_and_confirms():
+    store = ListStore()
+    writer = FeedbackWriter(store)
+    receipt = writer.submit("Alpha", record(0))
+    assert receipt.wait(2) is True
+    assert writer.flush(2)
+    (solution, written), = store.items
+    assert solution == "Alpha" and written["Name"] == "user 0"
+    assert written[IDEMPOTENCY_KEY]  # Added by submit(), so retries cannot duplicate it
+    writer.close()
+    assert writer.stats()["written"] == 1
+
+
+def test_submit_keeps_an_existing_idempotency_key():
+    store = ListStore()
+    writer = FeedbackWriter(store)
+    writer.submit("Alpha", dict(record(0), **{IDEMPOTENCY_KEY: "mine"})).wait(2)
+    assert store.items[0][1][IDEMPOTENCY_KEY] == "mine"
+    writer.close()
+
+
+def test_a_failing_batch_is_retried():
+    store = ListStore(failures=DEFAULT_RETRIES - 1)
+    writer = FeedbackWriter(store)
+    assert writer.submit("Alpha", record(0)).wait(2) is True
+    assert store.calls == DEFAULT_RETRIES
+    assert writer.stats()["failed"] == 0
+    writer.close()
+
+
+def test_a_dropped_batch_is_kept_for_retry():
+    store = ListStore(failures=DEFAULT_RETRIES)
+    writer = FeedbackWriter(store)
+    assert writer.submit("Alpha", record(0)).wait(2) is False
+    failed, last_error = writer.failed()
+    assert [(solution, kept["Name"]) for solution, kept in failed] == [("Alpha", "user 0")]
+    assert last_error == "OSError: disk full"
+    assert writer.stats()["failed"] == writer.stats()["failed_kept"] == 1
+
+    assert writer.retry_failed() == 1  # The store works again
+    assert writer.flush(2)
+    assert [kept["Name"] for _, kept in store.items] == ["user 0"]
+    assert writer.failed()[0] == []
+    writer.close()
+
+
+def test_a_full_queue_refuses_and_counts():
+    store = BlockingStore()
+    writer = FeedbackWriter(store, max_queue=2, max_batch=1)
+    first = writer.submit("Alpha", record(0))
+    assert store.entered.wait(2)  # The writer holds the first one; the queue has room for two more
+    assert writer.submit("Alpha", record(1)) and writer.submit("Alpha", record(2))
+    assert writer.submit("Alpha", record(3)) is False
+    assert first.wait(0) is None  # Still pending
+    assert writer.stats()["rejected"] == 1
+    assert writer.flush(0.05) is False
+
+    store.release.set()
+    assert writer.flush(2)
+    assert [kept["Name"] for _, kept in store.items] == ["user 0", "user 1", "user 2"]
+    writer.close()
+
+
+def test_close_with_a_full_queue_does_not_hang():
+    store = BlockingStore()
+    writer = FeedbackWriter(store, max_queue=1, max_batch=1)
+    writer.submit("Alpha", record(0))
+    assert store.entered.wait(2)
+    writer.submit("Alpha", record(1))
+    started = time.monotonic()
+    writer.close(timeout=0.2)
+    assert time.monotonic() - started < 1.0
+    store.release.set()
+
+
+def test_close_drains_the_queue():
+    store = ListStore()
+    writer = FeedbackWriter(store)
+    for index in range(50):
+        writer.submit("Alpha", record(index))
+    writer.close()
+    assert len(store.items) == 50
+    assert not writer._thread.is_alive()
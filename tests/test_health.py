@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""probe() and HealthMonitor against a stub HTTP server on localhost."""
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from health import DEGRADED, DOWN, UNKNOWN, UP, HealthMonitor, probe
+
+SLOW_SECONDS = 0.3
+HANG_SECONDS = 2.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """/ok answers 200, /not-found 404, /error 500, /slow 200 after SLOW_SECONDS, /hang not before HANG_SECONDS."""
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(SLOW_SECONDS)
+        elif self.path == "/hang":
+            time.sleep(HANG_SECONDS)
+        status = {"/not-found": 404, "/error": 500}.get(self.path, 200)
+        body = b"stub"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def refused_url():
+    """A localhost port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def test_probe_up(stub_url):
+    result = probe(f"{stub_url}/ok", timeout=2)
+    assert result.state == UP
+    assert result.status_code == 200
+    assert result.latency_ms is not None and result.error is None
+
+
+def test_probe_client_error_is_up(stub_url):
+    # The service answered: a 4xx page is the tool's business, not an outage
+    result = probe(f"{stub_url}/not-found", timeout=2)
+    assert (result.state, result.status_code) == (UP, 404)
+
+
+def test_probe_server_error_is_degraded(stub_url):
+    result = probe(f"{stub_url}/error", timeout=2)
+    assert (result.state, result.status_code) == (DEGRADED, 500)
+
+
+def test_probe_slow_is_degraded(stub_url):
+    result = probe(f"{stub_url}/slow", timeout=2, degraded_ms=SLOW_SECONDS * 1000 / 2)
+    assert (result.state, result.status_code) == (DEGRADED, 200)
+    assert result.latency_ms >= SLOW_SECONDS * 1000
+
+
+def test_probe_connection_refused_is_down(refused_url):
+    result = probe(refused_url, timeout=2)
+    assert result.state == DOWN
+    assert result.latency_ms is None and result.status_code is None
+    assert result.error
+
+
+def test_probe_timeout_is_down(stub_url):
+    started = time.perf_counter()
+    result = probe(f"{stub_url}/hang", timeout=0.2)
+    assert time.perf_counter() - started < HANG_SECONDS
+    assert result.state == DOWN
+    assert "timed out" in result.error
+
+
+def test_monitor_refresh(stub_url, refused_url):
+    monitor = HealthMonitor(timeout=2, max_workers=4)
+    try:
+        urls = [f"{stub_url}/ok", f"{stub_url}/error", refused_url]
+        monitor.set_targets(urls)
+        assert monitor.get(urls[0]).state == UNKNOWN  # Nothing probed yet
+        monitor.refresh()
+        assert [monitor.get(url).state for url in urls] == [UP, DEGRADED, DOWN]
+        monitor.set_targets(urls[:1])
+        assert list(monitor.snapshot()) == urls[:1]
+    finally:
+        monitor.stop()
+
+
+def test_monitor_expires_stale_results(stub_url):
+    monitor = HealthMonitor(ttl=0.05, timeout=2, max_workers=1)
+    try:
+        url = f"{stub_url}/ok"
+        monitor.set_targets([url])
+        monitor.refresh()
+        assert monitor.get(url).state == UP
+        time.sleep(0.1)
+        assert monitor.get(url).state == UNKNOWN
+    finally:
+        monitor.stop()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""HealthHistory: downsampling rings, summaries and the history file."""
+import json
+
+import pytest
+
+from health import DEGRADED, DOWN, UNKNOWN, UP, ProbeResult
+from health_history import DAY, HOUR, MINUTE, RESOLUTIONS, BucketRing, HealthHistory, Resolution
+
+URL = "http://tool.local"
+START = 1_700_006_400.0  # Midnight UTC, so minute, hour and day buckets all start here
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def history(clock):
+    return HealthHistory(clock=clock)
+
+
+def probe(state, at, latency_ms=100.0):
+    return ProbeResult(state, None if state == DOWN else latency_ms, 200, at)
+
+
+def test_a_bucket_aggregates_its_samples(history, clock):
+    history.record(URL, probe(UP, START + 1, 100.0))
+    history.record(URL, probe(DEGRADED, START + 2, 300.0))
+    history.record(URL, probe(DOWN, START + 3))
+    history.record(URL, probe(UNKNOWN, START + 4))  # Not a sample
+    clock.now = START + 5
+    for resolution in RESOLUTIONS:
+        bucket, = history.series(URL, resolution, 1)
+        assert (bucket.start, bucket.samples, bucket.down, bucket.degraded) == (START, 3, 1, 1)
+        assert (bucket.latency_ms, bucket.max_latency_ms) == (200.0, 300.0)
+
+
+def test_series_by_name_oldest_first(history, clock):
+    for minute in range(3):
+        history.record(URL, probe(UP, START + minute * 60, 10.0 * (minute + 1)))
+    clock.now = START + 2 * 60 + 30
+    assert [bucket.latency_ms for bucket in history.series(URL, "1m", 4)] == [None, 10.0, 20.0, 30.0]
+    assert len(history.series(URL, "1m", 10_000)) == MINUTE.slots
+    assert [bucket.samples for bucket in history.series("http://unknown", "1h", 2)] == [0, 0]
+    with pytest.raises(ValueError):
+        history.series(URL, "1w", 1)
+    with pytest.raises(ValueError):
+        history.series(URL, Resolution("1h", 3600, 24), 1)
+
+
+def test_the_ring_wraps_and_forgets_old_buckets():
+    ring = BucketRing(4)
+    for bucket in range(6):
+        ring.add(bucket, UP, float(bucket))
+    assert ring.get(1, 60).samples == 0  # Overwritten by bucket 5
+    assert ring.get(5, 60).latency_ms == 5.0
+    ring.add(1, DOWN, None)  # Late sample for a bucket the ring moved past
+    assert ring.get(5, 60).samples == 1 and ring.get(1, 60).samples == 0
+    assert ring.totals(0, 5) == (4, 0)
+
+
+def test_minute_history_keeps_one_day(history, clock):
+    history.record(URL, probe(UP, START))
+    clock.now = START + DAY.seconds - 1
+    assert history.series(URL, MINUTE, MINUTE.slots)[0].samples == 1
+    history.record(URL, probe(UP, START + DAY.seconds))  # Reuses the first minute's slot
+    clock.now = START + DAY.seconds
+    assert history.series(URL, MINUTE, MINUTE.slots)[0].samples == 0
+    assert history.series(URL, HOUR, 25)[0].samples == 1
+
+
+def test_uptime_and_summary(history, clock):
+    for hour in range(24):
+        history.record(URL, probe(DOWN if hour == 5 else UP, START + hour * HOUR.seconds))
+    clock.now = START + 23 * HOUR.seconds + 1
+    assert history.uptime(URL) == pytest.approx(100.0 * 23 / 24)
+    summary = history.summary(URL)
+    assert summary.uptime_percent == 95.8
+    assert summary.outages == tuple(hour == 5 for hour in range(24))
+    assert summary.latency_ms[5] is None and summary.latency_ms[0] == 100
+    assert history.summary(URL) is summary  # Cached until a new sample or a new hour
+    history.record(URL, probe(UP, clock.now))
+    assert history.summary(URL) is not summary
+    assert history.summary("http://unknown").uptime_percent is None
+
+
+def test_retain_forgets_removed_tools(history):
+    history.record(URL, probe(UP, START))
+    history.record("http://gone", probe(UP, START))
+    history.retain([URL])
+    assert history.uptime("http://gone") is None and history.uptime(URL) == 100.0
+
+
+def test_save_and_load_round_trip(tmp_path, clock):
+    path = str(tmp_path / "history.json")
+    history = HealthHistory(path, clock=clock)
+    history.record(URL, probe(UP, START, 120.0))
+    history.record(URL, probe(DOWN, START + 30))
+    history.save()
+    clock.now = START + 60
+    restored = HealthHistory(path, clock=clock)
+    for resolution in RESOLUTIONS:
+        assert restored.series(URL, resolution, 2) == history.series(URL, resolution, 2)
+
+
+def test_flush_saves_only_changes_after_the_interval(tmp_path, clock):
+    path = tmp_path / "history.json"
+    history = HealthHistory(str(path), save_interval=300, clock=clock)
+    history.record(URL, probe(UP, START))
+    history.flush()
+    assert not path.exists()
+    clock.now += 300
+    history.flush()
+    assert path.exists()
+    path.unlink()
+    clock.now += 300
+    history.flush()  # Nothing new since the last save
+    assert not path.exists()
+    history.record(URL, probe(UP, clock.now))
+    history.flush(force=True)
+    assert path.exists()
+
+
+def test_a_changed_resolution_starts_empty(tmp_path, clock):
+    path = str(tmp_path / "history.json")
+    history = HealthHistory(path, clock=clock)
+    history.record(URL, probe(UP, START))
+    history.save()
+    longer_minutes = (Resolution("1m", 60, 2880), HOUR, DAY)
+    restored = HealthHistory(path, resolutions=longer_minutes, clock=clock)
+    assert restored.series(URL, "1m", 1)[0].samples == 0
+    assert restored.series(URL, "1h", 1)[0].samples == 1
+
+
+def test_an_unreadable_file_is_ignored(tmp_path, clock):
+    path = tmp_path / "history.json"
+    path.write_text("{not json")
+    assert HealthHistory(str(path), clock=clock).uptime(URL) is None
+    path.write_text(json.dumps({"format": 999}))
+    assert HealthHistory(str(path), clock=clock).uptime(URL) is None
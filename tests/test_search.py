@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""SearchIndex queries, filters and paging, checked against a plain scan of the catalog."""
+import random
+
+import pytest
+
+from catalog import Catalog, Solution
+from search import SearchIndex, tokenize
+
+WORDS = ("finance", "database", "search", "geospatial", "extraction", "dashboard", "utility", "ticker", "company", "map")
+TAGS = ("finance", "database", "geospatial", "utilities")
+STATUSES = ("ACTIVE", "INACTIVE", "MAINTENANCE")
+
+
+def solution(name, description="", tags=(), status="ACTIVE", version="1.0"):
+    return Solution(name=name, description=description, link="http://localhost", status=status, version=version, tags=tuple(tags))
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(Catalog([
+        solution("Phronesis Pulse 2.0", "Yahoo Finance tickers to company profiles", ("finance",), version="2.0"),
+        solution("Database Search Engine", "Company database front-end", ("database", "search"), version="Beta"),
+        solution("UID Generator", "Unique IDs for companies", ("database", "utilities"), status="INACTIVE"),
+        solution("IP: Geospatial Data Extraction", "Bulk extraction of IP addresses", ("geospatial",), version="Alpha"),
+    ], "test"))
+
+
+def names(results):
+    solutions, total = results
+    return [solution.name for solution in solutions], total
+
+
+@pytest.fixture(scope="module")
+def large():
+    rng = random.Random(7)
+    solutions = [
+        solution(f"Tool {position} {rng.choice(WORDS)}", " ".join(rng.sample(WORDS, 3)), rng.sample(TAGS, rng.randint(0, 2)),
+                 status=rng.choice(STATUSES))
+        for position in range(300)
+    ]
+    return SearchIndex(Catalog(solutions, "large")), solutions
+
+
+def test_tokenize_lowercases_and_splits():
+    assert tokenize("IP: Geospatial Data-Extraction 2.0") == ["ip", "geospatial", "data", "extraction", "2", "0"]
+
+
+def test_every_token_matches_as_a_prefix(index):
+    assert names(index.search("comp")) == (["Phronesis Pulse 2.0", "Database Search Engine", "UID Generator"], 3)
+    assert names(index.search("company data")) == (["Database Search Engine"], 1)
+    assert names(index.search("GEO extr")) == (["IP: Geospatial Data Extraction"], 1)
+    assert names(index.search("alpha")) == (["IP: Geospatial Data Extraction"], 1)  # The version is searchable
+    assert names(index.search("nothing")) == ([], 0)
+    assert names(index.search(""))[1] == 4
+
+
+def test_tags_and_statuses_filter(index):
+    assert names(index.search(tags=("database", "finance")))[1] == 3
+    assert names(index.search("company", tags=("database",), statuses=("ACTIVE",))) == (["Database Search Engine"], 1)
+    assert names(index.search(statuses=("INACTIVE",))) == (["UID Generator"], 1)
+    assert names(index.search(tags=("unknown",))) == ([], 0)
+    assert index.tags == ("database", "finance", "geospatial", "search", "utilities")
+    assert index.statuses == ("ACTIVE", "INACTIVE")
+
+
+def test_pages_partition_the_matches(index):
+    assert names(index.search(per_page=3, page=1)) == (["Phronesis Pulse 2.0", "Database Search Engine", "UID Generator"], 4)
+    assert names(index.search(per_page=3, page=2)) == (["IP: Geospatial Data Extraction"], 4)
+    assert names(index.search(per_page=3, page=3)) == ([], 4)
+    assert names(index.search(per_page=3, page=0))[0] == names(index.search(per_page=3, page=1))[0]
+
+
+@pytest.mark.parametrize("query, tags, statuses", [
+    ("", (), ()),
+    ("data", (), ()),
+    ("tool 1", (), ()),
+    ("map", ("finance", "geospatial"), ()),
+    ("", ("database",), ("ACTIVE", "MAINTENANCE")),
+])
+def test_large_catalog_agrees_with_a_scan(large, query, tags, statuses):
+    index, solutions = large
+    words = tokenize(query)
+
+    def matches(item):
+        tokens = [token for field in (item.name, item.description, item.version) for token in tokenize(field)]
+        return (all(any(token.startswith(word) for token in tokens) for word in words)
+                and (not tags or set(tags) & set(item.tags)) and (not statuses or item.status in statuses))
+
+    expected = [item for item in solutions if matches(item)]
+    pages = [index.search(query, tags, statuses, page=page, per_page=7) for page in range(1, len(expected) // 7 + 3)]
+    assert all(total == len(expected) for _, total in pages)
+    assert [item for page, _ in pages for item in page] == expected
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""SessionRegistry sweeps against Streamlit's own SessionState."""
+import pytest
+from streamlit.runtime.state.safe_session_state import SafeSessionState
+from streamlit.runtime.state.session_state import SessionState
+
+import session_registry
+from session_registry import SessionRegistry, session_state_of
+
+KEEP = ("page_view_recorded", "admin_authorized", "feedback_session_id")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Context:
+    """The part of a ScriptRunContext session_state_of() reads."""
+
+    def __init__(self, state):
+        self.session_state = SafeSessionState(state, lambda: None)
+
+
+def session_state(**values):
+    state = SessionState()
+    for key, value in values.items():
+        state[key] = value
+    return state
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_session_state_of_unwraps_the_run_wrapper():
+    state = session_state(page=2)
+    assert session_state_of(Context(state)) is state
+
+
+def test_session_state_of_refuses_unsupported_releases(monkeypatch):
+    monkeypatch.setattr(session_registry, "SUPPORTED_STREAMLIT", ((0, 1), (0, 2)))
+    assert session_state_of(Context(session_state())) is None
+
+
+def test_sweep_clears_idle_sessions_but_the_kept_keys(clock):
+    registry = SessionRegistry(idle_ttl=100, sweep_interval=10, keep=KEEP, clock=clock)
+    idle = session_state(page=3, admin_authorized=True, feedback_session_id="abc", page_view_recorded=True)
+    busy = session_state(page=5)
+    registry.touch("idle", idle)
+    clock.now = 60
+    registry.touch("busy", busy)
+    clock.now = 100
+    assert registry.sweep() == 1
+    assert idle.filtered_state == {"admin_authorized": True, "feedback_session_id": "abc", "page_view_recorded": True}
+    assert busy.filtered_state == {"page": 5}
+    assert registry.stats() == {"sessions": 1, "evicted": 1, "enabled": True}
+
+
+def test_touch_sweeps_when_due(clock):
+    registry = SessionRegistry(idle_ttl=30, sweep_interval=10, clock=clock)
+    idle = session_state(page=3)
+    registry.touch("idle", idle)
+    clock.now = 40
+    registry.touch("other", session_state())
+    assert idle.filtered_state == {}
+
+
+def test_closed_sessions_are_dropped_not_cleared(clock):
+    active = {"open"}
+    registry = SessionRegistry(idle_ttl=100, is_active=active.__contains__, clock=clock)
+    closed = session_state(page=3)
+    registry.touch("open", session_state())
+    registry.touch("closed", closed)
+    assert registry.sweep() == 0
+    assert registry.stats()["sessions"] == 1
+    assert closed.filtered_state == {"page": 3}  # Streamlit expires it on its own
+
+
+def test_unsupported_state_turns_eviction_off(clock):
+    registry = SessionRegistry(idle_ttl=10, clock=clock)
+    registry.touch("a", None)
+    registry.touch("b", session_state(page=1))
+    assert registry.stats() == {"sessions": 0, "evicted": 0, "enabled": False}
+
+
+def test_a_failing_sweep_turns_eviction_off_instead_of_raising(clock):
+    class MovedState:
+        @property
+        def filtered_state(self):
+            raise AttributeError("moved")
+
+    registry = SessionRegistry(idle_ttl=10, sweep_interval=10, clock=clock)
+    registry.touch("a", MovedState())
+    clock.now = 20
+    registry.touch("b", session_state())  # Sweeps, inside what would be a visitor's script run
+    assert not registry.enabled
+    registry.touch("c", session_state())
+    assert registry.stats()["sessions"] == 0
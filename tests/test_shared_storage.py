@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Writes from several instances, with two store objects on one SQLite file standing in for PostgreSQL."""
+import logging
+import time
+
+import pytest
+
+from analytics import PAGE_VIEW, TOOL_OPEN, AnalyticsStore
+from feedback_store import IDEMPOTENCY_KEY, SQLiteFeedbackStore
+from shared_storage import is_postgres_url, new_idempotency_key, warn_if_instance_local
+
+
+def record(name, key):
+    return {"Name": name, "Time": "2024-05-01 10:00:00", "Category": "General feedback", "Feedback": "broken",
+            IDEMPOTENCY_KEY: key}
+
+
+@pytest.fixture
+def feedback_instances(tmp_path):
+    stores = [SQLiteFeedbackStore(str(tmp_path / "feedback.db")) for _ in range(2)]
+    yield stores
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def analytics_instances(tmp_path):
+    return [AnalyticsStore(tmp_path / "analytics.db") for _ in range(2)]
+
+
+def test_a_feedback_key_is_stored_once_across_instances(feedback_instances):
+    first, second = feedback_instances
+    key = new_idempotency_key()
+    first.append("Alpha", record("from first", key))
+    second.append_many([("Alpha", record("retried by second", key)), ("Alpha", record("new", new_idempotency_key()))])
+    assert [r["Name"] for r in first.iter_records("Alpha")] == ["from first", "new"]
+    rows, _ = second.read_after(None)
+    assert [row["Name"] for row in rows] == ["from first", "new"]
+
+
+def test_an_analytics_batch_is_applied_once_across_instances(analytics_instances):
+    first, second = analytics_instances
+    now = time.time()
+    events = [(now, TOOL_OPEN, "Alpha", None), (now, TOOL_OPEN, "Alpha", None), (now, PAGE_VIEW, None, 12.0)]
+    batch_id = new_idempotency_key()
+    assert first.write_batch(events, batch_id) is True
+    assert second.write_batch(events, batch_id) is False  # A retry after a lost commit acknowledgement
+    assert second.write_batch(events[:1]) is True  # Without a batch id nothing is deduplicated
+    (_, tool, opens), = first.tool_opens()
+    assert (tool, opens) == ("Alpha", 3)
+    (_, page_views, _), = second.render_stats()
+    assert page_views == 1
+
+
+def test_instance_local_storage_is_flagged_on_cloud_run(monkeypatch, caplog):
+    assert is_postgres_url("postgresql://db/nexus") and is_postgres_url("postgres://db/nexus")
+    assert not is_postgres_url("feedback.db") and not is_postgres_url(None)
+    monkeypatch.delenv("K_SERVICE", raising=False)
+    with caplog.at_level(logging.WARNING, logger="shared_storage"):
+        warn_if_instance_local("Feedback", "feedback.db")
+        assert not caplog.records  # Not on Cloud Run
+        monkeypatch.setenv("K_SERVICE", "nexus")
+        warn_if_instance_local("Feedback", "postgresql://db/nexus")
+        assert not caplog.records
+        warn_if_instance_local("Feedback", "feedback.db")
+    assert "ephemeral disk" in caplog.text
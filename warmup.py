@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Start-up warm-up for the container.
+
+``python warmup.py --build`` runs at image build time: it pre-generates the
+hashed static assets, validates the solutions catalog and imports every app
+module (app_modules(): each top-level .py next to this file) so a broken image
+fails the build rather than the first visitor.
+
+``python warmup.py`` runs in the background from the entrypoint: it waits for
+the local Streamlit server, then opens one session over the websocket and
+drives a single script run, so the process-wide caches (catalog, search index,
+render cache, health monitor, feedback writer) are built before real traffic
+needs them. The run carries ``?warmup=1`` so the portal leaves it out of its
+usage analytics.
+"""
+import argparse
+import base64
+import os
+import socket
+import struct
+import sys
+import time
+import urllib.request
+import zlib
+
+WARMUP_QUERY_PARAM = "warmup"  # ?warmup=1 marks the start-up run, which is not a visitor
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Importing streamlit_app would run the page; the image build's compileall still checks it
+NOT_IMPORTED = ("streamlit_app", "warmup")
+
+
+def app_modules():
+    """Every top-level app module the build step imports, so a new module cannot be left out."""
+    return sorted(name[:-3] for name in os.listdir(APP_DIR) if name.endswith(".py") and name[:-3] not in NOT_IMPORTED)
+
+
+def build_step():
+    import importlib
+
+    for module in app_modules():
+        importlib.import_module(module)
+    from static_assets import build_static_assets, image_sources
+    from catalog import load_catalog
+    from webfonts import build_font_assets
+
+    manifest = build_static_assets(image_sources())
+    fonts = build_font_assets()
+    if not fonts:
+        raise SystemExit("warm-up: no web fonts vendored in fonts/ (python webfonts.py fetch, or subset, then commit them)")
+    catalog = load_catalog(os.environ.get("NEXUS_CATALOG_PATH") or "solutions.json")
+    print(f"warm-up: {len(manifest['assets'])} static assets, {len(fonts)} font faces, {len(catalog)} solutions (catalog {catalog.version})")
+
+
+# --- Minimal websocket client (RFC 6455), enough to drive one Streamlit session ---
+class WebSocket:
+    def __init__(self, host, port, path, timeout=30, deflate=False):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.bytes_received = 0  # Frame bytes read off the wire (after compression, if negotiated)
+        key = base64.b64encode(os.urandom(16)).decode()
+        extensions = "Sec-WebSocket-Extensions: permessage-deflate\r\n" if deflate else ""
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\nSec-WebSocket-Protocol: streamlit\r\n"
+            f"{extensions}\r\n"
+        )
+        self.sock.sendall(request.encode())
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("connection closed during websocket handshake")
+            response += chunk
+        head, self._buffer = response.split(b"\r\n\r\n", 1)
+        if b" 101 " not in head.split(b"\r\n", 1)[0]:
+            raise ConnectionError(f"websocket upgrade refused: {head.splitlines()[0].decode(errors='replace')}")
+        # Only server->client messages are ever compressed; ours go out as plain frames
+        self._inflater = zlib.decompressobj(-15) if b"permessage-deflate" in head.lower() else None
+
+    def send_binary(self, payload):
+        header = bytearray([0x82])  # FIN + binary frame
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", length)
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        self.sock.sendall(bytes(header) + mask + masked)
+
+    def _read_exact(self, count):
+        while len(self._buffer) < count:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("websocket closed")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:count], self._buffer[count:]
+        self.bytes_received += count
+        return data
+
+    def recv(self):
+        """Return the next complete data message (bytes); answers pings, raises on close."""
+        message = b""
+        compressed = False
+        while True:
+            first, second = self._read_exact(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self._read_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self._read_exact(8))[0]
+            payload = self._read_exact(length)
+            if opcode == 0x8:
+                raise ConnectionError("websocket closed by server")
+            if opcode == 0x9:  # Ping -> pong
+                mask = os.urandom(4)
+                self.sock.sendall(bytes([0x8A, 0x80 | len(payload)]) + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+                continue
+            if opcode == 0xA:
+                continue
+            if not message:
+                compressed = bool(first & 0x40)  # RSV1 on the first frame marks a deflated message
+            message += payload
+            if first & 0x80:
+                if compressed and self._inflater:
+                    return self._inflater.decompress(message + b"\x00\x00\xff\xff")
+                return message
+
+    def close(self):
+        try:
+            self.sock.sendall(bytes([0x88, 0x80]) + os.urandom(4))
+        finally:
+            self.sock.close()
+
+
+def wait_until_healthy(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def run_one_session(port, timeout=60):
+    """Open a session and wait for one full script run; returns the run time in ms."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    ws = WebSocket("127.0.0.1", port, "/_stcore/stream", timeout=timeout)
+    try:
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = f"{WARMUP_QUERY_PARAM}=1"
+        started = time.perf_counter()
+        ws.send_binary(back_msg.SerializeToString())
+        while True:
+            forward_msg = ForwardMsg()
+            forward_msg.ParseFromString(ws.recv())
+            if forward_msg.WhichOneof("type") == "script_finished":
+                return (time.perf_counter() - started) * 1000
+    finally:
+        ws.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the portal before it takes traffic.")
+    parser.add_argument("--build", action="store_true", help="build-time checks and asset generation")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8080")))
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if args.build:
+        build_step()
+        return 0
+    if not wait_until_healthy(args.port, args.timeout):
+        print("warm-up: server never became healthy; skipping", file=sys.stderr)
+        return 1
+    try:
+        elapsed_ms = run_one_session(args.port, args.timeout)
+    except Exception as e:  # Warm-up is best effort; never take the container down
+        print(f"warm-up: session failed ({e})", file=sys.stderr)
+        return 1
+    print(f"warm-up: first script run took {elapsed_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
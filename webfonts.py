@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Self-hosted web fonts: only the faces and subsets the theme uses, as WOFF2.
+
+    python webfonts.py fetch [--force]
+    python webfonts.py subset FAMILY=FONT.ttf ... [--force]
+
+``fetch`` asks Google Fonts' CSS API for FONT_FACES once, keeps the
+FONT_SUBSETS blocks and downloads their WOFF2 files into ``fonts/`` along with
+``fonts/fonts.json`` (family, weight, subset, unicode-range, file). ``subset``
+builds the same files offline from the upstream TTFs (variable ones are cut
+down to the weights used) with fontTools, a tool needed only for this step.
+``fonts/`` is committed with the app, so neither the build nor the running
+portal needs to reach fonts.googleapis.com; the image build fails rather than
+ship the theme without them.
+
+At build time (``warmup.py --build``) or on first use, ``build_font_assets()``
+publishes each file content-hashed under ``static/assets/`` next to the
+images. ``font_face_css()`` renders the @font-face rules (``font-display:
+swap``: text paints at once in the fallback font) and ``preload_links()`` the
+preload hints for the Latin files every page needs. Streamlit serves WOFF2
+as text/plain, which browsers accept for fonts (nosniff only guards scripts
+and stylesheets).
+"""
+import argparse
+import json
+import re
+import sys
+import urllib.request
+from pathlib import Path
+
+from static_assets import BASE_DIR, asset_url, publish_asset
+
+FONT_DIR = BASE_DIR / "fonts"
+FONT_MANIFEST_PATH = FONT_DIR / "fonts.json"
+
+# --- Faces the theme's rules use: (family, weight). Heavier weights are synthesized, as before ---
+FONT_FACES = (("Montserrat", 600), ("Montserrat", 700), ("Roboto", 400))
+FONT_SUBSETS = ("latin", "latin-ext")  # latin-ext is only downloaded for text that needs it (unicode-range)
+PRELOAD_SUBSET = "latin"
+
+CSS_API_URL = "https://fonts.googleapis.com/css2"
+# The CSS API picks the font format from the User-Agent; any current browser gets WOFF2
+FETCH_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+FETCH_TIMEOUT_SECONDS = 30
+
+_FACE_BLOCK = re.compile(r"/\*\s*([\w-]+)\s*\*/\s*@font-face\s*\{(.*?)\}", re.S)
+_DESCRIPTOR = re.compile(r"([\w-]+)\s*:\s*([^;]+);")
+_SOURCE_URL = re.compile(r"url\(([^)]+\.woff2)\)")
+
+
+def css_api_url(faces=FONT_FACES):
+    weights = {}
+    for family, weight in faces:
+        weights.setdefault(family, []).append(weight)
+    families = "&".join(
+        f"family={family.replace(' ', '+')}:wght@{';'.join(str(weight) for weight in sorted(family_weights))}"
+        for family, family_weights in weights.items()
+    )
+    return f"{CSS_API_URL}?{families}&display=swap"
+
+
+# --- Vendoring (run once, with network access or from upstream TTFs) ---
+def _get(url):
+    request = urllib.request.Request(url, headers={"User-Agent": FETCH_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT_SECONDS) as response:
+        return response.read()
+
+
+def parse_font_css(css, subsets=FONT_SUBSETS):
+    """The @font-face blocks of a CSS API response for ``subsets``, as dicts with the source URL."""
+    faces = []
+    for subset, block in _FACE_BLOCK.findall(css):
+        if subset not in subsets:
+            continue
+        descriptors = {name: value.strip() for name, value in _DESCRIPTOR.findall(block)}
+        url = _SOURCE_URL.search(descriptors.get("src", ""))
+        if url is None:
+            continue
+        faces.append({
+            "family": descriptors["font-family"].strip("'\""),
+            "style": descriptors.get("font-style", "normal"),
+            "weight": int(descriptors["font-weight"]),
+            "subset": subset,
+            "unicode_range": descriptors.get("unicode-range"),
+            "url": url.group(1).strip("'\""),
+        })
+    return faces
+
+
+def fetch_fonts(font_dir=FONT_DIR, faces=FONT_FACES, subsets=FONT_SUBSETS, log=print):
+    """Download the WOFF2 subsets into ``font_dir`` and write its fonts.json; returns the face list."""
+    url = css_api_url(faces)
+    parsed = parse_font_css(_get(url).decode("utf-8"), subsets)
+    font_dir.mkdir(parents=True, exist_ok=True)
+    # Variable fonts serve several weights from one file: download it once, named after all of them
+    weights_by_url = {}
+    for face in parsed:
+        weights_by_url.setdefault(face["url"], []).append(str(face["weight"]))
+    files = {}
+    for face in parsed:
+        if face["url"] not in files:
+            weights = "-".join(weights_by_url[face["url"]])
+            file_name = f"{face['family'].lower().replace(' ', '-')}-{face['style']}-{weights}-{face['subset']}.woff2"
+            data = _get(face["url"])
+            (font_dir / file_name).write_bytes(data)
+            files[face["url"]] = file_name
+            log(f"{file_name}: {len(data)} bytes")
+        face["file"] = files[face["url"]]
+    manifest = {"source": url, "faces": [{key: face[key] for key in ("family", "style", "weight", "subset", "unicode_range", "file")}
+                                         for face in parsed]}
+    (font_dir / FONT_MANIFEST_PATH.name).write_text(json.dumps(manifest, indent=2))
+    return manifest["faces"]
+
+
+# Google Fonts' unicode-range for each subset, so ``subset`` cuts the files as ``fetch`` gets them
+SUBSET_RANGES = {
+    "latin": "U+0000-00FF, U+0131, U+0152-0153, U+02BB-02BC, U+02C6, U+02DA, U+02DC, U+0304, U+0308, U+0329, "
+             "U+2000-206F, U+20AC, U+2122, U+2191, U+2193, U+2212, U+2215, U+FEFF, U+FFFD",
+    "latin-ext": "U+0100-02BA, U+02BD-02C5, U+02C7-02CC, U+02CE-02D7, U+02DD-02FF, U+0304, U+0308, U+0329, "
+                 "U+1D00-1DBF, U+1E00-1E9F, U+1EF2-1EFF, U+2020, U+20A0-20AB, U+20AD-20C0, U+2113, U+2C60-2C7F, U+A720-A7FF",
+}
+
+
+def _codepoints(unicode_range):
+    for part in unicode_range.split(","):
+        start, _, end = part.strip().removeprefix("U+").partition("-")
+        yield from range(int(start, 16), int(end or start, 16) + 1)
+
+
+def subset_fonts(sources, font_dir=FONT_DIR, faces=FONT_FACES, subsets=FONT_SUBSETS, log=print):
+    """Cut the WOFF2 subsets from ``sources`` (family -> TTF path) into ``font_dir``; returns the face list."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    weights = {}
+    for family, weight in faces:
+        weights.setdefault(family, []).append(weight)
+    font_dir.mkdir(parents=True, exist_ok=True)
+    vendored = []
+    for family, family_weights in weights.items():
+        family_weights = sorted(family_weights)
+        for subset_name in subsets:
+            font = TTFont(sources[family])
+            subsetter = subset.Subsetter(subset.Options())
+            subsetter.populate(unicodes=_codepoints(SUBSET_RANGES[subset_name]))
+            subsetter.subset(font)
+            if "fvar" in font:
+                # Pin every other axis to its default and keep only the weights used (one variable file, as fetch gets)
+                axes = {axis.axisTag: axis.defaultValue for axis in font["fvar"].axes}
+                axes["wght"] = (family_weights[0], family_weights[-1]) if len(family_weights) > 1 else family_weights[0]
+                font = instancer.instantiateVariableFont(font, axes)
+            font.flavor = "woff2"
+            file_name = f"{family.lower().replace(' ', '-')}-normal-{'-'.join(map(str, family_weights))}-{subset_name}.woff2"
+            font.save(font_dir / file_name)
+            log(f"{file_name}: {(font_dir / file_name).stat().st_size} bytes")
+            vendored += [{"family": family, "style": "normal", "weight": weight, "subset": subset_name,
+                          "unicode_range": SUBSET_RANGES[subset_name], "file": file_name} for weight in family_weights]
+    manifest = {"source": ", ".join(Path(sources[family]).name for family in weights), "faces": vendored}
+    (font_dir / FONT_MANIFEST_PATH.name).write_text(json.dumps(manifest, indent=2))
+    return vendored
+
+
+# --- Publishing and rendering ---
+def vendored_faces(manifest_path=FONT_MANIFEST_PATH):
+    try:
+        return json.loads(Path(manifest_path).read_text())["faces"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return []
+
+
+def build_font_assets(manifest_path=FONT_MANIFEST_PATH):
+    """Publish the vendored WOFF2 files under static/assets; returns the faces, each with its asset ``path``."""
+    faces = []
+    for face in vendored_faces(manifest_path):
+        source = Path(manifest_path).parent / face["file"]
+        try:
+            data = source.read_bytes()
+        except FileNotFoundError:
+            continue
+        faces.append(dict(face, path=publish_asset(source.stem, "woff2", data, precompress=False)))
+    return tuple(faces)
+
+
+def font_face_css(faces, url_for=asset_url):
+    """@font-face rules for published ``faces``; ``url_for`` maps an asset path to the URL the CSS uses."""
+    rules = []
+    for face in faces:
+        unicode_range = f"unicode-range:{face['unicode_range']};" if face.get("unicode_range") else ""
+        rules.append(
+            f"@font-face{{font-family:'{face['family']}';font-style:{face['style']};font-weight:{face['weight']};"
+            f"font-display:swap;src:url({url_for(face['path'])}) format('woff2');{unicode_range}}}"
+        )
+    return "".join(rules)
+
+
+def preload_paths(faces):
+    """Asset paths worth preloading: the PRELOAD_SUBSET file of each face, once each."""
+    return tuple(dict.fromkeys(face["path"] for face in faces if face["subset"] == PRELOAD_SUBSET))
+
+
+def preload_links(faces, url_for=asset_url):
+    return "".join(
+        f'<link rel="preload" href="{url_for(path)}" as="font" type="font/woff2" crossorigin>'
+        for path in preload_paths(faces)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vendor the theme's web fonts into fonts/.")
+    parser.add_argument("command", choices=["fetch", "subset"])
+    parser.add_argument("sources", nargs="*", metavar="FAMILY=FONT.ttf", help="subset: the upstream font file of each family")
+    parser.add_argument("--force", action="store_true", help="vendor again even if fonts/ already is")
+    args = parser.parse_args(argv)
+
+    if vendored_faces() and not args.force:
+        print(f"{FONT_MANIFEST_PATH} already lists {len(vendored_faces())} faces; use --force to vendor again")
+        return 0
+    if args.command == "subset":
+        sources = dict(source.split("=", 1) for source in args.sources)
+        missing = sorted({family for family, _ in FONT_FACES} - sources.keys())
+        if missing:
+            parser.error(f"no font file given for {', '.join(missing)}")
+        faces = subset_fonts(sources)
+    else:
+        faces = fetch_fonts()
+    print(f"Vendored {len(faces)} faces into {FONT_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())